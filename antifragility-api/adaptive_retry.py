@@ -0,0 +1,71 @@
+#Retry policy tuned per stressor from its observed outcomes
+#RETRY_POLICY=fixed keeps the original 3 attempts, 1s apart, for every stressor.
+#RETRY_POLICY=adaptive (default) decides after each failed attempt, from the stats
+#of the stressor that failed it (see stressor_stats.py), once it has
+#ADAPTIVE_MIN_SAMPLES retries behind it:
+#   - no more retries when the attempt after a failure almost never succeeds
+#     (< ADAPTIVE_GIVE_UP_RATE)
+#   - a short wait (ADAPTIVE_SHORT_WAIT) when retries after short waits recover
+#     about as often as after the full FIXED_WAIT (within ADAPTIVE_WAIT_TOLERANCE)
+#   - enough attempts that all of them failing is about as unlikely as
+#     ADAPTIVE_TARGET_FAILURE (ADAPTIVE_MAX_ATTEMPTS cap)
+#While learning, and for a share of requests afterwards (ADAPTIVE_EXPLORE), the
+#fixed number of attempts runs with the wait drawn from short/full, so both
+#wait lengths keep being measured.
+import math
+import os
+import random
+from collections import namedtuple
+
+RETRY_POLICY = os.environ.get("RETRY_POLICY", "adaptive")     #"adaptive" or "fixed"
+FIXED_ATTEMPTS = int(os.environ.get("FIXED_ATTEMPTS", "3"))
+FIXED_WAIT = float(os.environ.get("FIXED_WAIT", "1.0"))      #seconds
+ADAPTIVE_MIN_SAMPLES = float(os.environ.get("ADAPTIVE_MIN_SAMPLES", "20"))
+ADAPTIVE_GIVE_UP_RATE = float(os.environ.get("ADAPTIVE_GIVE_UP_RATE", "0.05"))
+ADAPTIVE_SHORT_WAIT = float(os.environ.get("ADAPTIVE_SHORT_WAIT", "0.05"))    #seconds
+ADAPTIVE_WAIT_TOLERANCE = float(os.environ.get("ADAPTIVE_WAIT_TOLERANCE", "0.05"))
+ADAPTIVE_TARGET_FAILURE = float(os.environ.get("ADAPTIVE_TARGET_FAILURE", "0.05"))
+ADAPTIVE_MAX_ATTEMPTS = int(os.environ.get("ADAPTIVE_MAX_ATTEMPTS", "6"))
+ADAPTIVE_EXPLORE = float(os.environ.get("ADAPTIVE_EXPLORE", "0.1"))
+
+RetryPolicy = namedtuple("RetryPolicy", ["attempts", "wait", "reason"])
+FIXED_POLICY = RetryPolicy(FIXED_ATTEMPTS, FIXED_WAIT, "fixed")
+
+
+def tuned_policy(stats):
+    """
+    The policy the stressor's stats call for, or None while there are too few samples.
+    """
+    if stats is None or stats.retries < ADAPTIVE_MIN_SAMPLES:
+        return None
+    rate = stats.recovery_rate
+    if rate < ADAPTIVE_GIVE_UP_RATE:
+        return RetryPolicy(1, 0.0, "no-recovery")
+    short, long = stats.short_recovery_rate, stats.long_recovery_rate
+    fast = short is not None and (long is None or short >= long - ADAPTIVE_WAIT_TOLERANCE)
+    if rate >= 1.0:
+        attempts = 2
+    else:
+        attempts = 1 + math.ceil(math.log(ADAPTIVE_TARGET_FAILURE) / math.log(1.0 - rate))
+    return RetryPolicy(min(ADAPTIVE_MAX_ATTEMPTS, attempts), ADAPTIVE_SHORT_WAIT if fast else FIXED_WAIT,
+                       "tuned")
+
+
+def policy_for(stats, explore=False):
+    """
+    Policy after an attempt failed under a stressor with `stats` (StressorStats or None).
+    """
+    if RETRY_POLICY == "fixed":
+        return FIXED_POLICY
+    policy = tuned_policy(stats)
+    if policy is None or explore:
+        return RetryPolicy(FIXED_ATTEMPTS, random.choice((ADAPTIVE_SHORT_WAIT, FIXED_WAIT)),
+                           "learning" if policy is None else "explore")
+    return policy
+
+
+def explore():
+    """
+    Whether a request runs the exploration policy.
+    """
+    return RETRY_POLICY == "adaptive" and random.random() < ADAPTIVE_EXPLORE
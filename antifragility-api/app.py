@@ -1,9 +1,13 @@
 from flask import Flask, request, jsonify
-from tenacity import retry, stop_after_attempt, retry_if_exception_type wait_fixed, RetryError, wait_exponential
-import random, time, logging
+from tenacity import Retrying, RetryError, retry_if_exception_type
+import random, time, logging, signal, sys
 from pythonjsonlogger import jsonlogger
 from datetime import datetime
-from prometheus_client import Counter, Histogram,  generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram,  generate_latest, CONTENT_TYPE_LATEST
+import adaptive_retry
+from stressor_stats import StatsStore
+
+STRESSORS = ["timeout", "latency", "failure", "none"]
 
 #Metrics
 REQUEST_COUNT = Counter("antifragile_requests_total", "Total requests received")
@@ -11,6 +15,12 @@ RETRY_SUCCESS = Counter("antifragile_retry_success_total", "Successful retries")
 FALLBACK_USED = Counter("antifragile_fallback_total", "Fallbacks triggered")
 STRESSOR_TYPE = Counter("antifragile_stressor_type_total", "Stressor type triggered", ["type"])
 LATENCY_HISTOGRAM = Histogram("antifragile_latency_seconds", "Latency injected by chaos")
+REQUEST_LATENCY = Histogram(
+    "antifragile_request_seconds", "End-to-end latency of /process", ["policy"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0)
+)
+POLICY_ATTEMPTS = Gauge("antifragile_policy_attempts", "Attempts the retry policy allows", ["stressor"])
+POLICY_WAIT = Gauge("antifragile_policy_wait_seconds", "Wait between attempts", ["stressor"])
 
 
 # Adding structured logging
@@ -24,11 +34,14 @@ logger.addHandler(handler)
 
 app = Flask(__name__)
 
+#Outcome stats per stressor, kept in state.db
+STATS = StatsStore()
+
 # Chaos-aware operation
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
 def antifragile_operation(value):
-    stressor = random.choice([ "timeout", "latency", "failure", "none"])
+    stressor = random.choice(STRESSORS)
     metadata = {"value": value, "stressor": stressor}
+    STRESSOR_TYPE.labels(type=stressor).inc()
 
     logger.warning("Chaos injected", extra={
         "timestamp": time.time(),
@@ -38,23 +51,79 @@ def antifragile_operation(value):
 
     if stressor == "timeout":
         logger.warning("Antifragile: Timeout triggered", extra=metadata)
-        raise TimeoutError("Simulated timeout")
+        raise StressorError(stressor, TimeoutError("Simulated timeout"))
 
     elif stressor == "latency":
         latency = random.uniform(0.5, 2.0)
         metadata["latency"] = latency
+        LATENCY_HISTOGRAM.observe(latency)
         logger.info("Antifragile: Latency injected", extra=metadata)
         time.sleep(latency)
 
     elif stressor == "failure":
         logger.error("Antifragile: Failure triggered", extra=metadata)
-        raise Exception("Simulated failure")
+        raise StressorError(stressor, Exception("Simulated failure"))
 
     time.sleep(0.2)
     result = value * 2
     metadata["result"] = result
     logger.info("Antifragile: Operation succeeded", extra=metadata)
-    return result
+    return result, stressor
+
+
+class StressorError(Exception):
+    """
+    An attempt failed under `stressor`.
+    """
+
+    def __init__(self, stressor, error):
+        super().__init__(str(error))
+        self.stressor = stressor
+
+
+def run_with_policy(value):
+    """
+    One request; after each failed attempt the policy of the stressor that failed it
+    decides whether to retry and how long to wait. Records every attempt.
+    Returns (result, attempts) and raises RetryError when the policy gave up; other
+    errors are not retried.
+    """
+    explore = adaptive_retry.explore()
+    reason = adaptive_retry.RETRY_POLICY
+    attempts = []     #[stressor, seconds, success, wait before the next attempt]
+    decision = None   #policy after the last failed attempt
+
+    def attempt():
+        nonlocal decision, reason
+        started = time.monotonic()
+        try:
+            result, stressor = antifragile_operation(value)
+        except StressorError as e:
+            attempts.append([e.stressor, time.monotonic() - started, False, None])
+            decision = adaptive_retry.policy_for(STATS.get(e.stressor), explore)
+            reason = decision.reason
+            POLICY_ATTEMPTS.labels(stressor=e.stressor).set(decision.attempts)
+            POLICY_WAIT.labels(stressor=e.stressor).set(decision.wait)
+            raise
+        attempts.append([stressor, time.monotonic() - started, True, None])
+        return result
+
+    def current():
+        return decision or adaptive_retry.FIXED_POLICY
+
+    def stop(retry_state):
+        return retry_state.attempt_number >= current().attempts
+
+    def wait(retry_state):
+        if attempts:
+            attempts[-1][3] = current().wait
+        return current().wait
+
+    try:
+        result = Retrying(stop=stop, wait=wait, retry=retry_if_exception_type(StressorError))(attempt)
+        return result, len(attempts)
+    finally:
+        STATS.record([tuple(a) for a in attempts], reason)
 
 @app.route("/antifragile-api/process", methods=["POST"])
 def process():
@@ -67,29 +136,54 @@ def process():
             logger.warning("Antifragile: Invalid input", extra={"input": data})
             return jsonify({"error": "Invalid input"}), 400
 
+        REQUEST_COUNT.inc()
+        started = time.monotonic()
         try:
-            result = antifragile_operation(value)
-            logger.info("Antifragile: Retry succeeded", extra={"result": result})
-            return jsonify({"result": result, "retries_used": True})
-        except RetryError:
+            result, attempts = run_with_policy(value)
+            retried = attempts > 1
+            if retried:
+                RETRY_SUCCESS.inc()
+                logger.info("Antifragile: Retry succeeded", extra={"result": result, "attempts": attempts})
+            else:
+                logger.info("Antifragile: Succeeded on the first attempt", extra={"result": result})
+            return jsonify({"result": result, "retries_used": retried, "attempts": attempts})
+        except RetryError as e:
+            FALLBACK_USED.inc()
             fallback_result = value * 1.5
-            logger.warning("Antifragile: Fallback used after retries failed", extra={"fallback_result": fallback_result})
+            logger.warning("Antifragile: Fallback used after retries failed", extra={
+                "fallback_result": fallback_result, "attempts": e.last_attempt.attempt_number
+            })
             return jsonify({
                 "warning": "Fallback triggered after retries",
                 "result": fallback_result,
-                "retries_used": False
+                "retries_used": False,
+                "attempts": e.last_attempt.attempt_number
             }), 200
+        finally:
+            REQUEST_LATENCY.labels(policy=adaptive_retry.RETRY_POLICY).observe(time.monotonic() - started)
 
     except Exception as e:
         logger.exception("Antifragile: Unhandled exception", extra={"error": str(e)})
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
 
 
+#Learned per-stressor stats and the policy they currently call for
+@app.route("/antifragile-api/stats")
+def stats():
+    policies = {}
+    for stressor in STRESSORS:
+        policy = adaptive_retry.tuned_policy(STATS.get(stressor)) if adaptive_retry.RETRY_POLICY == "adaptive" else None
+        policies[stressor] = (policy or adaptive_retry.FIXED_POLICY)._asdict()
+    return jsonify({"retry_policy": adaptive_retry.RETRY_POLICY, "stressors": STATS.snapshot(), "policies": policies})
+
+
 #To view metrics
 @app.route("/metrics")
 def metrics():
     return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 if __name__ == "__main__":
+    #Turn SIGTERM (docker stop) into a normal exit so queued stats are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(port=5005)
 
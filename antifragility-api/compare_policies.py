@@ -0,0 +1,94 @@
+#Fixed vs adaptive retry policy over one run
+#Sends the same number of requests through the app in-process (Flask test client,
+#real sleeps) once per policy, each starting from an empty stats database, and
+#prints mean and tail latency overall, per stressor and for the second half of
+#the run, when the adaptive policy has had time to learn.
+#   python compare_policies.py --requests 800 --concurrency 32
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("STATE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="antifragile-"), "state.db"))
+
+import adaptive_retry
+import app as antifragile_app
+from stressor_stats import StatsStore
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples):
+    latencies = [s["latency"] for s in samples]
+    return {
+        "requests": len(samples),
+        "mean_ms": round(statistics.fmean(latencies) * 1e3, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1e3, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 1),
+        "fallback_rate": round(sum(s["fallback"] for s in samples) / len(samples), 3),
+        "mean_attempts": round(statistics.fmean(s["attempts"] for s in samples), 2),
+    }
+
+
+def run(policy, requests, concurrency, db_dir):
+    adaptive_retry.RETRY_POLICY = policy
+    antifragile_app.STATS = StatsStore(os.path.join(db_dir, f"{policy}.db"))
+    client = antifragile_app.app.test_client()
+
+    def one(i):
+        started = time.monotonic()
+        body = client.post("/antifragile-api/process", json={"value": i}).get_json()
+        return {"index": i, "latency": time.monotonic() - started, "fallback": "warning" in body,
+                "attempts": body["attempts"]}
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = list(pool.map(one, range(requests)))
+    antifragile_app.STATS.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the fixed and adaptive retry policies")
+    parser.add_argument("--requests", type=int, default=800)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("antifragile").disabled = True
+    db_dir = tempfile.mkdtemp(prefix="antifragile-compare-")
+    report = {}
+    for policy in ("fixed", "adaptive"):
+        samples = run(policy, args.requests, args.concurrency, db_dir)
+        second_half = [s for s in samples if s["index"] >= args.requests // 2]
+        report[policy] = {"run": summarize(samples), "second_half": summarize(second_half)}
+        learned = {}
+        for stressor in antifragile_app.STRESSORS:
+            policy_now = adaptive_retry.tuned_policy(antifragile_app.STATS.get(stressor))
+            learned[stressor] = policy_now._asdict() if policy_now else None
+        report[policy]["learned_policies"] = learned
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'policy':<10} {'window':<12} {'mean_ms':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+          f"{'fallback':>9} {'attempts':>9}")
+    for policy, result in report.items():
+        for window in ("run", "second_half"):
+            s = result[window]
+            print(f"{policy:<10} {window:<12} {s['mean_ms']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8} "
+                  f"{s['fallback_rate']:>9} {s['mean_attempts']:>9}")
+    print("adaptive policies at the end of the run:")
+    for stressor, policy in report["adaptive"]["learned_policies"].items():
+        print(f"  {stressor:<8} {policy}")
+
+
+if __name__ == "__main__":
+    main()
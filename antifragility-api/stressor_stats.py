@@ -0,0 +1,243 @@
+#Per-stressor outcome statistics, persisted in SQLite
+#The chaos stressor is drawn per attempt, so statistics are kept per attempt: how
+#often attempts under each stressor run, how long they take, and, for attempts
+#that failed and were retried, whether the next attempt succeeded, split by
+#whether the wait before it was short (< STATS_SHORT_WAIT) or long. That is what
+#the retry policy needs to decide whether retrying after a stressor pays off and
+#whether waiting longer helps.
+#
+#Every request updates in-memory aggregates (the write-back cache the retry policy
+#reads) and queues one raw row per attempt. A background thread writes the queued
+#rows and the aggregates to state.db in one transaction per batch (WAL journal,
+#synchronous=NORMAL), so requests never wait on disk. On start the aggregates are
+#reloaded, so what the service learned survives restarts.
+#
+#Aggregates decay with a half-life of STATS_HALF_LIFE attempts per stressor, so a
+#dependency that changes behaviour is re-learned instead of averaged away.
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger("antifragile")
+
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "state.db")
+STATS_FLUSH_INTERVAL = float(os.environ.get("STATS_FLUSH_INTERVAL", "1.0"))   #seconds
+STATS_BATCH_SIZE = int(os.environ.get("STATS_BATCH_SIZE", "256"))
+STATS_KEEP_OUTCOMES = int(os.environ.get("STATS_KEEP_OUTCOMES", "100000"))   #raw rows kept
+STATS_HALF_LIFE = float(os.environ.get("STATS_HALF_LIFE", "500"))   #attempts
+STATS_SHORT_WAIT = float(os.environ.get("STATS_SHORT_WAIT", "0.5"))    #seconds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stressor_outcomes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    stressor TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    success INTEGER NOT NULL,
+    latency_seconds REAL NOT NULL,
+    wait_seconds REAL,
+    next_success INTEGER,
+    policy TEXT
+);
+CREATE TABLE IF NOT EXISTS stressor_stats (
+    stressor TEXT PRIMARY KEY,
+    attempts REAL NOT NULL,
+    latency_sum REAL NOT NULL,
+    retries_short REAL NOT NULL,
+    recovered_short REAL NOT NULL,
+    retries_long REAL NOT NULL,
+    recovered_long REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+INSERT_OUTCOME = """
+INSERT INTO stressor_outcomes
+    (timestamp, stressor, attempt, success, latency_seconds, wait_seconds, next_success, policy)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPSERT_STATS = """
+INSERT INTO stressor_stats
+    (stressor, attempts, latency_sum, retries_short, recovered_short, retries_long, recovered_long, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(stressor) DO UPDATE SET
+    attempts = excluded.attempts, latency_sum = excluded.latency_sum,
+    retries_short = excluded.retries_short, recovered_short = excluded.recovered_short,
+    retries_long = excluded.retries_long, recovered_long = excluded.recovered_long,
+    updated_at = excluded.updated_at
+"""
+
+
+def _rate(recovered, retries):
+    return recovered / retries if retries else None
+
+
+class StressorStats:
+    """
+    Decayed per-attempt aggregates for one stressor. A retry counts as recovered
+    when the attempt right after the failed one succeeded. Counts are effective
+    (decayed) counts, hence floats.
+    """
+    __slots__ = ("attempts", "latency_sum", "retries_short", "recovered_short", "retries_long", "recovered_long")
+
+    DECAY = 0.5 ** (1 / STATS_HALF_LIFE)
+
+    def __init__(self, attempts=0.0, latency_sum=0.0, retries_short=0.0, recovered_short=0.0, retries_long=0.0,
+                 recovered_long=0.0):
+        self.attempts = attempts
+        self.latency_sum = latency_sum
+        self.retries_short = retries_short
+        self.recovered_short = recovered_short
+        self.retries_long = retries_long
+        self.recovered_long = recovered_long
+
+    def add(self, latency_seconds, wait_seconds=None, next_success=None):
+        """
+        One attempt; `wait_seconds` and `next_success` only when it failed and was retried.
+        """
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) * self.DECAY)
+        self.attempts += 1
+        self.latency_sum += latency_seconds
+        if wait_seconds is None:
+            return
+        if wait_seconds < STATS_SHORT_WAIT:
+            self.retries_short += 1
+            self.recovered_short += bool(next_success)
+        else:
+            self.retries_long += 1
+            self.recovered_long += bool(next_success)
+
+    @property
+    def retries(self):
+        return self.retries_short + self.retries_long
+
+    @property
+    def recovery_rate(self):
+        return _rate(self.recovered_short + self.recovered_long, self.retries)
+
+    @property
+    def short_recovery_rate(self):
+        return _rate(self.recovered_short, self.retries_short)
+
+    @property
+    def long_recovery_rate(self):
+        return _rate(self.recovered_long, self.retries_long)
+
+    def to_dict(self):
+        return {
+            "attempts": round(self.attempts, 2),
+            "retries": round(self.retries, 2),
+            "recovery_rate": self.recovery_rate,
+            "short_wait_recovery_rate": self.short_recovery_rate,
+            "long_wait_recovery_rate": self.long_recovery_rate,
+            "mean_attempt_seconds": self.latency_sum / self.attempts if self.attempts else None,
+        }
+
+
+class StatsStore:
+    """
+    In-memory per-stressor aggregates with batched write-back to SQLite;
+    whatever is still queued is written by close(), which also runs at exit.
+    """
+
+    def __init__(self, path=STATE_DB_PATH, flush_interval=STATS_FLUSH_INTERVAL, batch_size=STATS_BATCH_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.stats = {}
+        self._pending = []
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._conn = self._connect()
+        self._load()
+        self._thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _load(self):
+        for row in self._conn.execute(
+                "SELECT stressor, attempts, latency_sum, retries_short, recovered_short, retries_long, recovered_long "
+                "FROM stressor_stats"):
+            self.stats[row[0]] = StressorStats(*row[1:])
+
+    def get(self, stressor):
+        return self.stats.get(stressor)
+
+    def record(self, attempts, policy):
+        """
+        One request: `attempts` is a list of (stressor, seconds, success, wait_seconds),
+        wait_seconds being the wait before the next attempt (None if there was none).
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            for number, (stressor, seconds, success, wait) in enumerate(attempts, start=1):
+                next_success = attempts[number][2] if wait is not None and number < len(attempts) else None
+                if next_success is None:
+                    wait = None
+                stats = self.stats.get(stressor)
+                if stats is None:
+                    stats = self.stats[stressor] = StressorStats()
+                stats.add(seconds, wait, next_success)
+                self._dirty.add(stressor)
+                self._pending.append((now, stressor, number, int(success), seconds, wait,
+                                      None if next_success is None else int(next_success), policy))
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def snapshot(self):
+        with self._lock:
+            return {stressor: stats.to_dict() for stressor, stats in self.stats.items()}
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning("Stats flush failed", extra={"error": str(e)})
+
+    def flush(self):
+        """
+        Writes queued outcomes and changed aggregates in a single transaction.
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+            now = datetime.now(timezone.utc).isoformat()
+            aggregates = [(stressor, *(getattr(self.stats[stressor], field) for field in StressorStats.__slots__), now)
+                          for stressor in self._dirty]
+            self._dirty = set()
+        if not rows and not aggregates:
+            return
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(INSERT_OUTCOME, rows)
+            conn.executemany(UPSERT_STATS, aggregates)
+            conn.execute("DELETE FROM stressor_outcomes WHERE id <= (SELECT MAX(id) FROM stressor_outcomes) - ?",
+                         (STATS_KEEP_OUTCOMES,))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
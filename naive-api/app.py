@@ -1,18 +1,48 @@
 # naive_api.py
+import threading
 from flask import Flask, request, jsonify
+from request_log import RequestLog, REQUEST_LOG_ENABLED
 
 app = Flask(__name__)
 
+#Every request is logged to the logs table of naive.db (REQUEST_LOG_ENABLED=0 turns it off).
+#The log is opened on first use, so importing the app doesn't touch the database.
+REQUEST_LOG = None
+_REQUEST_LOG_LOCK = threading.Lock()
+
+def request_log():
+    global REQUEST_LOG
+    if REQUEST_LOG is None and REQUEST_LOG_ENABLED:
+        with _REQUEST_LOG_LOCK:
+            if REQUEST_LOG is None:
+                REQUEST_LOG = RequestLog()
+    return REQUEST_LOG
+
 @app.route("/naive-api/process", methods=["POST"])
 def process():
     data = request.get_json()
     value = data.get("value", 0)
     try:
         result = value * 2
+        log = request_log()
+        if log is not None:
+            log.record(value, result=result)
         return jsonify({"result": result})
     except Exception as e:
+        log = request_log()
+        if log is not None:
+            log.record(value, error=str(e))
         return jsonify({"error": str(e)}), 500
 
+#Most recent log entries, newest first
+@app.route("/naive-api/logs")
+def logs():
+    log = request_log()
+    if log is None:
+        return jsonify({"error": "Request logging is disabled"}), 404
+    limit = max(1, min(request.args.get("limit", 50, type=int), 1000))
+    return jsonify({"logs": log.recent(limit), "dropped": log.dropped})
+
 if __name__ == "__main__":
     app.run(port=5000)
 
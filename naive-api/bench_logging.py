@@ -0,0 +1,75 @@
+#Requests/sec of /naive-api/process with request logging off and on
+#Runs the app in-process (Flask test client) from --threads threads, once with
+#logging off, once with the batched RequestLog and once with the naive
+#connect + INSERT + commit per request for reference. Each logged mode writes a
+#fresh database in a temp directory, or in --db-dir to measure a particular disk.
+#   python bench_logging.py --requests 5000 --threads 8
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import app as naive_app
+from request_log import SCHEMA, INSERT_LOG, RequestLog, _column
+
+
+class PerRequestLog:
+    """
+    The baseline: a connection, an INSERT and a commit (fsync) per request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with sqlite3.connect(path) as conn:
+            conn.execute(SCHEMA)
+
+    def record(self, input_value, result=None, error=None):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(INSERT_LOG, (datetime.now(timezone.utc).isoformat(), _column(input_value),
+                                      _column(result), error))
+        conn.close()
+
+    def close(self):
+        pass
+
+
+def run(log, requests, threads):
+    naive_app.REQUEST_LOG = log
+    naive_app.REQUEST_LOG_ENABLED = log is not None
+    client = naive_app.app.test_client()
+
+    def one(i):
+        client.post("/naive-api/process", json={"value": i})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    if log is not None:
+        log.close()
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/sec with request logging off and on")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--db-dir", default=None, help="directory for the benchmark databases")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="naive-bench-")
+    modes = {
+        "off": lambda: None,
+        "batched": lambda: RequestLog(os.path.join(db_dir, "batched.db")),
+        "per-request": lambda: PerRequestLog(os.path.join(db_dir, "per_request.db")),
+    }
+    results = {mode: run(make(), args.requests, args.threads) for mode, make in modes.items()}
+    for mode, rate in results.items():
+        print(f"{mode:<12} {rate:>9.0f} req/s  ({rate / results['off']:.0%} of off)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#Request log in SQLite (the `logs` table of naive.db)
+#Requests only append a row to an in-memory batch. A single writer thread owns
+#the write connection and inserts each batch with one executemany in one
+#transaction, when REQUEST_LOG_BATCH_SIZE rows are waiting or every
+#REQUEST_LOG_FLUSH_INTERVAL seconds. That is one prepared INSERT (sqlite3 caches
+#statements per connection) and one commit per batch instead of per request.
+#The database runs in WAL mode, so the /logs reads, which use one connection per
+#thread, don't block the writer. Entries show up in queries at most one flush
+#interval late. If the writer falls REQUEST_LOG_MAX_PENDING rows behind, new rows
+#are dropped and counted rather than growing memory; so are the rows of a batch
+#that fails to commit. close() writes what is still queued and runs at exit.
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+NAIVE_DB_PATH = os.environ.get("NAIVE_DB_PATH", "naive.db")
+REQUEST_LOG_ENABLED = os.environ.get("REQUEST_LOG_ENABLED", "1") == "1"
+REQUEST_LOG_BATCH_SIZE = int(os.environ.get("REQUEST_LOG_BATCH_SIZE", "500"))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.environ.get("REQUEST_LOG_FLUSH_INTERVAL", "0.5"))   #seconds
+REQUEST_LOG_MAX_PENDING = int(os.environ.get("REQUEST_LOG_MAX_PENDING", "100000"))
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    input_value REAL,
+    result REAL,
+    error TEXT
+)
+"""
+INSERT_LOG = "INSERT INTO logs (timestamp, input_value, result, error) VALUES (?, ?, ?, ?)"
+SELECT_RECENT = "SELECT id, timestamp, input_value, result, error FROM logs ORDER BY id DESC LIMIT ?"
+
+
+def _column(value):
+    # Numbers and strings go in as they are (REAL affinity keeps text that isn't a
+    # number); anything else is stored as its JSON text
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return json.dumps(value)
+
+
+class RequestLog:
+    """
+    Batched writer for the `logs` table plus per-thread read connections.
+    """
+
+    def __init__(self, path=NAIVE_DB_PATH, batch_size=REQUEST_LOG_BATCH_SIZE,
+                 flush_interval=REQUEST_LOG_FLUSH_INTERVAL, max_pending=REQUEST_LOG_MAX_PENDING):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._readers = threading.local()
+        self._conn = self._connect()
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        # naive.db predates the error column
+        if "error" not in {row[1] for row in conn.execute("PRAGMA table_info(logs)")}:
+            conn.execute("ALTER TABLE logs ADD COLUMN error TEXT")
+        return conn
+
+    def record(self, input_value, result=None, error=None):
+        row = (datetime.now(timezone.utc).isoformat(), _column(input_value), _column(result), error)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # The batch is already counted in `dropped`; keep the writer running
+                logger.exception("Request log flush failed")
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        conn = self._conn
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(INSERT_LOG, rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                self.dropped += len(rows)
+            raise
+        self.written += len(rows)
+
+    def recent(self, limit=50):
+        """
+        The `limit` newest entries, newest first.
+        """
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(SELECT_RECENT, (limit,))]
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
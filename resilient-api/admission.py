@@ -0,0 +1,86 @@
+#Adaptive concurrency limit (admission control)
+#A gradient limiter in the style of TCP Vegas / Netflix concurrency-limits: it keeps
+#a slow moving average of request latency as the "no queueing" baseline and
+#compares each new sample to it. Latency above baseline * tolerance shrinks the
+#limit, latency at baseline lets it grow by ~sqrt(limit). Requests over the limit
+#are rejected immediately (503 + Retry-After) instead of queueing.
+#A request can take a weight (a batch counts as one slot per item); its latency
+#sample is then the time per unit of weight.
+import math
+import os
+import threading
+import time
+from prometheus_client import Counter, Gauge
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_INITIAL_LIMIT = int(os.environ.get("ADMISSION_INITIAL_LIMIT", "20"))
+ADMISSION_MIN_LIMIT = int(os.environ.get("ADMISSION_MIN_LIMIT", "4"))
+ADMISSION_MAX_LIMIT = int(os.environ.get("ADMISSION_MAX_LIMIT", "200"))
+ADMISSION_TOLERANCE = float(os.environ.get("ADMISSION_TOLERANCE", "2.0"))     #latency/baseline accepted before shrinking
+ADMISSION_SMOOTHING = float(os.environ.get("ADMISSION_SMOOTHING", "0.2"))
+ADMISSION_BASELINE_SAMPLES = int(os.environ.get("ADMISSION_BASELINE_SAMPLES", "500"))
+
+ADMISSION_LIMIT = Gauge("resilient_admission_limit", "Current adaptive concurrency limit", multiprocess_mode="livesum")
+ADMISSION_IN_FLIGHT = Gauge("resilient_admission_in_flight", "Requests currently admitted", multiprocess_mode="livesum")
+ADMISSION_REJECTED = Counter("resilient_admission_rejected_total", "Requests rejected by the concurrency limiter")
+
+
+class GradientLimiter:
+    def __init__(self, initial_limit=ADMISSION_INITIAL_LIMIT, min_limit=ADMISSION_MIN_LIMIT,
+                 max_limit=ADMISSION_MAX_LIMIT, tolerance=ADMISSION_TOLERANCE,
+                 smoothing=ADMISSION_SMOOTHING, baseline_samples=ADMISSION_BASELINE_SAMPLES):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._baseline_alpha = 2.0 / (baseline_samples + 1)
+        self.limit = float(initial_limit)
+        self.baseline = None     # long-term EMA of latency (seconds)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        ADMISSION_LIMIT.set(self.limit)
+
+    def try_acquire(self, weight=1):
+        """
+        Start time of the admitted request, or None if it must be rejected. A request
+        heavier than the whole limit is still admitted when nothing else is in flight.
+        """
+        with self._lock:
+            if self.in_flight and self.in_flight + weight > int(self.limit):
+                ADMISSION_REJECTED.inc()
+                return None
+            self.in_flight += weight
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+        return time.monotonic()
+
+    def release(self, started, weight=1):
+        latency = (time.monotonic() - started) / weight
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= weight
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+            self._update(latency, in_flight)
+
+    def _update(self, latency, in_flight):
+        latency = max(latency, 1e-6)
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += self._baseline_alpha * (latency - self.baseline)
+            if self.baseline / latency > 2.0:
+                self.baseline *= 0.95     # let the baseline drift back down after a slow period
+
+        # Don't grow the limit while the service isn't using it
+        if in_flight < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline / latency))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+        ADMISSION_LIMIT.set(self.limit)
+
+    def retry_after(self):
+        """
+        Seconds a rejected client should wait: about one typical request time.
+        """
+        return max(1, int(math.ceil(self.baseline or 1.0)))
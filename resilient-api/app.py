@@ -1,20 +1,44 @@
 from flask import Flask, request, jsonify
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
+from tenacity import RetryError
 import random
 import time
-import psutil
-import pandas as pd
+import os
+import signal
+import sys
+import threading
+import functools
+import json
+from collections import Counter as Counter_
 import logging
 from datetime import datetime, timezone
-from pythonjsonlogger import jsonlogger
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from logging_setup import configure_logging, start_async_logging
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CollectorRegistry, multiprocess
 from learning import train_model, plot_feature_importance
-from learning import predict_with_confidence, log_chaos_to_csv
+from learning import predict_with_confidence, log_chaos_to_csv, load_pipeline
+from learning import predict_with_confidence_batch, log_chaos_batch
+from learning import LEARNING_MODE, build_pipeline, swap_pipeline
+from learning import start_online_learning, bootstrap_online_learning, online_learning_started
+from learning import watch_artifact, reload_pipeline, pipeline_ready, PIPELINE_PATH
+from learning import start_training_window
+from event_writer import close_event_writers
+from training_jobs import TrainingJobs, claim_warmup
+from retry_policy import RetryPolicy, DeadlineExceeded
+from circuit_breaker import CircuitBreakers
+from admission import GradientLimiter, ADMISSION_ENABLED
+from profiling import stage, RETRY_ATTEMPTS, PROFILER, ProfilerBusy
+from rollups import Rollups, ROLLUP_PATH
+from prediction_cache import PredictionCache, PREDICTION_CACHE_ENABLED
 #AI chaos
-from learning import train_chaos_selector
+from learning import train_chaos_selector, start_chaos_bandit
 #For viewing the plot at an endpoint
 from flask import send_file
 from chaos import execute_chaos
+from feature_extraction import read_event_log
+from system_metrics import SystemMetricsSampler
+from compiled_models import compile_selector, save_selector, load_selector, ConstantSelector
+from compiled_models import SELECTOR_PATH
+import psutil
 
 
 
@@ -59,25 +83,26 @@ STRESSOR_TYPE = Counter("resilient_stressor_type_total", "Stressor type triggere
 LATENCY_HISTOGRAM = Histogram("resilient_latency_seconds", "Latency injected by chaos")
 """
 # Adding structured logging
+#(formatted and written on a background thread, sampling per LOG_SAMPLE_RATES)
 logger = logging.getLogger("locust_logger")
-logger.setLevel(logging.INFO)
-
-logHandler = logging.StreamHandler()
-formatter = jsonlogger.JsonFormatter('%(asctime)s %(levelname)s %(message)s %(extra)s')
-logHandler.setFormatter(formatter)
-logger.addHandler(logHandler)
+configure_logging(logger, '%(asctime)s %(levelname)s %(message)s %(extra)s')
 
 app = Flask(__name__)
 
+#Background sampler - requests read the latest sample instead of blocking 100 ms on psutil
+#(started with the other threads in start_worker_services)
+SYSTEM_METRICS = SystemMetricsSampler()
+
 def get_system_metrics():
-    return {
-        "cpu_percent": psutil.cpu_percent(interval=0.1),
-        "memory_percent": psutil.virtual_memory().percent
-    }
+    return SYSTEM_METRICS.latest()
 
-# Simulated fragile dependency with stressors
-@retry(stop=stop_after_attempt(5), wait=wait_fixed(0.5))
-def resilient_operation(value, stressor):
+BASE_LATENCY = 0.2
+
+def inject_stressor(value, stressor):
+    """
+    Stressor side effects shared by the sync and async services: raises for
+    timeout/failure, otherwise returns how long the operation should take.
+    """
     #stressor = random.choice(["timeout", "latency", "failure", "none"])
     STRESSOR_TYPE.labels(type=stressor).inc()
 
@@ -97,37 +122,120 @@ def resilient_operation(value, stressor):
         #print(f"[CHAOS] Triggered latency: {latency:.2f}s")
         #logger.info("Triggered latency", extra={"stressor": stressor, "latency": latency, "value":value})
         LATENCY_HISTOGRAM.observe(latency)
-        time.sleep(latency)
+        return latency + BASE_LATENCY
 
     elif stressor == "failure":
         #print("[CHAOS] Triggered failure")
         #logger.error("Triggered failure", extra={"stressor": stressor, "value":value})
         raise Exception("Simulated failure")
 
-    time.sleep(0.2)  # Base latency
+    return BASE_LATENCY
+
+def operation_result(value):
     result = value * 2
     #print(f"[SUCCESS] Operation completed with result: {result}")
     logger.info("Operation succeeded", extra={"result":result, "value": value})
     return result
 
+#Retries: per-request deadline, jittered exponential backoff, shared retry budget
+RETRY_POLICY = RetryPolicy()
+#Open circuits skip the retries entirely and go straight to the fallback
+CIRCUIT_BREAKERS = CircuitBreakers()
+
+def request_deadline():
+    """
+    Optional per-request deadline from the X-Deadline-Ms header (capped by the policy).
+    """
+    try:
+        return float(request.headers["X-Deadline-Ms"]) / 1000.0
+    except (KeyError, ValueError):
+        return None
+
+#Load shedding: requests over the adaptive concurrency limit get a fast 503
+ADMISSION = GradientLimiter() if ADMISSION_ENABLED else None
+
+def overloaded_response():
+    return {"error": "Service overloaded, retry later"}, 503, {"Retry-After": str(ADMISSION.retry_after())}
+
+def admission_controlled(view=None, *, weight=None):
+    """
+    Load-sheds `view` through ADMISSION; `weight()` (default 1) is the number of
+    limiter slots the current request takes.
+    """
+    if view is None:
+        return functools.partial(admission_controlled, weight=weight)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMISSION is None:
+            return view(*args, **kwargs)
+        slots = weight() if weight is not None else 1
+        started = ADMISSION.try_acquire(slots)
+        if started is None:
+            body, status, headers = overloaded_response()
+            return jsonify(body), status, headers
+        try:
+            return view(*args, **kwargs)
+        finally:
+            ADMISSION.release(started, slots)
+    return wrapper
+
+# Simulated fragile dependency with stressors
+def resilient_operation(value, stressor, run=None):
+    delay = inject_stressor(value, stressor)  # Injected + base latency
+    if run is not None and delay > run.remaining():
+        time.sleep(max(0.0, run.remaining()))
+        raise DeadlineExceeded("Request deadline exceeded")
+    time.sleep(delay)
+    return operation_result(value)
+
 
 @app.route('/resilient-api/process', methods=['POST'])
+@admission_controlled
 def process_data():
     #To sned the metric
     RESILIENT_REQUESTS.inc()
 
-    data = request.get_json(force=True)
-    value = data.get("value")
+    try:
+        data = json.loads(request.get_data())
+    except ValueError:
+        return jsonify({"error": "Invalid JSON body"}), 400
+    value = data.get("value") if isinstance(data, dict) else None
 
     if value is None or not isinstance(value, (int, float)):
         logger.warning("Invalid input", extra={"input": data})
         return jsonify({"error": "Invalid input: 'value' must be a number"}), 400
 
+    plan = plan_chaos(value)
+    started = time.perf_counter()
+    # The deadline covers the chaos stressor as well as the retried operation
+    deadline_at = time.monotonic() + RETRY_POLICY.deadline_for(request_deadline())
+
+    # Execute chaos and capture fallback status
+    with stage("chaos"):
+        fallback_used = execute_chaos(plan["stressor"], deadline_at)
+    record_chaos(value, plan, fallback_used)
+
+    with stage("operation"):
+        body, status, outcome = run_resilient(value, plan["stressor"], deadline_at - time.monotonic())
+    body["confidence"] = plan["confidence"]
+    with stage("log"):
+        record_outcome(plan, outcome, started)
+        log_chaos_to_csv(value=value, **plan, **outcome)
+    return jsonify(body), status
+
+
+def plan_chaos(value):
+    """
+    Samples system metrics, predicts success and lets the AI selector pick the stressor.
+    Returns the log_chaos_to_csv fields known before the operation runs.
+    """
     #stressor = random.choice(["timeout", "latency", "failure", "none"]) 
     #stressor = select_ai_stressor(value, sys_metrics["cpu_percent"], sys_metrics["memory_percent"], confidence)
     #injected_by_ai = True
 
-    sys_metrics = get_system_metrics()
+    with stage("metrics"):
+        sys_metrics = get_system_metrics()
     logger.info("System metrics", extra=sys_metrics)
 
     cpu = sys_metrics["cpu_percent"]
@@ -137,11 +245,12 @@ def process_data():
     # Predict success and confidence
     try:
         #stressor = select_ai_stressor(value, cpu, mem, confidence)
-        prediction, confidence = predict_with_confidence(
-            #stressor, value, 
-            "none", value,    #Used none temporarily for prediction
-            cpu, 
-            mem)
+        with stage("predict"):
+            prediction, confidence = predict_with_confidence(
+                #stressor, value, 
+                "none", value,    #Used none temporarily for prediction
+                cpu, 
+                mem)
     except Exception as e:
         logger.exception("Prediction failed", extra={"error":str(e)})
         confidence = 0.5   #Assigning a default value to avoid crushing
@@ -152,15 +261,27 @@ def process_data():
 
     #AI driven chaos selection
     try:
-        stressor = select_ai_stressor(value, cpu, mem, confidence)
+        with stage("select"):
+            stressor = select_ai_stressor(value, cpu, mem, confidence)
         injected_by_ai = True
     except Exception as e:
         stressor = random.choice(["timeout", "latency", "failure", "none"])
         injected_by_ai = False
         logger.warning("AI chaos selector failed, falling back to random", extra={"error": str(e)})
 
-    # Execute chaos and capture fallback status
-    fallback_used = execute_chaos(stressor)
+    return {
+        "stressor": stressor,
+        "cpu": cpu,
+        "mem": mem,
+        "prediction": prediction,
+        "confidence": confidence,
+        "injected_by_ai": injected_by_ai
+    }
+
+
+def record_chaos(value, plan, fallback_used):
+    stressor = plan["stressor"]
+    injected_by_ai = plan["injected_by_ai"]
 
     # Increment Prometheus metric if fallback occurred
     if fallback_used:
@@ -179,7 +300,7 @@ def process_data():
     logger.info("Chaos event", extra={
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "value": value,
-        "confidence": confidence,
+        "confidence": plan["confidence"],
         "fallback_used": fallback_used,
         "stressor": stressor,
         "injected_by_ai": injected_by_ai
@@ -191,95 +312,380 @@ def process_data():
     #predicted_success = predict_success(stressor, value)
     #logger.info("Predicted success", extra={"stressor": stressor, "value": value, "prediction": predicted_success})
 
+
+#Per-minute outcome rollups behind /stats (ROLLUP_PATH persists them)
+ROLLUPS = Rollups()
+
+def record_outcome(plan, outcome, started):
+    ROLLUPS.record(plan["stressor"], plan["injected_by_ai"], outcome["success"], outcome["fallback_used"],
+                   plan["confidence"], time.perf_counter() - started)
+
+
+def run_resilient(value, stressor, deadline=None):
+    """
+    Runs resilient_operation with the fallback; returns (body, status, event outcome).
+    """
+    breaker = CIRCUIT_BREAKERS.get(stressor)
+    if not breaker.allow():
+        return fallback_response(value, "circuit_open")
+    run = RETRY_POLICY.start(deadline)
     try:
-        result = resilient_operation(value, stressor)
+        result = RETRY_POLICY.retrying(run)(resilient_operation, value, stressor, run)
+        breaker.record(True)
         RETRY_SUCCESS.inc()
-        log_chaos_to_csv(
-            stressor=stressor,
-            value=value,
-            result=result,
-            success=True,
-            fallback_used=False,
-            cpu=sys_metrics["cpu_percent"],
-            mem=sys_metrics["memory_percent"],
-            prediction=prediction,
-            confidence=confidence,
-            injected_by_ai = injected_by_ai
-        )
         #logger.info("Retry succeeded", extra={"result": result})
-        return jsonify({"result": result, "retries_used": True, "confidence": confidence})
+        return {"result": result, "retries_used": True}, 200, \
+            {"result": result, "success": True, "fallback_used": False}
     except RetryError:
-        fallback_result = value * 1.5
-        FALLBACK_USED.inc()
-        log_chaos_to_csv(
-            stressor=stressor,
-            value=value,
-            result=fallback_result,
-            success=True,
-            fallback_used=True,
-            cpu=sys_metrics["cpu_percent"],
-            mem=sys_metrics["memory_percent"],
-            prediction=prediction,
-            confidence=confidence,
-            injected_by_ai = injected_by_ai
-        )
-        #logger.warning("Fallback used after retries failed", extra={"fallback_result": fallback_result})
-        return jsonify({"warning": "Fallback used after retries failed.", "result": fallback_result, "retries_used": False, "confidence": confidence}), 200
+        breaker.record(False)
+        return fallback_response(value, run.give_up_reason)
     except Exception as e:
-        log_chaos_to_csv(
-            stressor=stressor,
-            value=value,
-            result=None,
-            success=False,
-            fallback_used=False,
-            cpu=sys_metrics["cpu_percent"],
-            mem=sys_metrics["memory_percent"],
-            prediction=prediction,
-            confidence=confidence,
-            injected_by_ai = injected_by_ai
-        )
+        breaker.record(False)
         logger.exception("Unhandled exception", extra={"error": str(e)})
-        return jsonify({"error": f"Internal error: {str(e)}"}), 500
+        return {"error": f"Internal error: {str(e)}"}, 500, \
+            {"result": None, "success": False, "fallback_used": False}
+    finally:
+        RETRY_ATTEMPTS.observe(run.attempts)
+
 
+def fallback_response(value, reason):
+    """
+    value * 1.5 once the retry policy gives up (attempts, deadline or budget)
+    or the circuit is open.
+    """
+    fallback_result = value * 1.5
+    FALLBACK_USED.inc()
+    #logger.warning("Fallback used after retries failed", extra={"fallback_result": fallback_result})
+    return {"warning": "Fallback used after retries failed.", "result": fallback_result, "retries_used": False,
+            "fallback_reason": reason}, 200, \
+        {"result": fallback_result, "success": True, "fallback_used": True}
+
+
+MAX_BATCH_SIZE = int(os.environ.get("RESILIENT_MAX_BATCH_SIZE", "100"))
+
+def batch_weight():
+    # One admission slot per item (invalid or oversized batches are rejected cheaply, 1 slot)
+    data = request.get_json(force=True, silent=True)
+    values = data.get("values") if isinstance(data, dict) else None
+    return len(values) if isinstance(values, list) and 0 < len(values) <= MAX_BATCH_SIZE else 1
+
+#Batch endpoint - one vectorized model call per batch, chaos and retries per item
+@app.route('/resilient-api/process-batch', methods=['POST'])
+@admission_controlled(weight=batch_weight)
+def process_batch():
+    data = request.get_json(force=True, silent=True) or {}
+    values = data.get("values")
+    if not isinstance(values, list) or not values:
+        logger.warning("Invalid batch input", extra={"input": data})
+        return jsonify({"error": "Invalid input: 'values' must be a non-empty array"}), 400
+    if len(values) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large: at most {MAX_BATCH_SIZE} values"}), 400
+
+    RESILIENT_REQUESTS.inc(len(values))
+    valid = [i for i, v in enumerate(values) if isinstance(v, (int, float))]
+    valid_values = [values[i] for i in valid]
+
+    with stage("metrics"):
+        sys_metrics = get_system_metrics()
+    cpu = sys_metrics["cpu_percent"]
+    mem = sys_metrics["memory_percent"]
 
-#Chaos selector using AI
-CHAOS_SELECTOR = train_chaos_selector()
+    try:
+        with stage("predict"):
+            predictions = predict_with_confidence_batch("none", valid_values, cpu, mem)
+    except Exception as e:
+        logger.exception("Batch prediction failed", extra={"error": str(e)})
+        predictions = [(True, 0.5)] * len(valid_values)
+    confidences = [confidence for _, confidence in predictions]
+
+    try:
+        with stage("select"):
+            stressors = select_ai_stressors(valid_values, cpu, mem, confidences)
+        injected_by_ai = True
+    except Exception as e:
+        stressors = [random.choice(["timeout", "latency", "failure", "none"]) for _ in valid_values]
+        injected_by_ai = False
+        logger.warning("AI chaos selector failed, falling back to random", extra={"error": str(e)})
+
+    results = [{"error": "Invalid input: 'value' must be a number", "status": 400} for _ in values]
+    events = []
+    for i, value, (prediction, confidence), stressor in zip(valid, valid_values, predictions, stressors):
+        started = time.perf_counter()
+        deadline_at = time.monotonic() + RETRY_POLICY.deadline_for()
+        with stage("chaos"):
+            if execute_chaos(stressor, deadline_at):
+                FALLBACK_TOTAL.inc()
+        with stage("operation"):
+            body, status, outcome = run_resilient(value, stressor, deadline_at - time.monotonic())
+        ROLLUPS.record(stressor, injected_by_ai, outcome["success"], outcome["fallback_used"],
+                       confidence, time.perf_counter() - started)
+        body.update({"confidence": confidence, "stressor": stressor, "status": status})
+        results[i] = body
+        events.append(dict(
+            stressor=stressor, value=value, cpu=cpu, mem=mem,
+            prediction=prediction, confidence=confidence, injected_by_ai=injected_by_ai,
+            **outcome
+        ))
+
+    # Metrics and logging amortised over the batch
+    origin = "ai" if injected_by_ai else "random"
+    injected = AI_INJECTED if injected_by_ai else RANDOM_INJECTED
+    for stressor, count in Counter_(stressors).items():
+        injected.labels(stressor=stressor).inc(count)
+        CHAOS_ORIGIN.labels(origin=origin, stressor=stressor).inc(count)
+    with stage("log"):
+        log_chaos_batch(events)
+        logger.info("Chaos batch", extra={
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "size": len(values),
+            "invalid": len(values) - len(valid),
+            "stressors": dict(Counter_(stressors)),
+            "injected_by_ai": injected_by_ai
+        })
+    return jsonify({"results": results})
+
+
+#Chaos selector using AI (compiled to NumPy node arrays for per-request scoring)
+#Loaded from its artifact at startup; until one exists every AI pick is "none"
+STRESSOR_NAMES = {v: k for k, v in STRESSOR_MAP.items()}
+#CHAOS_SELECTOR_MODE=bandit uses an online LinUCB bandit that learns from every logged outcome
+CHAOS_SELECTOR_MODE = os.environ.get("CHAOS_SELECTOR_MODE", "forest")
+CHAOS_SELECTOR = ConstantSelector()
+CHAOS_SELECTOR_VERSION = 0
+CHAOS_SELECTOR_READY = False
+_SELECTOR_LOCK = threading.Lock()
+#The bandit keeps learning under one version, so its picks are never cached
+SELECTOR_CACHE = PredictionCache("chaos_selector", ["value", "cpu", "mem", "confidence"]) \
+    if PREDICTION_CACHE_ENABLED and CHAOS_SELECTOR_MODE != "bandit" else None
 
 def select_ai_stressor(value, cpu, mem, confidence):
-    input_df = pd.DataFrame([{
-        "value": value,
-        "cpu": cpu,
-        "mem": mem,
-        "confidence": confidence
-    }])
-    stressor_code = CHAOS_SELECTOR.predict(input_df)[0]
-    reverse_map = {v: k for k, v in STRESSOR_MAP.items()}
-    return reverse_map.get(stressor_code, "none")
+    cache = SELECTOR_CACHE
+    if cache is not None:
+        # Version read before the selector: install_chaos_selector bumps it after
+        # the swap, so an entry is never filed under a newer version than its model
+        key = cache.key(CHAOS_SELECTOR_VERSION, value, cpu, mem, confidence)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    selector = CHAOS_SELECTOR   #one reference per call, retraining swaps the global
+    stressor_code = selector.predict_row([value, cpu, mem, confidence])
+    stressor = STRESSOR_NAMES.get(int(stressor_code), "none")
+    if cache is not None:
+        cache.put(key, stressor)
+    return stressor
+
+def select_ai_stressors(values, cpu, mem, confidences):
+    """
+    select_ai_stressor for a batch, one selector call for all rows.
+    """
+    if not values:
+        return []
+    selector = CHAOS_SELECTOR
+    X = [[value, cpu, mem, confidence] for value, confidence in zip(values, confidences)]
+    return [STRESSOR_NAMES.get(int(code), "none") for code in selector.predict(X)]
+
+def swap_chaos_selector(model, persist=True):
+    """
+    Compiles and validates a retrained selector, then atomically makes it the serving one.
+    """
+    selector = compile_selector(model)
+    if persist:
+        save_selector(selector, SELECTOR_PATH)
+    return install_chaos_selector(selector)
+
+def install_chaos_selector(selector):
+    global CHAOS_SELECTOR, CHAOS_SELECTOR_VERSION, CHAOS_SELECTOR_READY
+    code = selector.predict_row([10.0, 50.0, 50.0, 0.5])
+    if int(code) not in STRESSOR_NAMES:
+        raise ValueError(f"Chaos selector returned unknown stressor code {code}")
+    with _SELECTOR_LOCK:
+        CHAOS_SELECTOR = selector
+        CHAOS_SELECTOR_VERSION += 1
+        CHAOS_SELECTOR_READY = True
+    record_ready()
+    return CHAOS_SELECTOR_VERSION
+
+def reload_chaos_selector(path=SELECTOR_PATH):
+    selector = load_selector(path)
+    if selector is None or getattr(CHAOS_SELECTOR, "digest", None) == selector.digest:
+        return False
+    install_chaos_selector(selector)
+    return True
+
+#Background training - requests never wait for a fit
+TRAINING_JOBS = TrainingJobs()
+
+def _train_success_job(job):
+    pipeline = build_pipeline(job=job)
+    job.set_stage("swapping")
+    swap_pipeline(pipeline)
+    record_ready()
+    return pipeline.describe()
+
+def _bootstrap_online_job(job):
+    result = bootstrap_online_learning(job)
+    record_ready()
+    return result
+
+def _train_selector_job(job):
+    job.set_stage("fitting")
+    selector = train_chaos_selector()
+    job.set_stage("swapping")
+    return {"version": swap_chaos_selector(selector)}
+
+def _feature_importance_job(job):
+    #step 1: Load and prepare traiing data 
+    job.set_stage("loading")
+    df = read_event_log("chaos_events1.csv", columns=["value", "cpu", "mem", "confidence", "success"])
+    X = df[["value", "cpu", "mem", "confidence"]]  #My actual features
+    y = df["success"]      #Target variable
+
+    #Training the model (not published, only plotted)
+    job.set_stage("fitting")
+    model = train_model(X, y)
+    job.set_stage("plotting")
+    plot_feature_importance(model, X.columns)
+    return {"plot": "/feature-importance"}
+
+TRAINING_KINDS = {
+    "success": _train_success_job,
+    "chaos-selector": _train_selector_job,
+}
+if CHAOS_SELECTOR_MODE == "bandit":
+    del TRAINING_KINDS["chaos-selector"]   #the bandit learns continuously
+
+#Cold start: serve from persisted artifacts; anything missing is trained in the
+#background once start_worker_services runs (predictions default to 0.5 confidence
+#and AI chaos to "none" meanwhile)
+#LEARNING_MODE=online resumes the incrementally trained model instead
+STARTUP_SECONDS = Gauge(
+    "resilient_startup_seconds", "Seconds from process start to serving (import) and to warm models (ready)",
+    ["phase"], multiprocess_mode="livemax"
+)
+PROCESS_STARTED = psutil.Process().create_time()
+WARMUP_JOBS = []
+_READY_RECORDED = False
+
+def models_status():
+    return {"success_model": pipeline_ready(), "chaos_selector": CHAOS_SELECTOR_READY}
+
+def record_ready():
+    global _READY_RECORDED
+    if not _READY_RECORDED and all(models_status().values()):
+        _READY_RECORDED = True
+        STARTUP_SECONDS.labels(phase="ready").set(time.time() - PROCESS_STARTED)
+
+#TRAINING_WINDOW_MODE=time|reservoir: retraining uses a bounded window of the history
+start_training_window()
+
+if LEARNING_MODE == "online":
+    start_online_learning()
+else:
+    load_pipeline()
+
+if CHAOS_SELECTOR_MODE == "bandit":
+    install_chaos_selector(start_chaos_bandit())
+else:
+    reload_chaos_selector()
+
+STARTUP_SECONDS.labels(phase="import").set(time.time() - PROCESS_STARTED)
+record_ready()
+
+def _job_response(job, wait):
+    if wait:
+        TRAINING_JOBS.wait(job)
+    status = 200 if job.done else 202
+    body = job.to_dict()
+    body["status_url"] = f"/train-model/jobs/{job.id}"
+    return jsonify(body), status
+
+def metrics_payload():
+    """
+    Prometheus exposition; under gunicorn (PROMETHEUS_MULTIPROC_DIR set) it
+    aggregates the per-worker files instead of this process's registry.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
 
 #Metrics endpoint
 @app.route("/metrics")
 def metrics():
-    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+    return metrics_payload(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
+
+#Readiness: 200 once the success model and chaos selector are loaded or trained
+@app.route("/ready")
+def ready():
+    models = models_status()
+    ready = all(models.values())
+    body = {
+        "ready": ready,
+        "models": models,
+        "circuits": CIRCUIT_BREAKERS.states(),
+        "chaos_selector_version": CHAOS_SELECTOR_VERSION,
+        "warmup_jobs": [job.to_dict() for job in WARMUP_JOBS if not job.done],
+    }
+    return jsonify(body), 200 if ready else 503
 
 
-#Train-model end point
-@app.route("/train-model", methods=["POST"])
-def train_model_endpoint():
+#Chaos outcome rollups: GET /stats?minutes=5&by=stressor,origin
+#(by: any of stressor, origin, outcome)
+@app.route("/stats")
+def stats():
+    minutes = request.args.get("minutes", default=5, type=int)
+    by = [dim for dim in request.args.get("by", "stressor,origin").split(",") if dim]
     try:
-        train_model()
-        return jsonify({"status": "Model trained successfully"})
-    except Exception as e:
-        logger.warning("Model training failed", extra={"error": str(e)})
-        return jsonify({"error": str(e)}), 500 # Default optimistic guess
+        groups = ROLLUPS.query(minutes, by)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"minutes": minutes, "by": by, "groups": groups})
+
+
+#Sampling profiler: GET /admin/profile?seconds=10 returns collapsed stacks of this
+#process (flamegraph.pl / speedscope input); one profile at a time
+@app.route("/admin/profile")
+def admin_profile():
+    seconds = request.args.get("seconds", default=10.0, type=float)
+    interval = request.args.get("interval", default=None, type=float)
+    try:
+        profile = PROFILER.profile(seconds, interval)
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    return profile, 200, {"Content-Type": "text/plain; charset=utf-8"}
 
 
-    """
-    try:
-        train_model()
-        return jsonify({"status": "Model trained successfully"})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-        """
+#Train-model end point
+#Submits a background job: {"model": "success" | "chaos-selector"}, ?wait=true blocks until done
+@app.route("/train-model", methods=["POST"])
+def train_model_endpoint():
+    data = request.get_json(silent=True) or {}
+    kind = data.get("model", request.args.get("model", "success"))
+    if kind not in TRAINING_KINDS:
+        return jsonify({"error": f"Unknown model '{kind}'", "models": list(TRAINING_KINDS)}), 400
+    job = TRAINING_JOBS.submit(kind, TRAINING_KINDS[kind])
+    logger.info("Training job submitted", extra={"job_id": job.id, "kind": kind})
+    return _job_response(job, request.args.get("wait") == "true")
+
+@app.route("/train-model/jobs", methods=["GET"])
+def list_training_jobs():
+    return jsonify([job.to_dict() for job in TRAINING_JOBS.list()])
+
+@app.route("/train-model/jobs/<job_id>", methods=["GET"])
+def training_job_status(job_id):
+    job = TRAINING_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/train-model/jobs/<job_id>", methods=["DELETE"])
+def cancel_training_job(job_id):
+    job = TRAINING_JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
 
 #for viewing the plot
 @app.route("/feature-importance")
@@ -292,25 +698,44 @@ def serve_feature_importance():
 
 @app.route("/generate-feature-importance", methods=["GET", "POST"])
 def generate_feature_importance():
-    try:
-        #step 1: Load and prepare traiing data 
-        df = pd.read_csv("chaos_events1.csv")
-        X = df[["value", "cpu", "mem", "confidence"]]  #My actual features
-        y = df["success"]      #Target variable
-
-        #Training the model
-        model = train_model(X, y)
-        plot_feature_importance(model, X.columns)
+    job = TRAINING_JOBS.submit("feature-importance", _feature_importance_job)
+    return _job_response(job, request.args.get("wait") == "true")
+
+
+#Multi-worker serving (gunicorn.conf.py): models are loaded once in the master
+#and shared copy-on-write. The import starts no threads (they would not survive the
+#fork, and locks they held would stay locked in the worker): these run in each
+#worker after fork / before exit, and in-process for app.run and async_app
+def start_worker_services():
+    start_async_logging()
+    SYSTEM_METRICS.start()
+    if ROLLUP_PATH:
+        ROLLUPS.start_persisting()
+    if LEARNING_MODE == "online":
+        if not online_learning_started():   #no snapshot at import
+            WARMUP_JOBS.append(TRAINING_JOBS.submit("online-bootstrap", _bootstrap_online_job))
+    else:
+        watch_artifact(PIPELINE_PATH, _reload_pipeline)
+        # Saved since the import (e.g. by the worker this one replaces) or trained by one worker
+        if not pipeline_ready() and not reload_pipeline() and claim_warmup():
+            WARMUP_JOBS.append(TRAINING_JOBS.submit("success", _train_success_job))
+    if CHAOS_SELECTOR_MODE != "bandit":
+        watch_artifact(SELECTOR_PATH, reload_chaos_selector)
+        if not CHAOS_SELECTOR_READY and not reload_chaos_selector() and claim_warmup():
+            WARMUP_JOBS.append(TRAINING_JOBS.submit("chaos-selector", _train_selector_job))
+    record_ready()
 
-        #step 3: plotting feature importance using correct feature names
-        #feature_names = ["value", "cpu", "mem", "confidence"]
-        #print("[DEBUG] Plotting feature importance")
+def _reload_pipeline(path):
+    if reload_pipeline(path):
+        record_ready()
 
-        return jsonify({"status": "Plot generated"})
-    except Exception as e:
-        logger.error("Plot generation failed", extra={"error": str(e)})
-        return jsonify({"error": str(e)}), 500
+def stop_worker_services():
+    close_event_writers()
+    SYSTEM_METRICS.stop()
 
 
 if __name__ == '__main__':
+    #Turn SIGTERM (docker stop) into a normal exit so the event writer flushes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    start_worker_services()
     app.run(host='0.0.0.0', port=5002)
@@ -0,0 +1,168 @@
+#ASGI/asyncio variant of the resilient API
+#Same pipeline as app.py (validation, metrics, prediction, AI chaos selection,
+#retries, fallback and event logging), but injected latency, base latency and
+#retry waits are asyncio sleeps, so in-flight chaos requests don't pin threads.
+#Chaos stressors that do occupy a thread (CPU burn, fsync) run on a dedicated pool
+#of ASYNC_CHAOS_THREADS threads (default: one per CPU).
+#
+#   uvicorn async_app:app --host 0.0.0.0 --port 5002
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from tenacity import RetryError
+from prometheus_client import CONTENT_TYPE_LATEST
+
+# Models, metrics, logger and the shared request steps live in the Flask app module
+from app import (
+    logger, RESILIENT_REQUESTS, RETRY_SUCCESS,
+    plan_chaos, record_chaos, record_outcome, inject_stressor, operation_result,
+    log_chaos_to_csv, metrics_payload, RETRY_POLICY, CIRCUIT_BREAKERS, fallback_response,
+    ADMISSION, overloaded_response, ROLLUPS, start_worker_services, stop_worker_services,
+)
+from profiling import stage, RETRY_ATTEMPTS, PROFILER, ProfilerBusy
+from retry_policy import DeadlineExceeded
+from chaos import execute_chaos_async
+
+ASYNC_CHAOS_THREADS = int(os.environ.get("ASYNC_CHAOS_THREADS", str(os.cpu_count() or 1)))
+CHAOS_EXECUTOR = ThreadPoolExecutor(max_workers=ASYNC_CHAOS_THREADS, thread_name_prefix="chaos")
+
+
+# Same policy (and budget) as resilient_operation; AsyncRetrying waits with asyncio.sleep
+async def resilient_operation_async(value, stressor, run):
+    delay = inject_stressor(value, stressor)  # Injected + base latency
+    if delay > run.remaining():
+        await asyncio.sleep(max(0.0, run.remaining()))
+        raise DeadlineExceeded("Request deadline exceeded")
+    await asyncio.sleep(delay)
+    return operation_result(value)
+
+
+async def run_resilient_async(value, stressor, deadline=None):
+    breaker = CIRCUIT_BREAKERS.get(stressor)
+    if not breaker.allow():
+        return fallback_response(value, "circuit_open")
+    run = RETRY_POLICY.start(deadline)
+    try:
+        result = await RETRY_POLICY.async_retrying(run)(resilient_operation_async, value, stressor, run)
+        breaker.record(True)
+        RETRY_SUCCESS.inc()
+        return {"result": result, "retries_used": True}, 200, \
+            {"result": result, "success": True, "fallback_used": False}
+    except RetryError:
+        breaker.record(False)
+        return fallback_response(value, run.give_up_reason)
+    except Exception as e:
+        breaker.record(False)
+        logger.exception("Unhandled exception", extra={"error": str(e)})
+        return {"error": f"Internal error: {str(e)}"}, 500, \
+            {"result": None, "success": False, "fallback_used": False}
+    finally:
+        RETRY_ATTEMPTS.observe(run.attempts)
+
+
+def admission_controlled(endpoint):
+    # Same limiter as the Flask app; release() runs on the event loop thread
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        if ADMISSION is None:
+            return await endpoint(request)
+        started = ADMISSION.try_acquire()
+        if started is None:
+            body, status, headers = overloaded_response()
+            return JSONResponse(body, status_code=status, headers=headers)
+        try:
+            return await endpoint(request)
+        finally:
+            ADMISSION.release(started)
+    return wrapper
+
+
+@admission_controlled
+async def process_data(request):
+    RESILIENT_REQUESTS.inc()
+
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    value = data.get("value") if isinstance(data, dict) else None
+
+    if value is None or not isinstance(value, (int, float)):
+        logger.warning("Invalid input", extra={"input": data})
+        return JSONResponse({"error": "Invalid input: 'value' must be a number"}, status_code=400)
+
+    plan = plan_chaos(value)
+    started = time.perf_counter()
+    try:
+        deadline = float(request.headers["X-Deadline-Ms"]) / 1000.0
+    except (KeyError, ValueError):
+        deadline = None
+    deadline_at = time.monotonic() + RETRY_POLICY.deadline_for(deadline)
+
+    with stage("chaos"):
+        fallback_used = await execute_chaos_async(plan["stressor"], CHAOS_EXECUTOR, deadline_at)
+    record_chaos(value, plan, fallback_used)
+
+    with stage("operation"):
+        body, status, outcome = await run_resilient_async(value, plan["stressor"], deadline_at - time.monotonic())
+    body["confidence"] = plan["confidence"]
+    with stage("log"):
+        record_outcome(plan, outcome, started)
+        log_chaos_to_csv(value=value, **plan, **outcome)
+    return JSONResponse(body, status_code=status)
+
+
+async def metrics(request):
+    return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def stats(request):
+    try:
+        minutes = int(request.query_params.get("minutes", 5))
+        by = [dim for dim in request.query_params.get("by", "stressor,origin").split(",") if dim]
+        groups = ROLLUPS.query(minutes, by)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse({"minutes": minutes, "by": by, "groups": groups})
+
+
+async def admin_profile(request):
+    try:
+        seconds = float(request.query_params.get("seconds", 10.0))
+        interval = float(request.query_params["interval"]) if "interval" in request.query_params else None
+    except ValueError:
+        return JSONResponse({"error": "seconds and interval must be numbers"}, status_code=400)
+    try:
+        # Sampling sleeps between stack walks, so it runs in a thread
+        profile = await asyncio.to_thread(PROFILER.profile, seconds, interval)
+    except ProfilerBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return Response(profile, media_type="text/plain")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Background threads start per server process, not at import (see app.start_worker_services)
+    start_worker_services()
+    yield
+    stop_worker_services()
+
+
+app = Starlette(routes=[
+    Route("/resilient-api/process", process_data, methods=["POST"]),
+    Route("/metrics", metrics),
+    Route("/stats", stats),
+    Route("/admin/profile", admin_profile),
+], lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5002, backlog=4096)
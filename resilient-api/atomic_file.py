@@ -0,0 +1,29 @@
+#Atomic artifact writes
+#The file is written to a uniquely named temp file next to `path` (mkstemp, so
+#concurrent writers - gunicorn workers, a save overlapping a training job - never
+#share one) and renamed over `path` only once it is complete. Readers see either
+#the old or the new artifact, never a mix, and the temp file is fsynced first so a
+#crash right after the rename can't leave an empty file behind.
+import contextlib
+import os
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb"):
+    """
+    Yields a file object; on success it replaces `path`, on error it is removed.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())   #the data is on disk before the rename can be
+        os.chmod(tmp_path, 0o644)   #mkstemp creates 0600; keep the usual artifact permissions
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,140 @@
+#Contextual-bandit chaos selector (LinUCB)
+#One ridge regression per stressor (arm) predicts how much a stressor reveals
+#about weaknesses in the context [1, value, cpu, mem, confidence]; the stressor
+#with the highest upper confidence bound is injected. Every logged outcome updates
+#its arm with a Sherman-Morrison rank-one update of A^-1, so learning is O(d^2)
+#per event regardless of history. State is snapshotted to an .npz.
+#
+#Reward: the success model's prediction error on the observed outcome,
+#|success - P(success)|. A failure it was confident would succeed, or a success it
+#expected to fail, scores close to 1; outcomes it predicts well (including
+#stressors that always end in the fallback, which the model learns) score near 0.
+import os
+import threading
+import time
+import numpy as np
+from atomic_file import atomic_write
+
+BANDIT_PATH = os.environ.get("CHAOS_BANDIT_PATH", "chaos_bandit.npz")
+BANDIT_ALPHA = float(os.environ.get("CHAOS_BANDIT_ALPHA", "1.0"))       #exploration weight
+BANDIT_SNAPSHOT_EVERY = int(os.environ.get("CHAOS_BANDIT_SNAPSHOT_EVERY", "1000"))     #events
+BANDIT_SNAPSHOT_INTERVAL = float(os.environ.get("CHAOS_BANDIT_SNAPSHOT_INTERVAL", "60"))  #seconds
+
+ARMS = ["timeout", "latency", "failure", "none"]   #index = STRESSOR_MAP code
+N_FEATURES = 5
+
+
+def context(value, cpu, mem, confidence):
+    # Roughly unit-scaled so one exploration weight fits all features
+    return np.array((1.0, max(-10.0, min(10.0, value / 100.0)), cpu / 100.0, mem / 100.0, confidence))
+
+
+def reward(success, confidence):
+    return abs(float(success) - confidence)
+
+
+class LinUCBSelector:
+    """
+    Disjoint LinUCB over ARMS. predict_row/predict mirror the compiled selectors.
+    """
+
+    def __init__(self, alpha=BANDIT_ALPHA, n_arms=len(ARMS), n_features=N_FEATURES):
+        self.alpha = alpha
+        # theta and A^-1 of all arms are views into one (arms * (1 + d), d) matrix,
+        # so scoring a context is a single matrix-vector product
+        self._weights = np.zeros((n_arms * (1 + n_features), n_features))
+        self.theta = self._weights[:n_arms]
+        self.A_inv = self._weights[n_arms:].reshape(n_arms, n_features, n_features)
+        self.A_inv[:] = np.eye(n_features)
+        self.b = np.zeros((n_arms, n_features))
+        self.counts = np.zeros(n_arms, dtype=np.int64)
+        self.updates = 0
+        self._lock = threading.Lock()   #update() changes theta/A^-1 in place; scoring reads them under it too
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def scores(self, x):
+        n_arms, d = self.b.shape
+        with self._lock:
+            q = self._weights @ x
+        return q[:n_arms] + self.alpha * np.sqrt(q[n_arms:].reshape(n_arms, d) @ x)
+
+    def predict_row(self, row):
+        return int(self.scores(context(*row)).argmax())
+
+    def predict(self, X):
+        X = np.array([context(*row) for row in X]).reshape(-1, self.b.shape[1])
+        with self._lock:
+            A_inv_X = np.einsum("aij,nj->nai", self.A_inv, X)
+            mean = X @ self.theta.T
+        ucb = mean + self.alpha * np.sqrt(np.einsum("nai,ni->na", A_inv_X, X))
+        return np.argmax(ucb, axis=1)
+
+    def update(self, arm, x, r):
+        """
+        Adds one (context, reward) observation to an arm: Sherman-Morrison update of A^-1.
+        """
+        with self._lock:
+            A_inv = self.A_inv[arm]
+            A_inv_x = A_inv @ x
+            A_inv -= np.outer(A_inv_x, A_inv_x) / (1.0 + x @ A_inv_x)
+            self.b[arm] += r * x
+            self.theta[arm] = A_inv @ self.b[arm]
+            self.counts[arm] += 1
+            self.updates += 1
+
+    def update_from_events(self, rows):
+        """
+        Learns from logged event rows (dicts as written by log_chaos_to_csv).
+        """
+        for row in rows:
+            arm = ARMS.index(row["stressor"]) if row["stressor"] in ARMS else ARMS.index("none")
+            x = context(row["value"], row["cpu"], row["mem"], row["confidence"])
+            self.update(arm, x, reward(row["success"], row["confidence"]))
+
+    def save(self, path=BANDIT_PATH):
+        with self._lock:
+            state = dict(alpha=self.alpha, A_inv=self.A_inv.copy(), b=self.b.copy(),
+                         counts=self.counts.copy(), updates=self.updates)
+        with atomic_write(path) as f:
+            np.savez(f, **state)
+
+    @classmethod
+    def load(cls, path=BANDIT_PATH):
+        try:
+            with np.load(path, allow_pickle=False) as state:
+                bandit = cls(alpha=float(state["alpha"]), n_arms=state["b"].shape[0], n_features=state["b"].shape[1])
+                bandit.A_inv[:] = state["A_inv"]
+                bandit.b = state["b"].copy()
+                bandit.counts = state["counts"].copy()
+                bandit.updates = int(state["updates"])
+        except (OSError, KeyError, ValueError):
+            return None
+        bandit.theta[:] = np.einsum("aij,aj->ai", bandit.A_inv, bandit.b)
+        return bandit
+
+
+class BanditTrainer:
+    """
+    Feeds event-writer batches to the bandit and snapshots it periodically.
+    """
+
+    def __init__(self, bandit, snapshot_path=BANDIT_PATH):
+        self.bandit = bandit
+        self.snapshot_path = snapshot_path
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+
+    def __call__(self, rows):
+        self.bandit.update_from_events(rows)
+        self._since_snapshot += len(rows)
+        if self._since_snapshot >= BANDIT_SNAPSHOT_EVERY or \
+                time.monotonic() - self._last_snapshot >= BANDIT_SNAPSHOT_INTERVAL:
+            self.snapshot()
+
+    def snapshot(self):
+        self.bandit.save(self.snapshot_path)
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
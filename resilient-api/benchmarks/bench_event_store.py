@@ -0,0 +1,62 @@
+#Benchmark: training-load time from CSV vs the columnar event store
+#   python benchmarks/bench_event_store.py --rows 1000000 2000000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from event_store import ColumnarEventStore, migrate_csv
+from feature_extraction import STRESSOR_MAP
+from synthetic import write_events_csv
+
+TRAINING_COLUMNS = ["value", "cpu", "mem", "confidence", "success"]
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def load_csv(path):
+    # What training did before: parse everything, then coerce types
+    df = pd.read_csv(path)
+    df["stressor_type"] = df["stressor"].map(STRESSOR_MAP)
+    for col in ["value", "cpu", "mem", "confidence"]:
+        df[col] = df[col].astype(float)
+    df["success"] = df["success"].astype(int)
+    return df[TRAINING_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'csv_s':>8} {'store_s':>8} {'window_s':>9} {'speedup':>8} {'migrate_s':>9}")
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = write_events_csv(os.path.join(tmp, "events.csv"), n_rows)
+            store = ColumnarEventStore(os.path.join(tmp, "store"))
+            started = time.perf_counter()
+            migrate_csv([csv_path], store)
+            migrate_s = time.perf_counter() - started
+
+            csv_s = best_of(lambda: load_csv(csv_path), args.repeat)
+            store_s = best_of(lambda: store.read(TRAINING_COLUMNS), args.repeat)
+            # Last hour only (the synthetic log has 4 events/s)
+            end = pd.Timestamp("2025-09-01", tz="UTC") + pd.Timedelta(milliseconds=250 * n_rows)
+            window_s = best_of(lambda: store.read(TRAINING_COLUMNS, start=end - pd.Timedelta(hours=1)), args.repeat)
+            print(f"{n_rows:>10} {csv_s:>8.3f} {store_s:>8.3f} {window_s:>9.4f} {csv_s / store_s:>7.1f}x {migrate_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
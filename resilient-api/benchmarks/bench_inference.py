@@ -0,0 +1,88 @@
+#Microbenchmark: per-row scoring through sklearn/pandas vs the compiled NumPy models
+#   python benchmarks/bench_inference.py --rows 10000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from compiled_models import CompiledForest
+from feature_extraction import FEATURE_COLS, make_scaler
+from pipeline import PredictionPipeline
+from synthetic import generate_events
+
+SELECTOR_COLS = ["value", "cpu", "mem", "confidence"]
+
+
+def per_call_us(fn, inputs):
+    started = time.perf_counter()
+    for item in inputs:
+        fn(item)
+    return (time.perf_counter() - started) / len(inputs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000, help="training rows")
+    parser.add_argument("--calls", type=int, default=2000, help="single-row calls timed")
+    args = parser.parse_args()
+
+    df = generate_events(args.rows)
+    df["stressor_type"] = df["stressor"].map({"timeout": 0, "latency": 1, "failure": 2, "none": 3})
+    df["response_time"] = 0.0
+    df["retry_attempts"] = 0
+    features = df[FEATURE_COLS].astype(float)
+
+    # Success model, fitted like train_model
+    scaler = make_scaler("standard")
+    X_scaled = scaler.fit_transform(features.to_numpy())
+    model = LogisticRegression(max_iter=1000).fit(X_scaled, df["success"])
+    pipeline = PredictionPipeline.from_scaler(FEATURE_COLS, scaler, model)
+    # The old per-request path (ddof=1); constant columns patched so it doesn't NaN, timing only
+    mean, std = features.mean(), features.std().replace(0.0, 1.0)
+
+    def legacy_logistic(row):
+        input_df = pd.DataFrame([dict(zip(FEATURE_COLS, row))])
+        return model.predict_proba(((input_df - mean) / std).to_numpy())[0][1]
+
+    def sklearn_logistic(row):
+        return model.predict_proba(scaler.transform(np.array([row])))[0][1]
+
+    compiled = pipeline.compiled
+    rows = features.to_numpy()[: args.calls]
+    sk_probs = model.predict_proba(scaler.transform(features.to_numpy()))[:, 1]
+    our_probs = compiled.predict_proba_matrix(features.to_numpy())
+
+    # Chaos selector, fitted like train_chaos_selector
+    forest = RandomForestClassifier().fit(df[SELECTOR_COLS], df["stressor_type"])
+    compiled_forest = CompiledForest(forest)
+    selector_rows = df[SELECTOR_COLS].to_numpy()[: args.calls]
+
+    def legacy_selector(row):
+        return forest.predict(pd.DataFrame([dict(zip(SELECTOR_COLS, row))]))[0]
+
+    sk_codes = forest.predict(df[SELECTOR_COLS])
+    our_codes = compiled_forest.predict(df[SELECTOR_COLS].to_numpy())
+    row_codes = np.array([compiled_forest.predict_row(row) for row in selector_rows])
+    proba_diff = np.abs(forest.predict_proba(df[SELECTOR_COLS]) - compiled_forest.predict_proba_matrix(df[SELECTOR_COLS].to_numpy())).max()
+
+    selector_calls = max(50, args.calls // 20)   # sklearn forest calls are slow
+    print(f"{'path':<36} {'us/call':>10}")
+    print(f"{'logistic: DataFrame (old)':<36} {per_call_us(legacy_logistic, rows):>10.1f}")
+    print(f"{'logistic: sklearn ndarray':<36} {per_call_us(sklearn_logistic, rows):>10.1f}")
+    print(f"{'logistic: compiled':<36} {per_call_us(compiled.predict_proba_row, rows):>10.1f}")
+    print(f"{'forest: DataFrame (old)':<36} {per_call_us(legacy_selector, selector_rows[:selector_calls]):>10.1f}")
+    print(f"{'forest: compiled row walk':<36} {per_call_us(compiled_forest.predict_row, selector_rows):>10.1f}")
+    print()
+    print(f"logistic max |p_sklearn - p_compiled| = {np.abs(sk_probs - our_probs).max():.3g}")
+    print(f"forest predictions identical: batch={bool((sk_codes == our_codes).all())} "
+          f"row={bool((row_codes == sk_codes[: len(row_codes)]).all())}, max proba diff = {proba_diff:.3g}")
+
+
+if __name__ == "__main__":
+    main()
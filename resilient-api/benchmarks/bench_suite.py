@@ -0,0 +1,229 @@
+#Benchmark suite for the resilient-api hot paths, with baselines and a regression gate
+#   python benchmarks/bench_suite.py                                # 1k .. 1M rows
+#   python benchmarks/bench_suite.py --rows 1000 10000000           # up to 10M rows
+#   python benchmarks/bench_suite.py --save-baseline                # record this machine's baseline
+#Log-size benchmarks (feature extraction, training) run once per --rows size on a
+#synthetic event log; per-call benchmarks (prediction, stressor selection, event
+#logging, the full /resilient-api/process request through the Flask test client
+#with chaos sleeps and CPU burns stubbed out) run once. Each reports the best wall
+#time of --repeat runs, throughput, and the peak traced allocation (tracemalloc,
+#measured in a separate run so tracing doesn't skew the timings). Nothing is timed
+#cold: the log-size paths first run once on a small log (so the pandas/sklearn
+#imports don't land in the smallest size) and each per-call benchmark runs once
+#untimed. Prediction and selection run with their caches off, so they time the
+#models, and event logging includes flushing the writer, so it times the write.
+#With a baseline (default benchmarks/results/baseline.json) the run exits 1 if
+#any benchmark got slower, or allocates more, by more than --threshold.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import write_events_csv
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "results", "baseline.json")
+STRESSORS = ["timeout", "latency", "failure", "none"]
+
+
+def measure(fn, repeat, warmup=False):
+    """
+    Best wall time of `repeat` runs, then one traced run for the allocation peak (MB).
+    """
+    if warmup:
+        fn()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def log_size_benchmarks(csv_path, selector_max_rows, n_rows):
+    from feature_extraction import extract_features_from_csv
+    import learning
+
+    learning.CSV_PATH = csv_path   #train_model reads the module's event log
+    benches = {
+        "extract_features_from_csv": lambda: extract_features_from_csv(csv_path),
+        "train_model": learning.train_model,
+    }
+    if n_rows <= selector_max_rows:
+        benches["train_chaos_selector"] = lambda: learning.train_chaos_selector(csv_path)
+    return benches
+
+
+def warm_up(workdir, n_rows=1000):
+    """
+    One pass over the log-size paths on a small log, so imports and first-call
+    setup aren't timed as part of the first --rows size.
+    """
+    csv_path = write_events_csv(os.path.join(workdir, "warmup.csv"), n_rows)
+    for fn in log_size_benchmarks(csv_path, n_rows, n_rows).values():
+        fn()
+    os.remove(csv_path)
+
+
+def prepare_models(n_rows):
+    """
+    Event log plus persisted success pipeline and chaos selector in the working
+    directory, so importing app serves from artifacts instead of warm-up training.
+    """
+    import learning
+    from compiled_models import compile_selector, save_selector, SELECTOR_PATH
+
+    learning.CSV_PATH = "chaos_events1.csv"
+    write_events_csv(learning.CSV_PATH, n_rows)
+    learning.train_model()
+    save_selector(compile_selector(learning.train_chaos_selector(learning.CSV_PATH)), SELECTOR_PATH)
+
+
+def per_call_benchmarks(calls, requests):
+    # App logs go through the real handlers, just not to the terminal (the handlers
+    # keep the stream, so it stays open)
+    with contextlib.redirect_stderr(open(os.devnull, "w")):
+        import app
+    import chaos
+    import learning
+    from event_writer import get_event_writer
+    from learning import predict_with_confidence, log_chaos_to_csv
+
+    rng = random.Random(42)
+    inputs = [(rng.choice(STRESSORS), rng.choice([10, 0, -5, 1.5, 7777777]),
+               rng.uniform(0, 100), rng.uniform(10, 60), rng.uniform(0.3, 1.0)) for _ in range(calls)]
+    client = app.app.test_client()
+
+    def predict():
+        # Repeated inputs would otherwise be served from the prediction cache
+        with mock.patch.object(learning, "SUCCESS_CACHE", None):
+            for stressor, value, cpu, mem, _ in inputs:
+                predict_with_confidence(stressor, value, cpu, mem)
+
+    def select():
+        with mock.patch.object(app, "SELECTOR_CACHE", None):
+            for _, value, cpu, mem, confidence in inputs:
+                app.select_ai_stressor(value, cpu, mem, confidence)
+
+    def log_events():
+        for stressor, value, cpu, mem, confidence in inputs:
+            log_chaos_to_csv(stressor, value, value * 2, True, False, cpu, mem, 1, confidence)
+        # Queued rows count only once they are on disk
+        get_event_writer(learning.CSV_PATH).flush()
+
+    def request_path():
+        for _, value, *_ in inputs[:requests]:
+            client.post("/resilient-api/process", json={"value": value})
+
+    def no_op(**params):
+        pass
+
+    stubs = contextlib.ExitStack()
+    stubs.enter_context(mock.patch("time.sleep", lambda seconds: None))
+    stubs.enter_context(mock.patch.dict(chaos.STRESSORS, {kind: no_op for kind in ("cpu", "memory", "latency", "io")}))
+    return {
+        "predict_with_confidence": (predict, calls),
+        "select_ai_stressor": (select, calls),
+        "log_chaos_to_csv": (log_events, calls),
+        "request_path": (request_path, min(requests, calls)),
+    }, stubs
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {base[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{result[metric] / base[metric] - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="event-log sizes for the log-size benchmarks")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per per-call benchmark")
+    parser.add_argument("--requests", type=int, default=500, help="requests through the Flask test client")
+    parser.add_argument("--model-rows", type=int, default=10_000, help="event-log size the served models are trained on")
+    parser.add_argument("--selector-max-rows", type=int, default=100_000,
+                        help="skip train_chaos_selector (a 100-tree forest) above this size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / memory growth")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<34} {'rows/calls':>11} {'best_s':>9} {'per_s':>12} {'peak_mb':>9}")
+
+    def report(key, n, seconds, peak_mb):
+        results[key] = {"n": n, "seconds": seconds, "per_second": n / seconds, "peak_mb": peak_mb}
+        print(f"{key:<34} {n:>11} {seconds:>9.4f} {n / seconds:>12.0f} {peak_mb:>9.1f}")
+
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)   #event logs and model artifacts stay out of the repo
+    try:
+        warm_up(workdir.name)
+        for n_rows in args.rows:
+            csv_path = write_events_csv(os.path.join(workdir.name, f"events_{n_rows}.csv"), n_rows)
+            repeat = args.repeat if n_rows < 1_000_000 else 1
+            for name, fn in log_size_benchmarks(csv_path, args.selector_max_rows, n_rows).items():
+                report(f"{name}[{n_rows}]", n_rows, *measure(fn, repeat))
+            os.remove(csv_path)
+
+        prepare_models(args.model_rows)
+        benches, stubs = per_call_benchmarks(args.calls, args.requests)
+        with stubs:
+            for name, (fn, n) in benches.items():
+                report(name, n, *measure(fn, args.repeat, warmup=True))
+    finally:
+        from event_writer import close_event_writers
+        close_event_writers()
+        os.chdir(BENCH_DIR)
+        workdir.cleanup()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "results": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} (run with --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%} vs baseline ({baseline['machine']}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions over {args.threshold:.0%} vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
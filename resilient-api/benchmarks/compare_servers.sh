@@ -0,0 +1,40 @@
+#!/bin/bash
+#Flask dev server vs the ASGI app under the existing locustfile.py (resilient API only)
+#   ./benchmarks/compare_servers.sh [users] [run_time]
+#Run from resilient-api/. Results: benchmarks/results/<server>_stats.csv
+USERS=${1:-500}
+RUN_TIME=${2:-60s}
+PORT=5102
+OUT=benchmarks/results
+mkdir -p "$OUT"
+
+run_locust() {
+    LOCUST_APIS=resilient locust -f locustfile.py --headless --only-summary \
+        -u "$USERS" -r 50 -t "$RUN_TIME" --host "http://localhost:$PORT" \
+        --csv "$OUT/$1" > "$OUT/$1.log" 2>&1
+}
+
+wait_ready() {
+    for _ in $(seq 1 60); do
+        curl -s -o /dev/null "http://localhost:$PORT/metrics" && return 0
+        sleep 1
+    done
+    echo "server did not come up" && exit 1
+}
+
+echo "[flask] python app.py (dev server) with $USERS users for $RUN_TIME"
+python -c "import app; app.app.run(host='0.0.0.0', port=$PORT)" > "$OUT/flask_server.log" 2>&1 &
+SERVER=$!
+wait_ready && run_locust flask
+kill $SERVER; wait $SERVER 2>/dev/null
+
+echo "[asgi] uvicorn async_app:app with $USERS users for $RUN_TIME"
+uvicorn async_app:app --host 0.0.0.0 --port $PORT --log-level warning --backlog 4096 > "$OUT/asgi_server.log" 2>&1 &
+SERVER=$!
+wait_ready && run_locust asgi
+kill $SERVER; wait $SERVER 2>/dev/null
+
+printf "\n%-6s %9s %9s %7s %7s %7s %7s\n" server requests failures rps p50_ms p95_ms p99_ms
+for server in flask asgi; do
+    awk -F, -v s="$server" '$2=="Aggregated" {printf "%-6s %9s %9s %7.1f %7s %7s %7s\n", s, $3, $4, $10, $12, $17, $19}' "$OUT/${server}_stats.csv"
+done
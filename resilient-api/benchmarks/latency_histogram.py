@@ -0,0 +1,85 @@
+#HDR-style latency histogram
+#Integer microseconds in log-linear buckets (HdrHistogram's layout): every power of
+#two is split into `sub_bucket_count` linear slots, so any recorded value is kept
+#to `significant_figures` decimal digits whether it is 50 us or 50 s, in a fixed
+#few KB regardless of how many samples are recorded. Histograms from several runs
+#or processes can be merged exactly.
+import math
+
+
+class LatencyHistogram:
+    def __init__(self, highest_us=60_000_000, significant_figures=2):
+        self.highest_us = highest_us
+        self.significant_figures = significant_figures
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._sub_bucket_half_magnitude = math.ceil(math.log2(largest_single_unit)) - 1
+        self._sub_bucket_count = 2 ** (self._sub_bucket_half_magnitude + 1)
+        self._sub_bucket_half = self._sub_bucket_count // 2
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+        self.counts = [0] * (self._index(highest_us) + 1)
+        self.total = 0
+        self.max_us = 0
+        self.min_us = None
+        self._sum_us = 0
+
+    def _index(self, value_us):
+        bucket = (value_us | self._sub_bucket_mask).bit_length() - (self._sub_bucket_half_magnitude + 1)
+        sub_bucket = value_us >> bucket
+        return ((bucket + 1) << self._sub_bucket_half_magnitude) + sub_bucket - self._sub_bucket_half
+
+    def _value_at(self, index):
+        bucket = (index >> self._sub_bucket_half_magnitude) - 1
+        sub_bucket = (index & (self._sub_bucket_half - 1)) + self._sub_bucket_half
+        if bucket < 0:
+            sub_bucket -= self._sub_bucket_half
+            bucket = 0
+        return sub_bucket << bucket
+
+    def _highest_equivalent(self, index):
+        # Upper end of the slot, so percentiles never under-report
+        bucket = max(0, (index >> self._sub_bucket_half_magnitude) - 1)
+        return self._value_at(index) + (1 << bucket) - 1
+
+    def record(self, seconds):
+        """
+        Records one latency; values above highest_us are clamped to it.
+        """
+        value_us = min(max(0, int(seconds * 1e6)), self.highest_us)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self._sum_us += value_us
+        self.max_us = max(self.max_us, value_us)
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other):
+        if (other.highest_us, other.significant_figures) != (self.highest_us, self.significant_figures):
+            raise ValueError("Histograms have different ranges or precision")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self._sum_us += other._sum_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        return self
+
+    def percentile(self, p):
+        """
+        Latency in seconds at or below which `p` percent of the samples fall.
+        """
+        if self.total == 0:
+            return 0.0
+        rank = max(1, math.ceil(p / 100.0 * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def mean(self):
+        return self._sum_us / self.total / 1e6 if self.total else 0.0
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)):
+        result = {f"p{p:g}": self.percentile(p) for p in percentiles}
+        result.update(count=self.total, mean=self.mean(), max=self.max_us / 1e6)
+        return result
@@ -0,0 +1,177 @@
+#Open-loop load generator for the naive, reactive, resilient and antifragile APIs
+#   pip install aiohttp
+#   python benchmarks/loadgen.py --rate 50 --duration 60
+#   python benchmarks/loadgen.py --apis resilient --rate 200 --target resilient=http://localhost:5102/resilient-api/process
+#Each API gets its own arrival schedule and its own keep-alive connection pool, so a
+#slow API never throttles the load on another (unlike locustfile.py, where one user
+#calls all four in turn). Requests are sent at the target rate whether or not earlier
+#ones have returned, and latency is measured from each request's *scheduled* send
+#time: time spent waiting for a free connection, or for a lagging generator, counts
+#against the API (coordinated-omission correction). "service" latency, from the
+#moment the request has a connection (new or reused from the pool), is reported
+#alongside; a gap between the two means queueing in the generator or the pool.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aiohttp
+from latency_histogram import LatencyHistogram
+
+DEFAULT_TARGETS = {
+    "naive": "http://localhost:5000/naive-api/process",
+    "reactive": "http://localhost:5004/reactive-api/process",
+    "resilient": "http://localhost:5002/resilient-api/process",
+    "antifragile": "http://localhost:5005/antifragile-api/process",
+}
+VALUES = [10, 0, -5, 1.5, 7777777]
+INVALID_VALUES = ["invalid", None]   #what locustfile.py mixes in
+
+
+async def _connection_acquired(session, trace_config_ctx, params):
+    # Service time starts here, after any wait for a free pooled connection
+    trace_config_ctx.trace_request_ctx["sent"] = asyncio.get_running_loop().time()
+
+
+class TargetRun:
+    """
+    Open-loop load against one API and its results.
+    """
+
+    def __init__(self, name, url, rate, connections, timeout, invalid_ratio, poisson):
+        self.name = name
+        self.url = url
+        self.rate = rate
+        self.connections = connections
+        self.timeout = timeout
+        self.invalid_ratio = invalid_ratio
+        self.poisson = poisson
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.sent = 0
+        self.ok = 0
+        self.http_errors = 0
+        self.failures = 0   #connection errors and timeouts
+        self.elapsed = 0.0
+
+    def payload(self):
+        if random.random() < self.invalid_ratio:
+            return {"value": random.choice(INVALID_VALUES)}
+        return {"value": random.choice(VALUES)}
+
+    async def run(self, duration, warmup):
+        connector = aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(_connection_acquired)
+        trace.on_connection_reuseconn.append(_connection_acquired)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         trace_configs=[trace]) as session:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            record_from = started + warmup
+            end = record_from + duration
+            scheduled = started
+            pending = set()
+            while scheduled < end:
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(self._send(session, scheduled, scheduled >= record_from))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                scheduled += random.expovariate(self.rate) if self.poisson else 1.0 / self.rate
+            if pending:
+                await asyncio.wait(pending)
+            self.elapsed = loop.time() - record_from
+
+    async def _send(self, session, scheduled, record):
+        loop = asyncio.get_running_loop()
+        timing = {}   #"sent" is set by _connection_acquired
+        try:
+            async with session.post(self.url, json=self.payload(), trace_request_ctx=timing) as response:
+                await response.read()
+                ok = response.status < 400
+            failed = False
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok, failed = False, True
+        done = loop.time()
+        if not record:
+            return
+        self.sent += 1
+        self.ok += ok
+        self.failures += failed
+        self.http_errors += not ok and not failed
+        self.latency.record(done - scheduled)
+        if "sent" in timing:   #never got a connection: no service time to speak of
+            self.service.record(done - timing["sent"])
+
+    def report(self):
+        return {
+            "url": self.url,
+            "target_rps": self.rate,
+            "achieved_rps": self.sent / self.elapsed if self.elapsed else 0.0,
+            "sent": self.sent,
+            "ok": self.ok,
+            "http_errors": self.http_errors,
+            "failures": self.failures,
+            "latency": self.latency.summary(),
+            "service": self.service.summary(),
+        }
+
+
+def print_report(reports):
+    print(f"\n{'api':<12} {'rps':>8} {'ok':>7} {'http_err':>8} {'fail':>6} "
+          f"{'p50_ms':>8} {'p90_ms':>8} {'p99_ms':>8} {'p99.9_ms':>9} {'max_ms':>8} {'svc_p99':>8}")
+    for name, r in reports.items():
+        lat = r["latency"]
+        print(f"{name:<12} {r['achieved_rps']:>8.1f} {r['ok']:>7} {r['http_errors']:>8} {r['failures']:>6} "
+              f"{lat['p50'] * 1e3:>8.1f} {lat['p90'] * 1e3:>8.1f} {lat['p99'] * 1e3:>8.1f} "
+              f"{lat['p99.9'] * 1e3:>9.1f} {lat['max'] * 1e3:>8.1f} {r['service']['p99'] * 1e3:>8.1f}")
+
+
+async def run_all(runs, duration, warmup):
+    await asyncio.gather(*(run.run(duration, warmup) for run in runs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apis", default="naive,reactive,resilient,antifragile")
+    parser.add_argument("--target", action="append", default=[], metavar="API=URL", help="override an API's URL")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests/s per API")
+    parser.add_argument("--duration", type=float, default=30.0, help="recorded seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before recording")
+    parser.add_argument("--connections", type=int, default=100, help="keep-alive connections per API")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout, seconds")
+    parser.add_argument("--invalid-ratio", type=float, default=0.0, help="share of invalid/missing values")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument("--json", help="also write the report (with all percentiles) here")
+    args = parser.parse_args()
+
+    targets = dict(DEFAULT_TARGETS)
+    for override in args.target:
+        name, _, url = override.partition("=")
+        targets[name] = url
+    runs = [TargetRun(name, targets[name], args.rate, args.connections, args.timeout, args.invalid_ratio, args.poisson)
+            for name in args.apis.split(",")]
+
+    print(f"{args.rate:g} req/s per API for {args.warmup:g}s warm-up + {args.duration:g}s: "
+          + ", ".join(f"{run.name}={run.url}" for run in runs))
+    started = time.perf_counter()
+    asyncio.run(run_all(runs, args.duration, args.warmup))
+    reports = {run.name: run.report() for run in runs}
+    print_report(reports)
+    print(f"\nlatency from scheduled send (coordinated-omission corrected); svc_p99 from when the request gets a connection. "
+          f"wall {time.perf_counter() - started:.1f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
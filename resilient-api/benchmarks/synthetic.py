@@ -0,0 +1,47 @@
+#Synthetic chaos-event logs for benchmarks
+#Rows follow the chaos_events1.csv schema and roughly its distributions.
+import os
+import numpy as np
+import pandas as pd
+
+EVENT_FIELDS = [
+    "timestamp", "stressor", "value", "result", "success",
+    "fallback_used", "cpu", "mem", "prediction", "confidence", "injected_by_ai"
+]
+STRESSORS = np.array(["timeout", "latency", "failure", "none"], dtype=object)
+VALUES = np.array([10, 0, -5, 1.5, 7777777], dtype=float)
+
+
+def generate_events(n_rows, seed=42, start="2025-09-01T00:00:00"):
+    rng = np.random.default_rng(seed)
+    stressor = STRESSORS[rng.integers(0, 4, n_rows)]
+    fallback = np.isin(stressor, ["timeout", "failure"]).astype(int)
+    value = VALUES[rng.integers(0, len(VALUES), n_rows)]
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(np.arange(n_rows) * 250, unit="ms")
+    return pd.DataFrame({
+        "timestamp": timestamps.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+        "stressor": stressor,
+        "value": value,
+        "result": np.where(fallback == 1, value * 1.5, value * 2),
+        "success": (rng.random(n_rows) > 0.01).astype(int),
+        "fallback_used": fallback,
+        "cpu": rng.uniform(0, 100, n_rows).round(2),
+        "mem": rng.uniform(10, 60, n_rows).round(2),
+        "prediction": (rng.random(n_rows) > 0.2).astype(int),
+        "confidence": rng.uniform(0.3, 1.0, n_rows).round(3),
+        "injected_by_ai": rng.integers(0, 2, n_rows),
+    }, columns=EVENT_FIELDS)
+
+
+def write_events_csv(path, n_rows, seed=42):
+    """
+    Writes a synthetic log in chunks so large sizes don't need it all in memory.
+    """
+    chunk = 1_000_000
+    if os.path.exists(path):
+        os.remove(path)
+    for offset in range(0, n_rows, chunk):
+        df = generate_events(min(chunk, n_rows - offset), seed=seed + offset,
+                             start=pd.Timestamp("2025-09-01") + pd.Timedelta(milliseconds=250 * offset))
+        df.to_csv(path, mode="a", header=offset == 0, index=False)
+    return path
@@ -1,21 +1,221 @@
-# app.py
+#Chaos stressor engine
+#A chaos stressor name (timeout/latency/failure/none) maps to a plan of engine
+#stressors from a registry, each with a calibrated intensity and duration:
+#   cpu      burn CPU for `ms` (hashing a preallocated buffer; hashlib releases the
+#            GIL, so other request threads keep running)
+#   memory   hold `mb` of touched pages for `ms`, bounded process-wide
+#   latency  timer sleep for `ms`
+#   io       write and fsync `kb` to a temp file
+#   failure  raise
+#The wall and CPU time each stressor really cost are exported as histograms.
+#
+#Stressors run inside the request's deadline: given `deadline_at`, every duration
+#(`ms`) is cut to the time left, so a timeout draw can't pin a worker thread past
+#the point where the retry policy would give up anyway.
+#
+#execute_chaos_async is the asyncio variant: the sleep-based stressors (latency,
+#memory hold) await asyncio.sleep on the event loop, and only the ones that
+#really occupy a thread (cpu burn, io fsync) go to the executor passed in.
+#
+#CHAOS_PLAN (JSON) overrides the mapping, e.g.
+#   {"latency": [["cpu", {"ms": 50}], ["memory", {"mb": 64, "ms": 100}]]}
+import asyncio
+import functools
+import hashlib
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
+from prometheus_client import Gauge, Histogram
+
 logger = logging.getLogger(__name__)
 
+CHAOS_CPU_MS = float(os.environ.get("CHAOS_CPU_MS", "100"))
+CHAOS_TIMEOUT_MS = float(os.environ.get("CHAOS_TIMEOUT_MS", "2000"))
+CHAOS_MEMORY_MAX_MB = float(os.environ.get("CHAOS_MEMORY_MAX_MB", "256"))   #total held by all requests
+CHAOS_IO_MAX_KB = int(os.environ.get("CHAOS_IO_MAX_KB", "4096"))
+
+STRESSOR_COST = Histogram(
+    "resilient_chaos_stressor_seconds", "Measured cost of each chaos stressor", ["kind", "resource"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+MEMORY_HELD = Gauge(
+    "resilient_chaos_memory_held_bytes", "Memory currently held by memory stressors", multiprocess_mode="livesum"
+)
+
+STRESSORS = {}
+ASYNC_STRESSORS = {}    #kinds with a coroutine variant that doesn't need a thread
+
+
+def stressor(kind):
+    """
+    Registers fn(**params) as an engine stressor.
+    """
+    def register(fn):
+        STRESSORS[kind] = fn
+        return fn
+    return register
+
+
+def async_stressor(kind):
+    """
+    Registers an async fn(**params) as the event loop variant of an engine stressor.
+    """
+    def register(fn):
+        ASYNC_STRESSORS[kind] = fn
+        return fn
+    return register
+
+
+_BURN_BUFFER = bytes(64 * 1024)   #hashlib drops the GIL for inputs over 2 KiB
+
+@stressor("cpu")
+def cpu_burn(ms=CHAOS_CPU_MS):
+    end = time.perf_counter() + ms / 1000.0
+    while time.perf_counter() < end:
+        hashlib.sha256(_BURN_BUFFER).digest()
+
+
+_MEMORY_LOCK = threading.Lock()
+_memory_held = 0
+
+def _reserve_memory(mb):
+    global _memory_held
+    with _MEMORY_LOCK:
+        size = int(max(0.0, min(mb, CHAOS_MEMORY_MAX_MB - _memory_held / 2**20)) * 2**20)
+        _memory_held += size
+        MEMORY_HELD.set(_memory_held)
+    return size
+
+
+def _release_memory(size):
+    global _memory_held
+    with _MEMORY_LOCK:
+        _memory_held -= size
+        MEMORY_HELD.set(_memory_held)
+
+
+def _touched_block(size):
+    block = bytearray(size)
+    block[::4096] = b"\x01" * len(range(0, size, 4096))   #touch every page so it is resident
+    return block
+
+
+@stressor("memory")
+def memory_pressure(mb=32, ms=100):
+    size = _reserve_memory(mb)
+    try:
+        block = _touched_block(size)
+        time.sleep(ms / 1000.0)
+        del block
+    finally:
+        _release_memory(size)
+
+
+@async_stressor("memory")
+async def memory_pressure_async(mb=32, ms=100):
+    size = _reserve_memory(mb)
+    try:
+        block = _touched_block(size)
+        await asyncio.sleep(ms / 1000.0)
+        del block
+    finally:
+        _release_memory(size)
+
+
+@stressor("latency")
+def timer_latency(ms=CHAOS_TIMEOUT_MS):
+    time.sleep(ms / 1000.0)
 
-def execute_chaos(stressor):
+
+@async_stressor("latency")
+async def timer_latency_async(ms=CHAOS_TIMEOUT_MS):
+    await asyncio.sleep(ms / 1000.0)
+
+
+_IO_BUFFER = bytes(CHAOS_IO_MAX_KB * 1024)
+
+@stressor("io")
+def io_stall(kb=256):
+    size = min(int(kb), CHAOS_IO_MAX_KB) * 1024
+    with tempfile.TemporaryFile() as f:
+        f.write(memoryview(_IO_BUFFER)[:size])
+        f.flush()
+        os.fsync(f.fileno())
+
+
+@stressor("failure")
+def failure():
+    raise RuntimeError("Simulated failure")
+
+
+@async_stressor("failure")
+async def failure_async():
+    failure()
+
+
+DEFAULT_PLAN = {
+    "timeout": [["latency", {"ms": CHAOS_TIMEOUT_MS}]],
+    "latency": [["cpu", {"ms": CHAOS_CPU_MS}]],
+    "failure": [["failure", {}]],
+    "none": [],
+}
+CHAOS_PLAN = {**DEFAULT_PLAN, **json.loads(os.environ.get("CHAOS_PLAN", "{}"))}
+
+
+def run_stressor(kind, **params):
+    """
+    Runs one engine stressor and records its wall and CPU cost.
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        STRESSORS[kind](**params)
+    finally:
+        STRESSOR_COST.labels(kind=kind, resource="wall").observe(time.perf_counter() - wall)
+        STRESSOR_COST.labels(kind=kind, resource="cpu").observe(time.thread_time() - cpu)
+
+
+def _within(params, deadline_at):
+    # Duration capped at what is left before deadline_at (time.monotonic())
+    if deadline_at is None or "ms" not in params:
+        return params
+    return {**params, "ms": min(params["ms"], max(0.0, (deadline_at - time.monotonic()) * 1000.0))}
+
+
+def execute_chaos(stressor, deadline_at=None):
     try:
         # Simulate the stressor
-        if stressor == "timeout":
-            time.sleep(2)  # simulate delay
-        elif stressor == "latency":
-            _ = [x**2 for x in range(1000000)]  # simulate CPU load
-        elif stressor == "failure":
-            raise RuntimeError("Simulated failure")
-        elif stressor == "none":
-            pass  # no stressor applied
+        for kind, params in CHAOS_PLAN.get(stressor, []):
+            run_stressor(kind, **_within(params, deadline_at))
         return False  # no fallback triggered
     except Exception as e:
         # Fallback logic here (e.g., default response, retry, etc.)
         logger.warning("Fallback triggered due to chaos", extra={"error": str(e)})
         return True  # fallback was used
+
+
+async def run_stressor_async(kind, executor=None, **params):
+    """
+    run_stressor for the event loop: awaits the async variant when there is one,
+    otherwise runs the stressor on `executor` (None = the loop's default).
+    """
+    if kind not in ASYNC_STRESSORS:
+        await asyncio.get_running_loop().run_in_executor(executor, functools.partial(run_stressor, kind, **params))
+        return
+    wall = time.perf_counter()
+    try:
+        await ASYNC_STRESSORS[kind](**params)
+    finally:
+        STRESSOR_COST.labels(kind=kind, resource="wall").observe(time.perf_counter() - wall)
+
+
+async def execute_chaos_async(stressor, executor=None, deadline_at=None):
+    try:
+        for kind, params in CHAOS_PLAN.get(stressor, []):
+            await run_stressor_async(kind, executor, **_within(params, deadline_at))
+        return False
+    except Exception as e:
+        logger.warning("Fallback triggered due to chaos", extra={"error": str(e)})
+        return True
@@ -0,0 +1,137 @@
+#Circuit breaker around the retried operation
+#Outcomes are counted in a rolling window of one-second buckets. Once the window
+#has enough requests and the failure rate crosses the threshold the breaker opens
+#and requests go straight to the fallback. After CIRCUIT_OPEN_SECONDS it lets a
+#few probe requests through (half-open); enough probe successes close it again,
+#any probe failure re-opens it.
+import os
+import threading
+import time
+from collections import deque
+from prometheus_client import Counter, Gauge
+
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW_SECONDS", "10"))
+CIRCUIT_MIN_REQUESTS = int(os.environ.get("CIRCUIT_MIN_REQUESTS", "10"))         #before the rate is trusted
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", "5"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get("CIRCUIT_HALF_OPEN_PROBES", "3"))  #successes needed to close
+CIRCUIT_PER_STRESSOR = os.environ.get("CIRCUIT_PER_STRESSOR", "1") == "1"
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = Gauge(
+    "resilient_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["breaker"],
+    multiprocess_mode="livemax"
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "resilient_circuit_transitions_total", "Circuit breaker state changes", ["breaker", "from_state", "to_state"]
+)
+CIRCUIT_SHORT_CIRCUITED = Counter(
+    "resilient_circuit_short_circuited_total", "Requests sent to the fallback by an open circuit", ["breaker"]
+)
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=CIRCUIT_WINDOW, min_requests=CIRCUIT_MIN_REQUESTS,
+                 failure_rate=CIRCUIT_FAILURE_RATE, open_seconds=CIRCUIT_OPEN_SECONDS,
+                 half_open_probes=CIRCUIT_HALF_OPEN_PROBES):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._buckets = deque()      # [second, requests, failures]
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(breaker=name).set(STATE_VALUES[CLOSED])
+
+    def allow(self):
+        """
+        True if the request may run. A True in half-open state is a probe and
+        must be followed by record().
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    CIRCUIT_SHORT_CIRCUITED.labels(breaker=self.name).inc()
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight + self._probe_successes >= self.half_open_probes:
+                    CIRCUIT_SHORT_CIRCUITED.labels(breaker=self.name).inc()
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record(self, success):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                return   # request started before the breaker opened
+            requests, failures = self._count(success)
+            if requests >= self.min_requests and failures / requests >= self.failure_rate:
+                self._open()
+
+    def _count(self, success):
+        now = int(time.monotonic())
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += 0 if success else 1
+        while self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        return sum(b[1] for b in self._buckets), sum(b[2] for b in self._buckets)
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        if state == self.state:
+            return
+        CIRCUIT_TRANSITIONS.labels(breaker=self.name, from_state=self.state, to_state=state).inc()
+        CIRCUIT_STATE.labels(breaker=self.name).set(STATE_VALUES[state])
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == CLOSED:
+            self._buckets.clear()
+
+
+class CircuitBreakers:
+    """
+    One breaker per stressor (CIRCUIT_PER_STRESSOR=1) or a single shared one.
+    """
+
+    def __init__(self, per_stressor=CIRCUIT_PER_STRESSOR, **kwargs):
+        self.per_stressor = per_stressor
+        self.kwargs = kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, stressor):
+        name = stressor if self.per_stressor else "all"
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name, **self.kwargs)
+        return breaker
+
+    def states(self):
+        return {name: breaker.state for name, breaker in self._breakers.items()}
@@ -0,0 +1,195 @@
+#Compiled (pandas/sklearn-free) inference for the served models
+#Trained sklearn models are flattened into plain NumPy arrays once, so scoring a
+#request is a handful of array operations instead of DataFrame construction,
+#input validation and (for the forest) per-tree dispatch. The arithmetic mirrors
+#sklearn's so results are identical. The compiled chaos selector is persisted as
+#an .npz of those arrays, so serving can load it without sklearn or a refit.
+import hashlib
+import io
+import os
+import zipfile
+import numpy as np
+from scipy.special import expit
+from atomic_file import atomic_write
+
+SELECTOR_PATH = os.environ.get("CHAOS_SELECTOR_PATH", "chaos_selector.npz")
+FOREST_ARRAYS = ("left", "right", "feature", "threshold", "value", "roots", "classes")
+
+
+class CompiledLogistic:
+    """
+    Scaler arrays + coefficient vector of a binary linear classifier
+    (LogisticRegression or SGDClassifier with log loss).
+    """
+
+    def __init__(self, scale_kind, offset, factor, coef, intercept):
+        self.scale_kind = scale_kind
+        self.offset = np.asarray(offset, dtype=float)
+        self.factor = np.asarray(factor, dtype=float)
+        self.coef_T = np.ascontiguousarray(np.asarray(coef, dtype=float).reshape(1, -1).T)
+        self.intercept = np.asarray(intercept, dtype=float)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        return cls(pipeline.scale_kind, pipeline.offset, pipeline.factor, pipeline.coef, pipeline.intercept)
+
+    def predict_proba_matrix(self, X):
+        """
+        P(success) for each row of an unscaled (n, n_features) matrix.
+        """
+        X = np.array(X, dtype=float, ndmin=2)
+        if self.scale_kind == "standard":
+            X -= self.offset
+            X /= self.factor
+        else:
+            X *= self.factor
+            X += self.offset
+        # Same ops as sklearn decision_function + _predict_proba_lr
+        scores = X @ self.coef_T + self.intercept
+        return expit(scores).reshape(-1)
+
+    def predict_proba_row(self, row):
+        return float(self.predict_proba_matrix([row])[0])
+
+
+class CompiledForest:
+    """
+    All trees of a RandomForestClassifier flattened into shared node arrays.
+    Leaves point to themselves, so every tree can be walked in lockstep.
+    """
+
+    def __init__(self, model):
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n) + offset
+            is_leaf = tree.children_left == -1
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold.astype(np.float64))
+            # Per-tree class probabilities, normalised like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += n
+
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+        self.classes = np.asarray(model.classes_)
+        self.n_features = model.n_features_in_
+        self._index()
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        forest = cls.__new__(cls)
+        for name in FOREST_ARRAYS:
+            setattr(forest, name, arrays[name])
+        forest.max_depth = int(arrays["max_depth"])
+        forest.n_features = int(arrays["n_features"])
+        forest._index()
+        return forest
+
+    def _index(self):
+        # Python-list copies for the single-row path (cheaper than array indexing)
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._roots = self.roots.tolist()
+
+    def predict_proba_matrix(self, X):
+        # Trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64).reshape(-1, self.n_features)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        # Sequential sum over trees, in tree order, like the forest's accumulation
+        proba = np.cumsum(self.value[nodes], axis=1)[:, -1]
+        return proba / len(self.roots)
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba_matrix(X), axis=1))
+
+    def predict_row(self, row):
+        x = np.asarray(row, dtype=np.float32).astype(np.float64).tolist()
+        left, right, feature, threshold = self._left, self._right, self._feature, self._threshold
+        leaves = []
+        for node in self._roots:
+            while left[node] != node:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            leaves.append(node)
+        proba = np.cumsum(self.value[leaves], axis=0)[-1] / len(leaves)
+        return self.classes[int(np.argmax(proba))]
+
+
+class ConstantSelector:
+    """
+    Compiled form of DummyChaosSelector: always the same stressor code.
+    """
+
+    def __init__(self, code=3):
+        self.code = code
+
+    def predict(self, X):
+        return np.full(len(X), self.code)
+
+    def predict_row(self, row):
+        return self.code
+
+
+def compile_selector(model):
+    if hasattr(model, "estimators_"):
+        return CompiledForest(model)
+    return ConstantSelector(int(model.predict([[0.0, 0.0, 0.0, 0.0]])[0]))
+
+
+def save_selector(selector, path=SELECTOR_PATH):
+    """
+    Writes a compiled selector atomically, returns the sha256 of the file.
+    """
+    if isinstance(selector, CompiledForest):
+        arrays = {name: getattr(selector, name) for name in FOREST_ARRAYS}
+        arrays.update(kind="forest", max_depth=selector.max_depth, n_features=selector.n_features)
+    else:
+        arrays = {"kind": "constant", "code": selector.code}
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    data = buffer.getvalue()
+    with atomic_write(path) as f:
+        f.write(data)
+    selector.digest = hashlib.sha256(data).hexdigest()
+    return selector.digest
+
+
+def load_selector(path=SELECTOR_PATH):
+    """
+    Compiled selector from its .npz artifact, None if missing or unreadable.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        kind = str(arrays["kind"])
+        if kind == "forest":
+            selector = CompiledForest.from_arrays(arrays)
+        elif kind == "constant":
+            selector = ConstantSelector(int(arrays["code"]))
+        else:
+            return None
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    selector.digest = hashlib.sha256(data).hexdigest()
+    return selector
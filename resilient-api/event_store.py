@@ -0,0 +1,272 @@
+#Columnar binary event store for chaos events
+#Events are stored as append-only segments; each segment is a directory holding one
+#typed .npy file per column plus a small meta.json (row count, time range). Reads
+#memory-map only the requested columns and skip segments outside the time range.
+#
+#   python event_store.py migrate chaos_events1.csv --store event_store
+#pandas is imported where it is used, so serving processes don't load it at startup.
+import argparse
+import glob
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+EVENT_STORE_DIR = os.environ.get("EVENT_STORE_DIR", "")     #empty = CSV backend
+SEGMENT_ROWS = int(os.environ.get("EVENT_STORE_SEGMENT_ROWS", "1000000"))
+COMPACT_AFTER = int(os.environ.get("EVENT_STORE_COMPACT_AFTER", "64"))   #small segments before compaction
+
+STRESSORS = ["timeout", "latency", "failure", "none"]   #code = index, same as STRESSOR_MAP
+STRESSOR_CODES = {name: code for code, name in enumerate(STRESSORS)}
+
+# Column name -> on-disk dtype. timestamp is stored as int64 ns since epoch (UTC)
+COLUMNS = {
+    "timestamp": "<i8",
+    "stressor": "i1",
+    "value": "<f8",
+    "result": "<f8",
+    "success": "i1",
+    "fallback_used": "i1",
+    "cpu": "<f8",
+    "mem": "<f8",
+    "prediction": "i1",
+    "confidence": "<f8",
+    "injected_by_ai": "i1",
+}
+
+
+def _to_columns(df):
+    """
+    Coerces a raw event frame (CSV strings or writer rows) to typed column arrays.
+    """
+    import pandas as pd
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    columns = {"timestamp": timestamps.to_numpy(dtype="datetime64[ns]").view("<i8")}
+    columns["stressor"] = df["stressor"].map(STRESSOR_CODES).fillna(STRESSOR_CODES["none"]).to_numpy(dtype="i1")
+    for name, dtype in COLUMNS.items():
+        if name not in columns:
+            columns[name] = pd.to_numeric(df[name], errors="coerce").fillna(-1).to_numpy(dtype=dtype)
+    return columns
+
+
+def _to_ns(moment):
+    if moment is None or isinstance(moment, int):
+        return moment
+    import pandas as pd
+    moment = pd.Timestamp(moment)
+    if moment.tzinfo is None:
+        moment = moment.tz_localize("UTC")
+    return moment.value
+
+
+class ColumnarEventStore:
+    """
+    Append-only segmented column store rooted at a directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._seq = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # ---- writing ----
+
+    def append(self, rows):
+        """
+        Appends event rows (dicts as produced by log_chaos_to_csv) as one segment.
+        """
+        if not rows:
+            return None
+        import pandas as pd
+        return self.append_frame(pd.DataFrame.from_records(rows))
+
+    def append_frame(self, df):
+        if df.empty:
+            return None
+        return self._write_segment(_to_columns(df))
+
+    def _write_segment(self, columns):
+        n_rows = len(columns["timestamp"])
+        ts = columns["timestamp"]
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        # Named by first timestamp so a sorted listing is (roughly) chronological
+        name = f"seg-{max(int(ts.min()), 0):020d}-{socket.gethostname()}-{os.getpid()}-{seq:06d}"
+        tmp_dir = os.path.join(self.root, f".tmp-{name}")
+        os.makedirs(tmp_dir)
+        for col, dtype in COLUMNS.items():
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), np.ascontiguousarray(columns[col], dtype=dtype))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"rows": n_rows, "ts_min": int(ts.min()), "ts_max": int(ts.max())}, f)
+        # rename makes the whole segment visible to readers at once
+        os.rename(tmp_dir, os.path.join(self.root, name))
+        return name
+
+    # ---- reading ----
+
+    def segments(self):
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.root, "seg-*"))):
+            try:
+                with open(os.path.join(path, "meta.json")) as f:
+                    segments.append((path, json.load(f)))
+            except FileNotFoundError:
+                continue   # removed by a concurrent compaction
+        return segments
+
+    def count(self):
+        return sum(meta["rows"] for _, meta in self.segments())
+
+    def read_columns(self, columns=None, start=None, end=None):
+        """
+        Returns {column: ndarray} for the projected columns, optionally limited
+        to start <= timestamp < end (datetime-like or ns ints).
+        """
+        columns = list(columns or COLUMNS)
+        unknown = [c for c in columns if c not in COLUMNS]
+        if unknown:
+            raise KeyError(f"Unknown event columns: {unknown}")
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+
+        for attempt in range(2):
+            try:
+                return self._read_segments(columns, start_ns, end_ns)
+            except FileNotFoundError:
+                if attempt:
+                    raise   # compaction swapped segments under us twice in a row
+
+    def _read_segments(self, columns, start_ns, end_ns):
+        parts = {col: [] for col in columns}
+        for path, meta in self.segments():
+            if start_ns is not None and meta["ts_max"] < start_ns:
+                continue
+            if end_ns is not None and meta["ts_min"] >= end_ns:
+                continue
+            mask = None
+            if (start_ns is not None and meta["ts_min"] < start_ns) or (end_ns is not None and meta["ts_max"] >= end_ns):
+                ts = np.load(os.path.join(path, "timestamp.npy"), mmap_mode="r")
+                mask = np.ones(len(ts), dtype=bool)
+                if start_ns is not None:
+                    mask &= ts >= start_ns
+                if end_ns is not None:
+                    mask &= ts < end_ns
+            for col in columns:
+                data = np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r")
+                parts[col].append(data[mask] if mask is not None else data)
+        return {
+            col: np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[col])
+            for col, chunks in parts.items()
+        }
+
+    def read(self, columns=None, start=None, end=None):
+        """
+        Same as read_columns but as a DataFrame with decoded stressor/timestamp.
+        """
+        import pandas as pd
+        data = self.read_columns(columns, start, end)
+        df = pd.DataFrame(data)
+        if "stressor" in df.columns:
+            df["stressor"] = np.asarray(STRESSORS, dtype=object)[df["stressor"].to_numpy()]
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+        return df
+
+    # ---- maintenance ----
+
+    def compact(self, min_segments=COMPACT_AFTER, target_rows=SEGMENT_ROWS):
+        """
+        Merges runs of small segments into segments of up to target_rows.
+        Without fcntl (Windows) there is no cross-process lock, so only one
+        process should compact.
+        """
+        lock_path = os.path.join(self.root, ".compact.lock")
+        with open(lock_path, "w") as lock_file:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0   # another process is compacting
+            small = [(p, m) for p, m in self.segments() if m["rows"] < target_rows]
+            if len(small) < min_segments:
+                return 0
+            merged = 0
+            group, group_rows = [], 0
+            for path, meta in small + [(None, None)]:
+                if path is not None and group_rows + meta["rows"] <= target_rows:
+                    group.append(path)
+                    group_rows += meta["rows"]
+                    continue
+                if len(group) > 1:
+                    columns = {
+                        col: np.concatenate([np.load(os.path.join(p, f"{col}.npy")) for p in group])
+                        for col in COLUMNS
+                    }
+                    self._write_segment(columns)
+                    for p in group:
+                        shutil.rmtree(p, ignore_errors=True)
+                    merged += len(group)
+                group, group_rows = ([path], meta["rows"]) if path is not None else ([], 0)
+            return merged
+
+
+def migrate_csv(csv_paths, store, chunksize=SEGMENT_ROWS):
+    """
+    One-shot import of existing chaos_events*.csv files. Malformed rows are skipped.
+    """
+    import pandas as pd
+    total = 0
+    for csv_path in csv_paths:
+        if os.path.getsize(csv_path) == 0:
+            continue
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, on_bad_lines="skip", encoding="utf-8-sig"):
+            chunk = chunk.dropna(subset=["timestamp", "stressor"])
+            store.append_frame(chunk)
+            total += len(chunk)
+    store.compact(min_segments=2)
+    return total
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_event_store():
+    """
+    The configured store (EVENT_STORE_DIR), or None when the CSV backend is used.
+    """
+    global _STORE
+    if not EVENT_STORE_DIR:
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ColumnarEventStore(EVENT_STORE_DIR)
+        return _STORE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chaos event columnar store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import chaos_events*.csv into the store")
+    migrate.add_argument("csv_paths", nargs="+")
+    migrate.add_argument("--store", default=EVENT_STORE_DIR or "event_store")
+    info = sub.add_parser("info", help="show segment and row counts")
+    info.add_argument("--store", default=EVENT_STORE_DIR or "event_store")
+    args = parser.parse_args()
+
+    store = ColumnarEventStore(args.store)
+    if args.command == "migrate":
+        started = time.perf_counter()
+        rows = migrate_csv(args.csv_paths, store)
+        print(f"[STORE] Migrated {rows} rows into {args.store} in {time.perf_counter() - started:.2f}s")
+    else:
+        print(f"[STORE] {len(store.segments())} segments, {store.count()} rows")
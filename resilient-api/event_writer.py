@@ -0,0 +1,303 @@
+#Asynchronous group-commit writer for chaos events
+#Requests enqueue a row and return; a background thread batches rows and appends
+#them with a single write per flush (by size or time). Optionally every process
+#writes its own shard file, rotated by size.
+import atexit
+import csv
+import io
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from prometheus_client import Counter, Gauge
+from event_store import get_event_store, COMPACT_AFTER
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+EVENT_FIELDS = [
+    "timestamp", "stressor", "value", "result", "success",
+    "fallback_used", "cpu", "mem", "prediction", "confidence", "injected_by_ai"
+]
+
+BATCH_SIZE = int(os.environ.get("EVENT_LOG_BATCH_SIZE", "256"))
+FLUSH_INTERVAL = float(os.environ.get("EVENT_LOG_FLUSH_INTERVAL", "1.0"))
+MAX_QUEUE = int(os.environ.get("EVENT_LOG_MAX_QUEUE", "10000"))
+FULL_POLICY = os.environ.get("EVENT_LOG_FULL_POLICY", "drop")   #"drop" or "block"
+BLOCK_TIMEOUT = float(os.environ.get("EVENT_LOG_BLOCK_TIMEOUT", "0.05"))
+SHARDED = os.environ.get("EVENT_LOG_SHARDED", "0") == "1"
+SHARD_MAX_BYTES = int(os.environ.get("EVENT_LOG_SHARD_MAX_BYTES", str(64 * 1024 * 1024)))
+
+logger = logging.getLogger(__name__)
+
+EVENTS_WRITTEN = Counter("resilient_event_log_written_total", "Chaos events written to the event log")
+EVENTS_DROPPED = Counter("resilient_event_log_dropped_total", "Chaos events dropped because the writer queue was full")
+EVENT_QUEUE_DEPTH = Gauge("resilient_event_log_queue_depth", "Chaos events waiting to be written", multiprocess_mode="livesum")
+
+
+def shard_prefix(csv_path):
+    root, ext = os.path.splitext(csv_path)
+    return root, ext or ".csv"
+
+
+class EventWriter:
+    """
+    Queued, batched appender for the chaos event CSV.
+    """
+
+    def __init__(self, csv_path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_queue=MAX_QUEUE, full_policy=FULL_POLICY, sharded=SHARDED,
+                 shard_max_bytes=SHARD_MAX_BYTES, store=None):
+        self.csv_path = csv_path
+        self.store = store   #ColumnarEventStore replaces the CSV when configured
+        self._segments_written = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.full_policy = full_policy
+        self.sharded = sharded
+        self.shard_max_bytes = shard_max_bytes
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._fd = None
+        self._path = None
+        self._shard_seq = 0
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._listeners = []
+
+    # ---- request side ----
+
+    def submit(self, row):
+        """
+        Enqueues one event. Returns False if it was dropped.
+        """
+        if self._thread is None:
+            self.start()
+        try:
+            if self.full_policy == "block":
+                self._queue.put(row, timeout=BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            EVENTS_DROPPED.inc()
+            return False
+        return True
+
+    def add_listener(self, listener):
+        """
+        listener(rows) is called with every batch after it has been written.
+        """
+        self._listeners.append(listener)
+
+    def submit_many(self, rows):
+        """
+        Enqueues several events, returns how many were accepted.
+        """
+        return sum(1 for row in rows if self.submit(row))
+
+    # ---- background side ----
+
+    def start(self):
+        with self._write_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                row = None
+
+            if row is _FLUSH:
+                self.write_rows(batch)
+                batch = []
+                self._queue.task_done()
+                continue
+            if row is _STOP:
+                self.write_rows(batch)
+                self._queue.task_done()
+                return
+            if row is not None:
+                batch.append(row)
+                self._queue.task_done()
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self.write_rows(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def write_rows(self, rows):
+        """
+        Appends rows with a single write. Also used directly for synchronous logging.
+        """
+        EVENT_QUEUE_DEPTH.set(self._queue.qsize())
+        if not rows:
+            return
+        if self.store is not None:
+            self._write_store(rows)
+        else:
+            self._write_csv(rows)
+        for listener in self._listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                logger.warning("Event listener failed", extra={"error": str(e)})
+
+    def _write_csv(self, rows):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EVENT_FIELDS)
+        for row in rows:
+            writer.writerow(row)
+
+        with self._write_lock:
+            fd = self._open()
+            data = buf.getvalue().encode("utf-8")
+            if fcntl is not None and not self.sharded:
+                # Several processes may append to the same file on the shared volume
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    self._write_header_if_empty(fd)
+                    os.write(fd, data)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                self._write_header_if_empty(fd)
+                os.write(fd, data)
+        EVENTS_WRITTEN.inc(len(rows))
+
+    def _write_store(self, rows):
+        with self._write_lock:
+            self.store.append(rows)
+            self._segments_written += 1
+            if self._segments_written % COMPACT_AFTER == 0:
+                self.store.compact()
+        EVENTS_WRITTEN.inc(len(rows))
+
+    def _open(self):
+        if self._fd is not None and self.sharded and os.fstat(self._fd).st_size >= self.shard_max_bytes:
+            os.close(self._fd)
+            self._fd = None
+            self._shard_seq += 1
+        if self._fd is None:
+            self._path = self._shard_path() if self.sharded else self.csv_path
+            self._fd = os.open(self._path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            self._terminate_last_line(self._fd)
+        return self._fd
+
+    @staticmethod
+    def _terminate_last_line(fd):
+        # A previous writer may have died mid-row; don't glue our first row onto it
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            os.write(fd, b"\r\n")
+
+    def _shard_path(self):
+        root, ext = shard_prefix(self.csv_path)
+        while True:
+            path = f"{root}.{socket.gethostname()}-{os.getpid()}.{self._shard_seq:04d}{ext}"
+            if not os.path.exists(path) or os.path.getsize(path) < self.shard_max_bytes:
+                return path
+            self._shard_seq += 1
+
+    @staticmethod
+    def _write_header_if_empty(fd):
+        if os.fstat(fd).st_size == 0:
+            os.write(fd, (",".join(EVENT_FIELDS) + "\r\n").encode("utf-8"))
+
+    # ---- lifecycle ----
+
+    def flush(self, timeout=5.0):
+        """
+        Writes everything queued so far.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_FLUSH, timeout=timeout)
+        self._join_queue(timeout)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=timeout)
+        with self._write_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _after_fork(self):
+        # The child gets its own queue, thread and file descriptor (flock locks
+        # belong to the open file, so sharing the parent's fd would not exclude)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+        self._shard_seq = 0
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def _join_queue(self, timeout):
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.01)
+
+
+_FLUSH = object()
+_STOP = object()
+
+_WRITERS = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_event_writer(csv_path):
+    """
+    One writer per event log path per process, closed at interpreter exit.
+    """
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(csv_path)
+        if writer is None:
+            writer = EventWriter(csv_path, store=get_event_store())
+            _WRITERS[csv_path] = writer
+            atexit.register(writer.close)
+            os.register_at_fork(after_in_child=writer._after_fork)
+        return writer
+
+
+def close_event_writers():
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+    for writer in writers:
+        writer.close()
+
+
+def event_log_paths(csv_path):
+    """
+    The main event log plus any per-process shards (including rotated ones).
+    """
+    root, ext = shard_prefix(csv_path)
+    directory = os.path.dirname(root) or "."
+    prefix = os.path.basename(root) + "."
+    main_name = os.path.basename(csv_path)
+    paths = [csv_path] if os.path.exists(csv_path) else []
+    shards = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(prefix) and name.endswith(ext) and name != main_name
+    )
+    return paths + shards
@@ -1,5 +1,7 @@
-import pandas as pd
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
+import os
+import numpy as np
+from event_writer import event_log_paths
+from event_store import get_event_store
 
 STRESSOR_MAP = {
     "timeout": 0,
@@ -8,14 +10,117 @@ STRESSOR_MAP = {
     "none": 3
 }
 
+# Feature schema shared by training and prediction (order matters)
+FEATURE_COLS = [
+    "stressor_type", "value", "response_time",
+    "fallback_used", "retry_attempts", "cpu", "mem", "confidence"
+]
+
 def encode_stressor(stressor):
     return STRESSOR_MAP.get(stressor, 3)
 
-def extract_features_from_csv(csv_path="chaos_events1.csv", scale="standard"):
-    df = pd.read_csv(csv_path)
+def make_scaler(scale="standard"):
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler
+    if scale == "standard":
+        return StandardScaler()
+    elif scale == "minmax":
+        return MinMaxScaler()
+    raise ValueError("scale must be 'standard' or 'minmax'")
+
+# Raw event columns needed to build FEATURE_COLS
+EVENT_COLUMNS = [
+    "stressor", "value", "fallback_used", "success",
+    "cpu", "mem", "prediction", "confidence"
+]
+
+NUMERIC_EVENT_COLUMNS = ["value", "fallback_used", "success", "cpu", "mem", "prediction", "confidence"]
+
+def drop_torn_rows(df):
+    """
+    Drops rows with missing or non-numeric event fields. on_bad_lines="skip" only
+    catches rows with too many fields; a torn row with too few loads with NaNs.
+    """
+    import pandas as pd
+    for col in NUMERIC_EVENT_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    present = [col for col in EVENT_COLUMNS if col in df.columns]
+    if not df[present].isna().any().any():
+        return df
+    return df.dropna(subset=present).reset_index(drop=True)
+
+def read_event_log(csv_path="chaos_events1.csv", columns=None):
+    """
+    Reads the event log (only `columns` if given) together with any per-process
+    shard files, or from the columnar store when EVENT_STORE_DIR is set.
+    Torn rows left by interrupted writers are skipped.
+    """
+    store = get_event_store()
+    if store is not None:
+        return store.read(columns)
+
+    import pandas as pd   #training-only, kept off the serving import path
+    paths = event_log_paths(csv_path) or [csv_path]
+    frames = [drop_torn_rows(pd.read_csv(path, usecols=columns, on_bad_lines="skip")) for path in paths]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
 
+def iter_event_log(csv_path="chaos_events1.csv", columns=None, chunk_rows=10000):
+    """
+    read_event_log in frames of at most `chunk_rows` rows: the CSV log and its
+    shards are read chunk by chunk; the columnar store reads the projected columns
+    (memory-mapped segments) once and is sliced.
+    """
+    store = get_event_store()
+    if store is not None:
+        df = store.read(columns)
+        for offset in range(0, len(df), chunk_rows):
+            yield df.iloc[offset:offset + chunk_rows].copy()
+        return
+
+    import pandas as pd
+    for path in event_log_paths(csv_path):
+        if os.path.getsize(path) == 0:
+            continue
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows, on_bad_lines="skip"):
+            yield drop_torn_rows(chunk)
+
+def has_events(csv_path="chaos_events1.csv"):
+    store = get_event_store()
+    if store is not None:
+        return store.count() > 0
+    return any(os.path.getsize(path) > 0 for path in event_log_paths(csv_path))
+
+def event_feature_matrix(rows):
+    """
+    Feature matrix and target for logged event rows (dicts), same schema as training.
+    """
+    X = np.array([[
+        STRESSOR_MAP.get(row["stressor"], 3),
+        float(row["value"]),
+        float(row.get("response_time", 0.0)),
+        int(row["fallback_used"]),
+        int(row.get("retry_attempts", 0)),
+        float(row["cpu"]),
+        float(row["mem"]),
+        float(row["confidence"]),
+    ] for row in rows], dtype=float).reshape(-1, len(FEATURE_COLS))
+    y = np.array([int(row["success"]) for row in rows], dtype=int)
+    return X, y
+
+def load_features_from_csv(csv_path="chaos_events1.csv"):
+    """
+    Reads the event log and returns the unscaled feature frame and target.
+    """
+    return frame_features(read_event_log(csv_path, columns=EVENT_COLUMNS))
+
+def frame_features(df):
+    """
+    Unscaled feature frame and target for a frame of raw event columns.
+    """
     # Encode categorical stressor
-    df["stressor_type"] = df["stressor"].apply(encode_stressor)
+    df["stressor_type"] = df["stressor"].map(STRESSOR_MAP).fillna(3).astype(int)
     df["value"] = df["value"].astype(float)
     df["fallback_used"] = df["fallback_used"].astype(int)
     df["success"] = df["success"].astype(int)
@@ -30,23 +135,22 @@ def extract_features_from_csv(csv_path="chaos_events1.csv", scale="standard"):
     if "retry_attempts" not in df.columns:
         df["retry_attempts"] = 0
 
-    feature_cols = [
-        "stressor_type", "value", "response_time",
-        "fallback_used", "retry_attempts", "cpu", "mem", "confidence"
-    ]
+    return df[FEATURE_COLS], df["success"]
 
-    features = df[feature_cols]
+def fit_features_from_csv(csv_path="chaos_events1.csv", scale="standard"):
+    """
+    Like extract_features_from_csv, but also returns the fitted scaler so the
+    exact training statistics can be reused at prediction time.
+    """
+    features, y = load_features_from_csv(csv_path)
 
     # Apply scaling
-    if scale == "standard":
-        scaler = StandardScaler()
-    elif scale == "minmax":
-        scaler = MinMaxScaler()
-    else:
-        raise ValueError("scale must be 'standard' or 'minmax'")
-
+    scaler = make_scaler(scale)
     scaled_features = scaler.fit_transform(features)
-    X_scaled = pd.DataFrame(scaled_features, columns=feature_cols)
+    import pandas as pd
+    X_scaled = pd.DataFrame(scaled_features, columns=FEATURE_COLS)
+    return X_scaled, y, scaler
 
-    y = df["success"]
+def extract_features_from_csv(csv_path="chaos_events1.csv", scale="standard"):
+    X_scaled, y, _ = fit_features_from_csv(csv_path, scale=scale)
     return X_scaled, y
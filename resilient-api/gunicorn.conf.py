@@ -0,0 +1,45 @@
+#Multi-worker serving for the resilient API
+#   gunicorn -c gunicorn.conf.py app:app
+#The app (pipeline, compiled chaos selector, pandas/sklearn imports) is loaded once
+#in the master and shared copy-on-write by the forked workers; the import starts no
+#threads, each worker starts its own in post_fork. Prometheus metrics are written
+#per worker to PROMETHEUS_MULTIPROC_DIR and aggregated by /metrics.
+import gc
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5002')}"
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("WEB_THREADS", "8"))      #chaos requests mostly sleep, so threads per worker
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", "60"))
+graceful_timeout = 30
+
+# prometheus_client picks its value storage at import, so this must be set before
+# the app is preloaded; stale files from a previous run would be summed in
+_metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/resilient-prometheus")
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the collector so it doesn't touch (and copy) their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Log listener, metrics sampler, artifact watchers, warm-up training (one worker)
+    import app
+    app.start_worker_services()
+
+
+def worker_exit(server, worker):
+    import app
+    app.stop_worker_services()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
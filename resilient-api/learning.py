@@ -1,17 +1,33 @@
 import os
-import csv
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from feature_extraction import extract_features_from_csv
-import matplotlib.pyplot as plt
-from sklearn.ensemble import RandomForestClassifier
-import matplotlib
-
-matplotlib.use("Agg")  # Use non-GUI backend - for headless environment
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from feature_extraction import fit_features_from_csv, FEATURE_COLS, event_feature_matrix
+from feature_extraction import read_event_log, has_events
+from pipeline import PredictionPipeline, PipelineLoadError, PIPELINE_PATH
+from event_writer import get_event_writer
+from online_learning import OnlineSuccessModel, OnlineTrainer
+from bandit import LinUCBSelector, BanditTrainer
+from training_window import make_training_window
+from prediction_cache import PredictionCache, PREDICTION_CACHE_ENABLED
+from training_jobs import TrainingSkipped
+# sklearn and matplotlib are imported inside the training/plotting functions, so
+# importing this module to serve (load artifacts, predict, log) stays cheap
 
 # Globals
-MODEL = None
+PIPELINE = None
 CSV_PATH = "chaos_events1.csv" #Change to chaos_events.csv later
+EVENT_LOG_ASYNC = os.environ.get("EVENT_LOG_ASYNC", "1") == "1"
+LEARNING_MODE = os.environ.get("LEARNING_MODE", "batch")   #"online" updates the model from every logged batch
+ONLINE_TRAINER = None
+TRAINING_WINDOW = None   #bounded recent/sampled history, see training_window.py
+SUCCESS_CACHE = PredictionCache("success", ["stressor", "value", "cpu", "mem"]) if PREDICTION_CACHE_ENABLED else None
+ARTIFACT_POLL_INTERVAL = float(os.environ.get("PIPELINE_POLL_INTERVAL", "5"))   #seconds, multi-worker reloads
+_SWAP_LOCK = threading.Lock()
+_ONLINE_LOCK = threading.Lock()
 
 # Stressor encoding map
 STRESSOR_MAP = {
@@ -24,32 +40,254 @@ STRESSOR_MAP = {
 def train_model(X=None, y=None, scale="standard"):
     """
     Trains a logistic regression model on chaos event logs.
+    Without X/y the fitted scaler, model and feature schema are saved as a
+    versioned PredictionPipeline and become the serving model. With explicit
+    X/y (e.g. for plotting) the model is only returned.
     """
-    global MODEL
+    if X is not None and y is not None:
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(max_iter=1000)
+        model.fit(X, y)
+        return model
 
-    if X is None or y is None:
-        X, y = extract_features_from_csv(scale=scale)
-   #X, y = extract_features_from_csv(scale="standard")
-    MODEL = LogisticRegression(max_iter=1000)
-    MODEL.fit(X, y)
-    return MODEL
+    pipeline = swap_pipeline(build_pipeline(scale=scale))
+    return pipeline.model
 
-def predict_with_confidence(stressor, value, cpu, mem):
+def build_pipeline(scale="standard", job=None):
     """
-    Predicts success likelihood and returns confidence score.
+    Fits a new PredictionPipeline from the event log without publishing it.
+    """
+    if job is not None:
+        job.set_stage("loading")
+    window = TRAINING_WINDOW
+    if window is not None and scale == "standard":
+        # Running statistics of the window replace the scaler fit
+        X, y, mean, std = window.success_data()
+        _check_trainable(y, "training window")
+        if job is not None:
+            job.set_stage("fitting")
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(max_iter=1000)
+        model.fit(X, y)
+        return PredictionPipeline(FEATURE_COLS, mean, std, model, n_samples=len(y))
+
+    X, y, scaler = fit_features_from_csv(CSV_PATH, scale=scale)
+    _check_trainable(y, "event log")
+    if job is not None:
+        job.set_stage("fitting")
+    from sklearn.linear_model import LogisticRegression
+    model = LogisticRegression(max_iter=1000)
+    model.fit(X.to_numpy(), y.to_numpy())
+    return PredictionPipeline.from_scaler(FEATURE_COLS, scaler, model, n_samples=len(y))
+
+def _check_trainable(y, source):
+    # LogisticRegression needs both outcomes; fallbacks log success=1, so a quiet
+    # window often has only successes
+    if len(y) == 0:
+        raise TrainingSkipped(f"No events in the {source}; keeping the serving model")
+    classes = np.unique(y)
+    if len(classes) < 2:
+        raise TrainingSkipped(f"All {len(y)} events in the {source} have success={int(classes[0])}; "
+                              "keeping the serving model")
+
+def validate_pipeline(pipeline):
+    """
+    Sanity checks a candidate before it can serve: schema and a finite probability.
+    """
+    if pipeline.feature_cols != FEATURE_COLS:
+        raise ValueError(f"Feature schema mismatch: {pipeline.feature_cols}")
+    n_features = len(pipeline.coef)
+    if n_features != len(FEATURE_COLS) or len(pipeline.offset) != len(FEATURE_COLS):
+        raise ValueError(f"Model expects {n_features} features, schema has {len(FEATURE_COLS)}")
+    prob = pipeline.predict_proba(dict(zip(FEATURE_COLS, pipeline.offset)))
+    if not 0.0 <= prob <= 1.0:
+        raise ValueError(f"Model returned invalid probability {prob}")
+
+def swap_pipeline(pipeline, persist=True):
+    """
+    Validates and atomically installs a new serving pipeline under the next version.
+    Requests hold their own reference, so they see either the old or the new one.
+    """
+    global PIPELINE
+    validate_pipeline(pipeline)
+    with _SWAP_LOCK:
+        pipeline.version = PIPELINE.version + 1 if PIPELINE is not None else 1
+        if persist:
+            pipeline.save(PIPELINE_PATH)
+        PIPELINE = pipeline
+    return pipeline
+
+def load_pipeline(path=PIPELINE_PATH):
+    """
+    Loads the persisted prediction pipeline, returns None if missing or invalid.
+    """
+    global PIPELINE
+    try:
+        pipeline = PredictionPipeline.load(path)
+    except PipelineLoadError:
+        return None
+    PIPELINE = pipeline
+    return pipeline
+
+def pipeline_ready():
+    return PIPELINE is not None
+
+def _artifact_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def watch_artifact(path, reload, interval=ARTIFACT_POLL_INTERVAL):
+    """
+    Calls reload(path) whenever the file at path is replaced, so a model retrained
+    in one worker (or saved by another process) reaches the others.
+    """
+    def _run():
+        last = _artifact_mtime(path)
+        while True:
+            time.sleep(interval)
+            mtime = _artifact_mtime(path)
+            if mtime is None or mtime == last:
+                continue
+            last = mtime
+            reload(path)
+
+    thread = threading.Thread(target=_run, name=f"artifact-watcher-{os.path.basename(path)}", daemon=True)
+    thread.start()
+    return thread
+
+def reload_pipeline(path=PIPELINE_PATH):
+    """
+    Installs the persisted pipeline unless it is the one already serving.
+    Keeps the saved version number. Returns True if it was swapped in.
+    """
+    global PIPELINE
+    try:
+        pipeline = PredictionPipeline.load(path)
+        validate_pipeline(pipeline)
+    except (PipelineLoadError, ValueError):
+        return False
+    with _SWAP_LOCK:
+        if PIPELINE is not None and PIPELINE.digest == pipeline.digest:
+            return False   #our own save
+        PIPELINE = pipeline
+    return True
+
+def start_training_window():
+    """
+    With TRAINING_WINDOW_MODE set, loads the window from the event log and keeps
+    it fed with every batch the event writer flushes; training then uses it.
+    """
+    global TRAINING_WINDOW
+    window = make_training_window()
+    if window is None:
+        return None
+    window.load_history(CSV_PATH)
+    get_event_writer(CSV_PATH).add_listener(window.add_rows)
+    TRAINING_WINDOW = window
+    return window
+
+def start_online_learning():
+    """
+    Resumes the online model from its snapshot and feeds it every batch the
+    event writer flushes. Returns False when there is no snapshot: the model then
+    has to be bootstrapped with bootstrap_online_learning, as a background job.
+    """
+    online = OnlineSuccessModel.load()
+    if online is None:
+        return False
+    _install_online(online)
+    return True
+
+def bootstrap_online_learning(job):
+    """
+    Training job: one chunked pass over the event log (or the snapshot, if another
+    process saved one meanwhile), then the model starts taking live batches.
     """
-    global MODEL
-    if MODEL is None:
+    job.set_stage("loading")
+    online = OnlineSuccessModel.load()
+    if online is None:
+        job.set_stage("bootstrapping")
         try:
-            train_model()
+            online = OnlineSuccessModel.bootstrap(CSV_PATH)
         except Exception:
-            return True, 0.5  # Default optimistic guess
+            online = OnlineSuccessModel()
+        online.save()
+    job.set_stage("swapping")
+    _install_online(online)
+    return {"n_samples": online.n_seen, "ready": online.ready}
 
-    stressor_code = STRESSOR_MAP.get(stressor, 3)
+def online_learning_started():
+    return ONLINE_TRAINER is not None
 
-    # Create feature vector (match training schema)
-    input_df = pd.DataFrame([{
-        "stressor_type": stressor_code,
+def _install_online(online):
+    global ONLINE_TRAINER
+    with _ONLINE_LOCK:
+        if ONLINE_TRAINER is not None:
+            return
+        ONLINE_TRAINER = OnlineTrainer(online, publish=_publish_online)
+    if online.ready:
+        _publish_online(online)
+
+    writer = get_event_writer(CSV_PATH)
+    writer.add_listener(_on_events_logged)
+    # Registered after the writer's own close, so it runs first: drain, then snapshot
+    atexit.register(_stop_online_learning, writer)
+
+def _on_events_logged(rows):
+    X, y = event_feature_matrix(rows)
+    ONLINE_TRAINER.update(X, y)
+
+def _publish_online(online):
+    swap_pipeline(online.to_pipeline(), persist=False)
+
+def _stop_online_learning(writer):
+    # Best effort: a stuck writer must not cost us the snapshot
+    try:
+        writer.flush()
+    except queue.Full:
+        pass
+    ONLINE_TRAINER.snapshot()
+
+def predict_with_confidence(stressor, value, cpu, mem):
+    """
+    Predicts success likelihood and returns confidence score.
+    """
+    pipeline = PIPELINE
+    if pipeline is None:
+        # Never train on the request path; training runs as a background job
+        return True, 0.5  # Default optimistic guess
+
+    cache = SUCCESS_CACHE
+    if cache is not None:
+        # Keyed on the pipeline itself: a swapped-in model never sees old entries
+        key = cache.key((pipeline.version, pipeline.digest), stressor, value, cpu, mem)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    prob = pipeline.predict_proba(_prediction_features(stressor, value, cpu, mem))
+    prediction = int(prob >= 0.5)
+    result = prediction, round(float(prob), 3)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+def predict_with_confidence_batch(stressor, values, cpu, mem):
+    """
+    predict_with_confidence for many values with one vectorized model call.
+    """
+    pipeline = PIPELINE
+    if pipeline is None:
+        return [(True, 0.5)] * len(values)
+    probs = pipeline.predict_proba_many([_prediction_features(stressor, value, cpu, mem) for value in values])
+    return [(int(prob >= 0.5), round(float(prob), 3)) for prob in probs]
+
+def _prediction_features(stressor, value, cpu, mem):
+    # Feature vector (matches training schema)
+    return {
+        "stressor_type": STRESSOR_MAP.get(stressor, 3),
         "value": value,
         "response_time": 0.0,
         "fallback_used": 0,
@@ -57,49 +295,55 @@ def predict_with_confidence(stressor, value, cpu, mem):
         "cpu": cpu,
         "mem": mem,
         "confidence": 0.5  # placeholder
-    }])
-
-    # Scale using training logic
-    #logger.info("Raw input for prediction", extra=input_df.to_dict(orient="records")[0])
-    X_scaled, _ = extract_features_from_csv(scale="standard")
-    scaler_mean = X_scaled.mean()
-    scaler_std = X_scaled.std()
-    input_scaled = (input_df - scaler_mean) / scaler_std
-
-    prob = MODEL.predict_proba(input_scaled)[0][1]
-    prediction = int(prob >= 0.5)
-    return prediction, round(prob, 3)
+    }
 
 def log_chaos_to_csv(stressor, value, result, success, fallback_used, cpu, mem, prediction, confidence, injected_by_ai=False):
     """ 
-    Appends a chaos event with metadata to the CSV log.
-    """
-    file_exists = os.path.isfile(CSV_PATH)
-    with open(CSV_PATH, mode="a", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=[
-            "timestamp", "stressor", "value", "result", "success",
-            "fallback_used", "cpu", "mem", "prediction", "confidence", "injected_by_ai"
-        ])
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow({
-            "timestamp": pd.Timestamp.now().isoformat(),
-            "stressor": stressor,
-            "value": value,
-            "result": result if result is not None else -1,
-            "success": int(success),
-            "fallback_used": int(fallback_used),
-            "cpu": round(cpu, 2),
-            "mem": round(mem, 2),
-            "prediction": int(prediction),
-            "confidence": round(confidence, 3),
-            "injected_by_ai": int(injected_by_ai)
-        })
+    Queues a chaos event with metadata for the CSV log.
+    Rows are appended in batches by the background EventWriter; set
+    EVENT_LOG_ASYNC=0 to write each row synchronously.
+    """
+    row = _event_row(stressor, value, result, success, fallback_used, cpu, mem, prediction, confidence, injected_by_ai)
+    writer = get_event_writer(CSV_PATH)
+    if EVENT_LOG_ASYNC:
+        writer.submit(row)
+    else:
+        writer.write_rows([row])
+
+def log_chaos_batch(events):
+    """
+    Logs several events (dicts of log_chaos_to_csv arguments) in one go.
+    """
+    rows = [_event_row(**event) for event in events]
+    writer = get_event_writer(CSV_PATH)
+    if EVENT_LOG_ASYNC:
+        writer.submit_many(rows)
+    else:
+        writer.write_rows(rows)
+
+def _event_row(stressor, value, result, success, fallback_used, cpu, mem, prediction, confidence, injected_by_ai=False):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "stressor": stressor,
+        "value": value,
+        "result": result if result is not None else -1,
+        "success": int(success),
+        "fallback_used": int(fallback_used),
+        "cpu": round(cpu, 2),
+        "mem": round(mem, 2),
+        "prediction": int(prediction),
+        "confidence": round(confidence, 3),
+        "injected_by_ai": int(injected_by_ai)
+    }
 
 
 
 
 def plot_feature_importance(model, feature_names):
+    import matplotlib
+    matplotlib.use("Agg")  # Use non-GUI backend - for headless environment
+    import matplotlib.pyplot as plt
+
     importance = model.coef_[0]     #shape: (4,)
     if len(importance) != len(feature_names):
         raise ValueError(f"Mismatch: {len(importance)} coefficients vs {len(feature_names)} features")
@@ -115,19 +359,25 @@ def plot_feature_importance(model, feature_names):
 
 
 #Chaos sector model - to inject chaos using Artificial Intelligence
-import os
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
+class DummyChaosSelector:
+    # Dummy model that always selects "none"
+    def predict(self, X):
+        return [3] * len(X)  # 3 = "none" in STRESSOR_MAP
 
 def train_chaos_selector(csv_path="chaos_events1.csv"):
-    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
-        # Return a dummy model that always selects "none"
-        class DummyChaosSelector:
-            def predict(self, X):
-                return [3] * len(X)  # 3 = "none" in STRESSOR_MAP
+    if TRAINING_WINDOW is not None:
+        X, y = TRAINING_WINDOW.selector_data()
+        if len(X) == 0:
+            return DummyChaosSelector()
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier()
+        model.fit(X, y)
+        return model
+
+    if not has_events(csv_path):
         return DummyChaosSelector()
 
-    df = pd.read_csv(csv_path)
+    df = read_event_log(csv_path, columns=["stressor", "success", "value", "cpu", "mem", "confidence"])
 
     if df.empty or "stressor" not in df.columns:
         return DummyChaosSelector()
@@ -144,10 +394,31 @@ def train_chaos_selector(csv_path="chaos_events1.csv"):
     X = df[feature_cols]
     y = df["stressor_type"]
 
+    from sklearn.ensemble import RandomForestClassifier
     model = RandomForestClassifier()
     model.fit(X, y)
     return model
 
+def start_chaos_bandit():
+    """
+    Resumes the LinUCB chaos selector from its snapshot (or starts it fresh) and
+    updates it from every batch the event writer flushes.
+    """
+    bandit = LinUCBSelector.load() or LinUCBSelector()
+    trainer = BanditTrainer(bandit)
+    writer = get_event_writer(CSV_PATH)
+    writer.add_listener(trainer)
+    # Registered after the writer's own close, so it runs first: drain, then snapshot
+    atexit.register(_stop_chaos_bandit, writer, trainer)
+    return bandit
+
+def _stop_chaos_bandit(writer, trainer):
+    try:
+        writer.flush()
+    except queue.Full:
+        pass
+    trainer.snapshot()
+
 #Delete the one on top of this (train_chaos_selector) and replace with the commented one
 """ 
 def train_chaos_selector():
@@ -1,6 +1,10 @@
+import os
 import random
 from locust import HttpUser, task, between
 
+#Which APIs to hit, e.g. LOCUST_APIS=resilient when only the resilient service is running
+APIS = os.environ.get("LOCUST_APIS", "naive,reactive,resilient,antifragile").split(",")
+
 class ResilientUser(HttpUser):
     #wait_time = between(1, 3)  # Simulates user think time
     #Random dalay between tasks to simulate user think time
@@ -25,10 +29,14 @@ class ResilientUser(HttpUser):
         print(f"Sending payload: {payload}")
 
         #Naive API
-        naive_response = self.client.post("/naive-api/process", json=payload, name="Naive API")
+        if "naive" in APIS:
+            naive_response = self.client.post("/naive-api/process", json=payload, name="Naive API")
         #Reactive API
-        reactive_response = self.client.post("/reactive-api/process", json=payload, name="Reactive API")
+        if "reactive" in APIS:
+            reactive_response = self.client.post("/reactive-api/process", json=payload, name="Reactive API")
         #Resilient API
-        resilient_response = self.client.post("/resilient-api/process", json=payload, name= "Resilient API")
+        if "resilient" in APIS:
+            resilient_response = self.client.post("/resilient-api/process", json=payload, name= "Resilient API")
         #Antifragile API
-        antifragile_response = self.client.post("/antifragile-api/process", json=payload, name= "Antifragile API")
\ No newline at end of file
+        if "antifragile" in APIS:
+            antifragile_response = self.client.post("/antifragile-api/process", json=payload, name= "Antifragile API")
\ No newline at end of file
@@ -0,0 +1,174 @@
+#Structured logging for the request path
+#With LOG_ASYNC=1 (default) a request only filters the record and puts it on a
+#bounded queue; formatting and the stream write happen on a QueueListener thread.
+#The thread is started by start_async_logging() (app.start_worker_services, after
+#fork); until then, records are written synchronously.
+#Per-message sampling (LOG_SAMPLE_RATES) and rate limits (LOG_RATE_LIMITS, records/s)
+#are keyed on the message text, e.g.
+#   LOG_SAMPLE_RATES='{"System metrics": 0.01, "Chaos injected": 0.1}'
+#   LOG_RATE_LIMITS='{"Operation succeeded": 50}'
+#Records at ERROR and above are never sampled, rate limited or dropped.
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from pythonjsonlogger import jsonlogger
+from prometheus_client import Counter
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "1") == "1"
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = json.loads(os.environ.get("LOG_SAMPLE_RATES", "{}"))
+LOG_RATE_LIMITS = json.loads(os.environ.get("LOG_RATE_LIMITS", "{}"))
+
+LOG_DROPPED = Counter("resilient_log_dropped_total", "Log records not written", ["reason"])
+
+
+def _orjson_dumps(obj, default=None, **kwargs):
+    # json.dumps-compatible signature for JsonFormatter(json_serializer=...)
+    try:
+        return orjson.dumps(obj, default=default or str).decode()
+    except TypeError:
+        # orjson rejects what it can't encode natively, e.g. ints wider than 64 bits
+        return json.dumps(obj, default=default or str, **kwargs)
+
+
+def json_formatter(fmt):
+    if orjson is not None:
+        return jsonlogger.JsonFormatter(fmt, json_serializer=_orjson_dumps, json_default=str)
+    return jsonlogger.JsonFormatter(fmt)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a `rate` fraction of each message type and at most `limit` per second.
+    """
+
+    def __init__(self, rates=None, limits=None):
+        super().__init__()
+        self.rates = rates or {}
+        self.limits = limits or {}
+        self._windows = {}   # message -> [second, count]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        key = record.msg
+        rate = self.rates.get(key)
+        if rate is not None and random.random() >= rate:
+            LOG_DROPPED.labels(reason="sampled").inc()
+            return False
+        limit = self.limits.get(key)
+        if limit is not None:
+            now = int(time.monotonic())
+            with self._lock:
+                window = self._windows.setdefault(key, [now, 0])
+                if window[0] != now:
+                    window[0], window[1] = now, 0
+                window[1] += 1
+                over = window[1] > limit
+            if over:
+                LOG_DROPPED.labels(reason="rate_limited").inc()
+                return False
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops (and counts) records when the queue is full,
+    except errors, which wait for room. Writes to `target` directly while set.
+    """
+
+    def __init__(self, queue, target=None):
+        super().__init__(queue)
+        self.target = target
+
+    def prepare(self, record):
+        # Same process: the listener formats the original record, nothing to copy
+        return record
+
+    def enqueue(self, record):
+        target = self.target
+        if target is not None:
+            target.handle(record)   #no listener running yet
+            return
+        if record.levelno >= logging.ERROR:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.labels(reason="queue_full").inc()
+
+
+class AsyncLogging:
+    """
+    The queue handler and its listener thread (started per process by start()).
+    """
+
+    def __init__(self, handler, maxsize=LOG_QUEUE_SIZE):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.queue_handler = BoundedQueueHandler(queue.Queue(maxsize=maxsize), target=handler)
+        self.listener = None
+        self.running = False
+        _ASYNC_LOGGING.append(self)
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        if self.running:
+            return
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, self.handler)
+        self.listener.start()
+        self.running = True
+        self.queue_handler.target = None
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.queue_handler.target = self.handler
+            self.listener.stop()   # drains what is queued
+
+    def _after_fork(self):
+        # The parent's listener thread is gone: write directly until start()
+        self.queue_handler.queue = queue.Queue(maxsize=self.maxsize)
+        self.queue_handler.target = self.handler
+        self.listener = None
+        self.running = False
+
+
+_ASYNC_LOGGING = []
+
+
+def start_async_logging():
+    """
+    Starts the listener threads of every logger configured with LOG_ASYNC=1.
+    """
+    for async_logging in _ASYNC_LOGGING:
+        async_logging.start()
+
+
+def configure_logging(logger, fmt, level=logging.INFO):
+    """
+    Attaches the JSON stream handler to `logger`, behind the queue when LOG_ASYNC=1.
+    """
+    logger.setLevel(level)
+    handler = logging.StreamHandler()
+    handler.setFormatter(json_formatter(fmt))
+    sampler = SamplingFilter(LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
+    if LOG_ASYNC:
+        handler = AsyncLogging(handler).queue_handler
+    handler.addFilter(sampler)
+    logger.addHandler(handler)
+    return logger
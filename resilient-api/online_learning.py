@@ -0,0 +1,164 @@
+#Online (incremental) training of the success model
+#Instead of refitting LogisticRegression on the whole history, an SGD logistic
+#model is updated with partial_fit from each mini-batch of newly logged events.
+#Feature scaling uses running (Welford) statistics, so the cost per event is
+#constant no matter how long the history is. Periodic snapshots let a restart
+#resume without replaying the event log.
+import copy
+import os
+import pickle
+import threading
+import time
+import numpy as np
+from feature_extraction import FEATURE_COLS, EVENT_COLUMNS, iter_event_log, frame_features
+from pipeline import PredictionPipeline
+from atomic_file import atomic_write
+
+ONLINE_SNAPSHOT_PATH = os.environ.get("ONLINE_SNAPSHOT_PATH", "online_model.pkl")
+SNAPSHOT_EVERY = int(os.environ.get("ONLINE_SNAPSHOT_EVERY", "1000"))              #events
+SNAPSHOT_INTERVAL = float(os.environ.get("ONLINE_SNAPSHOT_INTERVAL", "60"))        #seconds
+BOOTSTRAP_CHUNK = 10000
+
+
+class RunningStats:
+    """
+    Welford mean/variance per feature, population (ddof=0) like StandardScaler.
+    """
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def update(self, X):
+        # Chan et al. batch merge of (n, mean, M2)
+        X = np.asarray(X, dtype=float)
+        n_b = len(X)
+        if n_b == 0:
+            return
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / n
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / n
+        self.n = n
+
+    def remove(self, X):
+        """
+        Takes rows that were added earlier back out (the batch merge reversed).
+        """
+        X = np.asarray(X, dtype=float)
+        n_b = len(X)
+        if n_b == 0:
+            return
+        n = self.n - n_b
+        if n <= 0:
+            self.n, self.mean, self.m2 = 0, np.zeros_like(self.mean), np.zeros_like(self.m2)
+            return
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        mean = (self.mean * self.n - mean_b * n_b) / n
+        delta = mean_b - mean
+        self.m2 = np.maximum(self.m2 - m2_b - delta ** 2 * n * n_b / self.n, 0.0)
+        self.mean = mean
+        self.n = n
+
+    @property
+    def std(self):
+        if self.n == 0:
+            return np.ones_like(self.mean)
+        std = np.sqrt(self.m2 / self.n)
+        std[std == 0.0] = 1.0   #StandardScaler leaves constant columns unscaled
+        return std
+
+
+class OnlineSuccessModel:
+    """
+    SGD logistic regression + running scaler statistics.
+    """
+
+    def __init__(self, feature_cols=FEATURE_COLS):
+        self.feature_cols = list(feature_cols)
+        self.stats = RunningStats(len(self.feature_cols))
+        from sklearn.linear_model import SGDClassifier
+        self.model = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+        self.n_seen = 0
+        self.updates = 0
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return
+        self.stats.update(X)
+        X_scaled = (X - self.stats.mean) / self.stats.std
+        self.model.partial_fit(X_scaled, y, classes=np.array([0, 1]))
+        self.n_seen += len(X)
+        self.updates += 1
+
+    @property
+    def ready(self):
+        return hasattr(self.model, "coef_")
+
+    def to_pipeline(self):
+        """
+        Frozen copy for serving; later partial_fit calls don't touch it.
+        """
+        return PredictionPipeline(
+            self.feature_cols, self.stats.mean.copy(), self.stats.std.copy(),
+            copy.deepcopy(self.model), n_samples=self.n_seen
+        )
+
+    def save(self, path=ONLINE_SNAPSHOT_PATH):
+        with atomic_write(path) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path=ONLINE_SNAPSHOT_PATH):
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return model if isinstance(model, OnlineSuccessModel) else None
+
+    @classmethod
+    def bootstrap(cls, csv_path):
+        """
+        First start without a snapshot: one pass over the existing log, read and
+        fitted BOOTSTRAP_CHUNK rows at a time.
+        """
+        online = cls()
+        for chunk in iter_event_log(csv_path, EVENT_COLUMNS, BOOTSTRAP_CHUNK):
+            X, y = frame_features(chunk)
+            online.partial_fit(X.to_numpy(dtype=float), y.to_numpy())
+        return online
+
+
+class OnlineTrainer:
+    """
+    Applies event batches to an OnlineSuccessModel and publishes serving snapshots.
+    """
+
+    def __init__(self, online, publish, snapshot_path=ONLINE_SNAPSHOT_PATH):
+        self.online = online
+        self.publish = publish   #callback receiving the OnlineSuccessModel after each update
+        self.snapshot_path = snapshot_path
+        self._lock = threading.RLock()
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+
+    def update(self, X, y):
+        with self._lock:
+            self.online.partial_fit(X, y)
+            self._since_snapshot += len(X)
+            if self.online.ready:
+                self.publish(self.online)
+            if self._since_snapshot >= SNAPSHOT_EVERY or time.monotonic() - self._last_snapshot >= SNAPSHOT_INTERVAL:
+                self.snapshot()
+
+    def snapshot(self):
+        with self._lock:
+            self.online.save(self.snapshot_path)
+            self._since_snapshot = 0
+            self._last_snapshot = time.monotonic()
@@ -0,0 +1,151 @@
+#Fitted prediction pipeline for the success model
+#Bundles the scaler statistics, the classifier and the feature schema so that
+#scoring a request is O(1) and uses exactly the statistics seen in training.
+#The classifier is pickled separately inside the artifact and only unpickled when
+#something asks for .model, so loading a pipeline to serve needs no sklearn import.
+import hashlib
+import os
+import pickle
+import time
+import numpy as np
+from compiled_models import CompiledLogistic
+from atomic_file import atomic_write
+
+PIPELINE_FORMAT = 2
+PIPELINE_PATH = os.environ.get("PIPELINE_PATH", "success_pipeline.pkl")
+
+
+class PipelineLoadError(Exception):
+    pass
+
+
+class PredictionPipeline:
+    """
+    Scaler statistics + classifier + feature schema.
+    """
+
+    def __init__(self, feature_cols, offset, factor, model, scale_kind="standard", version=1, n_samples=0):
+        self.feature_cols = list(feature_cols)
+        self.scale_kind = scale_kind
+        self.offset = np.asarray(offset, dtype=float)
+        self.factor = np.asarray(factor, dtype=float)
+        self.model = model
+        self.version = version
+        self.n_samples = n_samples
+        self.trained_at = time.time()
+        self.digest = None
+
+    @property
+    def model(self):
+        model = self.__dict__.get("_model")
+        if model is None and self._model_bytes is not None:
+            model = self._model = pickle.loads(self._model_bytes)
+        return model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._model_bytes = None
+        # Linear model parameters are kept as arrays for the compiled scorer
+        self.coef = np.asarray(model.coef_, dtype=float).reshape(-1)
+        self.intercept = np.asarray(model.intercept_, dtype=float).reshape(-1)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_compiled", None)
+        model = state.pop("_model", None)
+        if model is not None:
+            state["_model_bytes"] = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        return state
+
+    @classmethod
+    def from_scaler(cls, feature_cols, scaler, model, **kwargs):
+        """
+        Keeps the raw scaler arrays and replays the scaler's own arithmetic, so
+        prediction matches fit_transform exactly (ddof=0, zero-variance columns
+        scaled by 1).
+        """
+        if hasattr(scaler, "mean_"):
+            return cls(feature_cols, scaler.mean_, scaler.scale_, model, scale_kind="standard", **kwargs)
+        return cls(feature_cols, scaler.min_, scaler.scale_, model, scale_kind="minmax", **kwargs)
+
+    def transform(self, X):
+        X = np.array(X, dtype=float)
+        if self.scale_kind == "standard":
+            X -= self.offset
+            X /= self.factor
+        else:
+            X *= self.factor
+            X += self.offset
+        return X
+
+    @property
+    def compiled(self):
+        """
+        NumPy-only form of the scaler + model, built on first use.
+        """
+        compiled = self.__dict__.get("_compiled")
+        if compiled is None:
+            compiled = self._compiled = CompiledLogistic.from_pipeline(self)
+        return compiled
+
+    def feature_matrix(self, rows):
+        return np.array([[features[col] for col in self.feature_cols] for features in rows], dtype=float)
+
+    def predict_proba(self, features):
+        """
+        Probability of success for one feature dict (keys = feature schema).
+        """
+        return self.compiled.predict_proba_row([features[col] for col in self.feature_cols])
+
+    def predict_proba_many(self, rows):
+        """
+        Success probabilities for a list of feature dicts in one vectorized call.
+        """
+        if not rows:
+            return np.empty(0)
+        return self.compiled.predict_proba_matrix(self.feature_matrix(rows))
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "digest": self.digest,
+            "scale": self.scale_kind,
+            "features": self.feature_cols,
+            "n_samples": self.n_samples,
+            "trained_at": self.trained_at,
+        }
+
+    def save(self, path=PIPELINE_PATH):
+        """
+        Writes the pipeline atomically with a sha256 of its payload.
+        """
+        self.digest = None
+        payload = pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        self.digest = hashlib.sha256(payload).hexdigest()
+        with atomic_write(path) as f:
+            pickle.dump({
+                "format": PIPELINE_FORMAT,
+                "version": self.version,
+                "digest": self.digest,
+                "payload": payload,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self.digest
+
+    @staticmethod
+    def load(path=PIPELINE_PATH):
+        try:
+            with open(path, "rb") as f:
+                envelope = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            raise PipelineLoadError(f"Cannot read pipeline {path}: {e}")
+
+        if envelope.get("format") != PIPELINE_FORMAT:
+            raise PipelineLoadError(f"Unsupported pipeline format: {envelope.get('format')}")
+        payload = envelope["payload"]
+        if hashlib.sha256(payload).hexdigest() != envelope["digest"]:
+            raise PipelineLoadError(f"Pipeline {path} failed hash check")
+
+        pipeline = pickle.loads(payload)
+        pipeline.digest = envelope["digest"]
+        return pipeline
@@ -0,0 +1,92 @@
+#LRU + TTL cache for per-request model calls
+#Requests repeat a handful of inputs (the same few values, CPU/memory that barely
+#move), so predictions are cached under the model version plus the features
+#quantized to configurable steps, e.g. PREDICTION_CACHE_STEPS='{"cpu": 5, "mem": 2}'
+#(0 = exact). A retrained model has a new version, so its entries start cold and the
+#old ones age out. Inputs that fall into the same step share the first answer
+#computed for them. PREDICTION_CACHE_MAX_ENTRIES caps memory (roughly 300 bytes
+#per entry), PREDICTION_CACHE_TTL bounds staleness.
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+
+PREDICTION_CACHE_ENABLED = os.environ.get("PREDICTION_CACHE_ENABLED", "1") == "1"
+PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", "10000"))   #per cache
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "30"))    #seconds
+PREDICTION_CACHE_STEPS = {
+    "value": 0.0, "cpu": 1.0, "mem": 1.0, "confidence": 0.01,
+    **json.loads(os.environ.get("PREDICTION_CACHE_STEPS", "{}")),
+}
+
+CACHE_HITS = Counter("resilient_prediction_cache_hits_total", "Prediction cache hits", ["cache"])
+CACHE_MISSES = Counter("resilient_prediction_cache_misses_total", "Prediction cache misses", ["cache"])
+CACHE_EVICTIONS = Counter(
+    "resilient_prediction_cache_evictions_total", "Prediction cache entries evicted", ["cache", "reason"]
+)
+CACHE_ENTRIES = Gauge(
+    "resilient_prediction_cache_entries", "Entries in the prediction cache", ["cache"], multiprocess_mode="livesum"
+)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU with per-entry expiry; `features` names the quantized key fields.
+    """
+
+    def __init__(self, name, features, max_entries=PREDICTION_CACHE_MAX_ENTRIES, ttl=PREDICTION_CACHE_TTL,
+                 steps=PREDICTION_CACHE_STEPS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.steps = tuple(steps.get(feature, 0.0) for feature in features)
+        self._entries = OrderedDict()   #key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._lru_evictions = CACHE_EVICTIONS.labels(cache=name, reason="lru")
+        self._ttl_evictions = CACHE_EVICTIONS.labels(cache=name, reason="ttl")
+        self._size = CACHE_ENTRIES.labels(cache=name)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def key(self, version, *features):
+        return (version, *(round(x / step) if step else x for x, step in zip(features, self.steps)))
+
+    def get(self, key):
+        """
+        Cached value or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return entry[1]
+                del self._entries[key]
+                self._ttl_evictions.inc()
+                self._size.set(len(self._entries))
+        self._misses.inc()
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._lru_evictions.inc()
+            self._size.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size.set(0)
+
+    def __len__(self):
+        return len(self._entries)
@@ -16,6 +16,122 @@ curl -X POST http://localhost:5002/resilient-api/process \
      -d '{"value": 10}'
 
 
+1.1 Batch processing (one model call per batch, at most RESILIENT_MAX_BATCH_SIZE values)
+curl -X POST http://localhost:5002/resilient-api/process-batch \
+     -H "Content-Type: application/json" \
+     -d '{"values": [10, 1.5, -5]}'
+
+
+1.2 Async (ASGI) serving mode - same /resilient-api/process, retries and latency are asyncio sleeps
+uvicorn async_app:app --host 0.0.0.0 --port 5002
+Sleep-based chaos stressors are awaited on the event loop; CPU burn and fsync run on
+ASYNC_CHAOS_THREADS threads (default one per CPU).
+Compare with the Flask dev server under locustfile.py: ./benchmarks/compare_servers.sh 2000 60s
+(LOCUST_APIS=resilient makes locustfile.py hit only the resilient API)
+
+
+1.3 Multi-worker serving (what the docker image runs)
+gunicorn -c gunicorn.conf.py app:app
+WEB_WORKERS (default: CPU count) and WEB_THREADS (default 8) size it; /metrics aggregates all workers.
+Training jobs are tracked per worker; a retrained model is saved and picked up by the other workers
+within PIPELINE_POLL_INTERVAL seconds.
+
+
+1.4 Startup and readiness
+Models are served from success_pipeline.pkl and chaos_selector.npz (CHAOS_SELECTOR_PATH); missing ones
+are trained in the background on startup (under gunicorn by the one worker holding WARMUP_LOCK_PATH, the others
+load its artifacts). curl http://localhost:5002/ready returns 503 until both are warm.
+resilient_startup_seconds{phase="import"|"ready"} on /metrics tracks how long a restart takes.
+
+
+1.5 Retry policy (retry_policy.py)
+Each request has a deadline (RETRY_DEADLINE_SECONDS, or lower via the X-Deadline-Ms header) that covers the chaos
+stressor and the retried operation; retries back off exponentially with jitter, and retries draw from a shared
+budget (RETRY_BUDGET_RATIO retries per request).
+When any of them runs out the request goes to the value * 1.5 fallback; the response says why (fallback_reason).
+Metrics: resilient_retries_total, resilient_retry_give_up_total{reason}, resilient_retry_budget_tokens.
+
+
+1.6 Circuit breaker (circuit_breaker.py)
+One breaker per stressor (CIRCUIT_PER_STRESSOR=0 for a single one). It opens when CIRCUIT_FAILURE_RATE of the
+requests in the last CIRCUIT_WINDOW_SECONDS failed (at least CIRCUIT_MIN_REQUESTS), sends requests straight to
+the fallback (fallback_reason "circuit_open") for CIRCUIT_OPEN_SECONDS, then closes after CIRCUIT_HALF_OPEN_PROBES
+successful probes. Metrics: resilient_circuit_state{breaker}, resilient_circuit_transitions_total,
+resilient_circuit_short_circuited_total. Current states are also listed on /ready.
+
+
+1.7 Load shedding (admission.py)
+/resilient-api/process admits at most resilient_admission_limit concurrent requests per process; the limit adapts
+to observed request latency (ADMISSION_* env vars, ADMISSION_ENABLED=0 turns it off). Excess requests get an
+immediate 503 with Retry-After. Metrics: resilient_admission_limit, resilient_admission_in_flight,
+resilient_admission_rejected_total. /resilient-api/process-batch goes through the same limiter with one slot per
+item (a batch larger than the limit is only admitted when nothing else is in flight).
+
+
+1.8 Chaos stressors (chaos.py)
+timeout = timer sleep of CHAOS_TIMEOUT_MS, latency = CPU burn of CHAOS_CPU_MS, failure = raise. Memory and IO stressors
+can be mapped in through CHAOS_PLAN (JSON). Stressors count against the request deadline (1.5): their
+durations are cut to the time left, so a timeout draw holds a worker thread for at most the deadline, and what it
+used is no longer available to the retried operation. The measured cost is on /metrics as
+resilient_chaos_stressor_seconds{kind, resource="wall"|"cpu"}.
+
+
+1.9 Bandit chaos selector (bandit.py)
+CHAOS_SELECTOR_MODE=bandit replaces the random forest with a LinUCB contextual bandit over value, cpu, mem and
+confidence. It learns from every logged event (reward = the success model's prediction error,
+|success - confidence|, on the observed outcome),
+explores with CHAOS_BANDIT_ALPHA and is snapshotted to chaos_bandit.npz (CHAOS_BANDIT_PATH).
+
+
+1.10 Logging (logging_setup.py)
+Log records go through a bounded queue (LOG_QUEUE_SIZE) to a background writer; LOG_ASYNC=0 writes inline.
+Sampling and rate limits per message, e.g. LOG_SAMPLE_RATES='{"System metrics": 0.01}' LOG_RATE_LIMITS='{"Chaos injected": 50}'.
+Errors are always written. Dropped records: resilient_log_dropped_total{reason="sampled"|"rate_limited"|"queue_full"}.
+
+
+1.11 Profiling (profiling.py)
+Per-stage request time: resilient_stage_seconds{stage="metrics"|"predict"|"select"|"chaos"|"operation"|"log"};
+attempts per request: resilient_retry_attempts.
+curl "http://localhost:5002/admin/profile?seconds=10" > profile.folded   # sampling profiler, collapsed stacks
+flamegraph.pl profile.folded > profile.svg    # or drop profile.folded into speedscope.app
+Under gunicorn the profile covers the worker that served the request. PROFILE_MAX_SECONDS caps the duration.
+
+
+1.12 Benchmarks (benchmarks/bench_suite.py)
+python benchmarks/bench_suite.py --save-baseline     # once per machine, writes benchmarks/results/baseline.json
+python benchmarks/bench_suite.py                     # exits 1 on a >25% slowdown or memory growth (--threshold)
+Feature extraction and training on synthetic logs of --rows (1k..1M by default, 10M works), prediction, AI stressor
+selection, event logging and the full request through the Flask test client (chaos sleeps stubbed).
+
+Open-loop load on all four APIs (pip install aiohttp), each with its own arrival rate and keep-alive pool:
+python benchmarks/loadgen.py --rate 50 --duration 60 [--apis resilient,naive] [--target resilient=http://host:port/resilient-api/process]
+Latency percentiles are measured from the scheduled send time (coordinated-omission corrected); svc_p99 from when the request gets a connection.
+
+
+1.13 Training window (training_window.py)
+By default retraining reads the whole event log. TRAINING_WINDOW_MODE=time keeps only the last TRAINING_WINDOW_SECONDS
+(3600, at most TRAINING_WINDOW_MAX_ROWS) in memory, TRAINING_WINDOW_MODE=reservoir a uniform sample of
+TRAINING_RESERVOIR_SIZE events; both success model and chaos selector train from it. Memory is fixed at startup.
+A success-model job on a window with no events, or with only one success class, ends as "skipped" (reason in
+"error") and the serving model stays; an empty window gives the chaos selector a constant "none".
+
+
+1.14 Outcome rollups (rollups.py)
+curl "http://localhost:5002/stats?minutes=5&by=stressor,origin"    # by: any of stressor, origin, outcome
+Per group: count, success/fallback/failure counts and rates, mean confidence, latency p50/p90/p99 (chaos + operation).
+Kept per minute for ROLLUP_RETENTION_MINUTES (1440); ROLLUP_PATH=chaos_rollups.json makes each process save its own
+buckets to ROLLUP_PATH.<host>-<pid> every ROLLUP_PERSIST_INTERVAL seconds; on start the main file and the shards of
+exited processes are merged back into ROLLUP_PATH. Under gunicorn each worker answers for its own requests plus the
+history loaded at start.
+
+
+1.15 Prediction cache (prediction_cache.py)
+Success predictions and AI stressor picks are cached per model version on quantized inputs (default steps: cpu and mem
+1 point, confidence 0.01, value exact; PREDICTION_CACHE_STEPS='{"cpu": 5}'), PREDICTION_CACHE_TTL=30 s,
+PREDICTION_CACHE_MAX_ENTRIES=10000 per cache. PREDICTION_CACHE_ENABLED=0 turns it off; bandit picks are never cached.
+Metrics: resilient_prediction_cache_{hits,misses,evictions}_total{cache}, resilient_prediction_cache_entries.
+
+
 2. Resislience Testing
 for i in {1..20}; do
   curl -s -X POST http://localhost:5002/resilient-api/process \
@@ -65,6 +181,12 @@ http://loki:3100 - url for adding a new data set
 
 http://localhost:5002/generate-feature-importance - historgram
 
+Training runs in the background - /train-model and /generate-feature-importance return a job (202)
+  curl -X POST http://localhost:5002/train-model -H "Content-Type: application/json" -d '{"model": "chaos-selector"}'
+  curl http://localhost:5002/train-model/jobs/<job_id>             - job status
+  curl -X DELETE http://localhost:5002/train-model/jobs/<job_id>   - cancel
+  add ?wait=true to block until the job has finished
+
 Query - resilient_chaos_origin_total{origin=~"ai|random"}
 
 AI vs Random Injection Over Time	Time Series	resilient_chaos_origin_total{origin=~"ai|random"}
@@ -0,0 +1,142 @@
+#Deadline-aware retry policy
+#Every request gets a deadline and retries back off exponentially with full jitter
+#(tenacity's wait_random_exponential). Retries are paid for from a process-wide
+#token bucket that each request tops up by RETRY_BUDGET_RATIO, so a failure burst
+#adds at most that fraction of extra load. When attempts, deadline or budget run
+#out, tenacity raises RetryError and the caller takes the fallback.
+import os
+import threading
+import time
+from tenacity import Retrying, AsyncRetrying, wait_random_exponential
+from prometheus_client import Counter, Gauge
+
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_DEADLINE = float(os.environ.get("RETRY_DEADLINE_SECONDS", "3.0"))        #per request
+RETRY_BACKOFF_BASE = float(os.environ.get("RETRY_BACKOFF_BASE", "0.1"))       #seconds, doubled per attempt
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", "1.0"))
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", "0.2"))       #retries allowed per request
+RETRY_BUDGET_MIN_RATE = float(os.environ.get("RETRY_BUDGET_MIN_RATE", "1.0")) #retries/s allowed at low traffic
+RETRY_BUDGET_BURST = float(os.environ.get("RETRY_BUDGET_BURST", "10"))
+
+RETRIES = Counter("resilient_retries_total", "Retries granted by the retry policy")
+RETRY_GIVE_UPS = Counter(
+    "resilient_retry_give_up_total", "Requests sent to the fallback by the retry policy", ["reason"]
+)
+RETRY_BUDGET_TOKENS = Gauge(
+    "resilient_retry_budget_tokens", "Retries currently available in the retry budget", multiprocess_mode="livesum"
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all requests: each request deposits `ratio` tokens,
+    each retry withdraws one, and `min_rate` tokens/s trickle in so a quiet
+    service can still retry.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, min_rate=RETRY_BUDGET_MIN_RATE, burst=RETRY_BUDGET_BURST):
+        self.ratio = ratio
+        self.min_rate = min_rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        RETRY_BUDGET_TOKENS.set(self._tokens)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.min_rate)
+        self._last = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+            RETRY_BUDGET_TOKENS.set(self._tokens)
+
+    def try_withdraw(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            RETRY_BUDGET_TOKENS.set(self._tokens)
+            return True
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RetryRun:
+    """
+    Retry state of one request: its deadline, the next backoff and why it gave up.
+    Used as tenacity's stop and wait.
+    """
+
+    def __init__(self, policy, deadline):
+        self.policy = policy
+        self.deadline_at = time.monotonic() + deadline
+        self.next_sleep = 0.0
+        self.attempts = 0
+        self.give_up_reason = None
+        self._backoff = wait_random_exponential(multiplier=policy.backoff_base, max=policy.backoff_max)
+
+    def remaining(self):
+        return self.deadline_at - time.monotonic()
+
+    def before(self, retry_state):
+        self.attempts = retry_state.attempt_number
+
+    def stop(self, retry_state):
+        if retry_state.attempt_number >= self.policy.max_attempts:
+            return self._give_up("attempts")
+        self.next_sleep = self._backoff(retry_state)
+        if self.remaining() <= self.next_sleep:
+            return self._give_up("deadline")
+        if not self.policy.budget.try_withdraw():
+            return self._give_up("budget")
+        RETRIES.inc()
+        return False
+
+    def wait(self, retry_state):
+        return self.next_sleep
+
+    def _give_up(self, reason):
+        self.give_up_reason = reason
+        RETRY_GIVE_UPS.labels(reason=reason).inc()
+        return True
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, deadline=RETRY_DEADLINE,
+                 backoff_base=RETRY_BACKOFF_BASE, backoff_max=RETRY_BACKOFF_MAX, budget=None):
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget or RetryBudget()
+
+    def deadline_for(self, deadline=None):
+        """
+        Seconds a request gets: its own deadline capped by the policy's.
+        """
+        return self.deadline if deadline is None else min(deadline, self.deadline)
+
+    def start(self, deadline=None):
+        """
+        New RetryRun for a request (and its deposit into the retry budget).
+        """
+        self.budget.deposit()
+        return RetryRun(self, self.deadline_for(deadline))
+
+    def retrying(self, run):
+        return Retrying(stop=run.stop, wait=run.wait, before=run.before)
+
+    def async_retrying(self, run):
+        return AsyncRetrying(stop=run.stop, wait=run.wait, before=run.before)
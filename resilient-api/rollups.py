@@ -0,0 +1,301 @@
+#In-process rollups of chaos outcomes
+#Every event adds to a per-minute bucket keyed by stressor x origin (ai/random) x
+#outcome (success/fallback/failure): a count, the sum of prediction confidence and
+#a latency sketch. Recording is a dict lookup and a few additions, so questions like
+#"fallback rate per stressor over the last 5 minutes" are answered from at most
+#ROLLUP_RETENTION_MINUTES buckets instead of a scan of the event log.
+#
+#With ROLLUP_PATH set, every process saves the buckets it recorded itself to its
+#own shard, ROLLUP_PATH.<host>-<pid>, every ROLLUP_PERSIST_INTERVAL seconds and at
+#exit, so gunicorn workers never write the same file. At startup the main file and
+#the shards of processes that are gone are merged, written back to the main file
+#and the merged shards removed (under a lock file), so nothing is counted twice.
+import atexit
+import contextlib
+import glob
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from atomic_file import atomic_write
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_RETENTION_MINUTES = int(os.environ.get("ROLLUP_RETENTION_MINUTES", "1440"))
+ROLLUP_PATH = os.environ.get("ROLLUP_PATH", "")    #empty = memory only
+ROLLUP_PERSIST_INTERVAL = float(os.environ.get("ROLLUP_PERSIST_INTERVAL", "60"))
+
+DIMENSIONS = ("stressor", "origin", "outcome")
+OUTCOMES = ("success", "fallback", "failure")
+
+
+def outcome_of(success, fallback_used):
+    if fallback_used:
+        return "fallback"
+    return "success" if success else "failure"
+
+
+class LatencySketch:
+    """
+    Log-bucketed latency counts (sparse): quantiles within `accuracy` relative
+    error, constant-size per bucket in use, mergeable.
+    """
+
+    ACCURACY = 0.02
+    _GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    _LOG_GAMMA = math.log(_GAMMA)
+    _MIN_SECONDS = 1e-4   #everything faster lands in the first bucket
+
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+
+    def add(self, seconds):
+        index = math.ceil(math.log(max(seconds, self._MIN_SECONDS) / self._MIN_SECONDS) / self._LOG_GAMMA)
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    def quantile(self, q):
+        total = sum(self.counts.values())
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                # Bucket midpoint: (gamma^(i-1), gamma^i] * min
+                return self._MIN_SECONDS * 2 * self._GAMMA ** index / (self._GAMMA + 1)
+        return None
+
+
+class Cell:
+    __slots__ = ("count", "confidence_sum", "latency")
+
+    def __init__(self, count=0, confidence_sum=0.0, latency=None):
+        self.count = count
+        self.confidence_sum = confidence_sum
+        self.latency = latency or LatencySketch()
+
+    def merge(self, other):
+        self.count += other.count
+        self.confidence_sum += other.confidence_sum
+        self.latency.merge(other.latency)
+        return self
+
+    def to_dict(self):
+        return {"count": self.count, "confidence_sum": self.confidence_sum,
+                "latency": {str(k): v for k, v in self.latency.counts.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["count"], data["confidence_sum"],
+                   LatencySketch({int(k): v for k, v in data["latency"].items()}))
+
+
+class Rollups:
+    """
+    Per-minute buckets {(stressor, origin, outcome): Cell}, oldest dropped past retention.
+    """
+
+    def __init__(self, retention_minutes=ROLLUP_RETENTION_MINUTES):
+        self.retention_minutes = retention_minutes
+        self._minutes = OrderedDict()   #recorded by this process
+        self._loaded = OrderedDict()    #read from disk at startup, never saved again by this process
+        self._lock = threading.Lock()
+        self._persist = None   #(path, interval) once start_persisting ran
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._minutes = OrderedDict()   #the parent's own buckets are saved by the parent
+        if self._persist is not None:
+            self._start_persister(*self._persist)
+
+    def record(self, stressor, injected_by_ai, success, fallback_used, confidence, latency, now=None):
+        minute = int((time.time() if now is None else now) // 60)
+        key = (stressor, "ai" if injected_by_ai else "random", outcome_of(success, fallback_used))
+        with self._lock:
+            if self._minutes and minute < next(reversed(self._minutes)):
+                minute = next(reversed(self._minutes))   #clock stepped back, keep buckets ordered
+            bucket = self._minutes.get(minute)
+            if bucket is None:
+                bucket = self._minutes[minute] = {}
+                while len(self._minutes) > self.retention_minutes:
+                    self._minutes.popitem(last=False)
+            cell = bucket.get(key)
+            if cell is None:
+                cell = bucket[key] = Cell()
+            cell.count += 1
+            cell.confidence_sum += confidence
+            cell.latency.add(latency)
+
+    def query(self, minutes=5, by=("stressor", "origin"), now=None):
+        """
+        Totals over the last `minutes` (including the current one), grouped by `by`.
+        """
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions {unknown}, expected some of {list(DIMENSIONS)}")
+        first = int((time.time() if now is None else now) // 60) - minutes + 1
+        positions = [DIMENSIONS.index(dim) for dim in by]
+        groups = {}
+        with self._lock:
+            for minutes_ in (self._minutes, self._loaded):
+                for minute, bucket in reversed(minutes_.items()):
+                    if minute < first:
+                        break
+                    for key, cell in bucket.items():
+                        group = tuple(key[p] for p in positions)
+                        totals = groups.get(group)
+                        if totals is None:
+                            totals = groups[group] = {"cell": Cell(), "outcomes": dict.fromkeys(OUTCOMES, 0)}
+                        totals["cell"].merge(cell)
+                        totals["outcomes"][key[2]] += cell.count
+        return [self._summary(dict(zip(by, group)), totals) for group, totals in sorted(groups.items())]
+
+    @staticmethod
+    def _summary(labels, totals):
+        cell, outcomes = totals["cell"], totals["outcomes"]
+        latency = {f"p{int(q * 100)}_ms": round(cell.latency.quantile(q) * 1e3, 2) for q in (0.5, 0.9, 0.99)}
+        return {
+            **labels,
+            "count": cell.count,
+            "outcomes": outcomes,
+            **{f"{outcome}_rate": round(n / cell.count, 4) for outcome, n in outcomes.items()},
+            "mean_confidence": round(cell.confidence_sum / cell.count, 4),
+            "latency": latency,
+        }
+
+    # ---- persistence ----
+
+    @staticmethod
+    def shard_path(path=ROLLUP_PATH):
+        return f"{path}.{socket.gethostname()}-{os.getpid()}"
+
+    @staticmethod
+    def _serialize(minutes):
+        return {str(minute): [[*key, cell.to_dict()] for key, cell in bucket.items()]
+                for minute, bucket in minutes.items()}
+
+    @staticmethod
+    def _write(path, data, retention_minutes):
+        with atomic_write(path, "w") as f:
+            json.dump({"retention_minutes": retention_minutes, "minutes": data}, f)
+
+    @staticmethod
+    def _read(path):
+        with open(path) as f:
+            return json.load(f)["minutes"]
+
+    def save(self, path=ROLLUP_PATH):
+        """
+        Writes the buckets this process recorded to its shard (nothing if there are none).
+        """
+        with self._lock:
+            if not self._minutes:
+                return
+            data = self._serialize(self._minutes)
+        self._write(self.shard_path(path), data, self.retention_minutes)
+
+    def load(self, path=ROLLUP_PATH):
+        """
+        Merges the main file and the shards of finished processes that are still
+        inside the retention, consolidates them into the main file and removes
+        those shards. Returns False if there was nothing to load.
+        """
+        first = int(time.time() // 60) - self.retention_minutes + 1
+        with self._load_lock(path):
+            sources = [p for p in [path, *self._dead_shards(path)] if os.path.exists(p)]
+            merged = {}
+            for source in sources:
+                try:
+                    data = self._read(source)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("Unreadable rollup file %s: %s", source, e)
+                    continue
+                for minute in (int(m) for m in data):
+                    if minute < first:
+                        continue
+                    bucket = merged.setdefault(minute, {})
+                    for stressor, origin, outcome, cell in data[str(minute)]:
+                        key = (stressor, origin, outcome)
+                        bucket[key] = bucket.get(key, Cell()).merge(Cell.from_dict(cell))
+            merged = OrderedDict(sorted(merged.items()))
+            if sources:
+                self._write(path, self._serialize(merged), self.retention_minutes)
+                for source in sources:
+                    if source != path:
+                        os.remove(source)
+        with self._lock:
+            self._loaded = merged
+        return bool(merged)
+
+    @staticmethod
+    def _dead_shards(path):
+        host = socket.gethostname()
+        shards = []
+        for shard in glob.glob(glob.escape(path) + ".*"):
+            owner = shard[len(path) + 1:]
+            if owner == "lock":
+                continue
+            owner_host, _, pid = owner.rpartition("-")
+            if owner_host != host or not pid.isdigit():
+                continue   #another host's process may still be running
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                shards.append(shard)
+            except PermissionError:
+                pass
+            else:
+                if int(pid) == os.getpid():
+                    shards.append(shard)   #our own shard from before a restart with the same pid
+        return shards
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _load_lock(path):
+        # Workers loading at the same time (no preload) consolidate one after the other
+        fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)   #releases the lock
+
+    def start_persisting(self, path=ROLLUP_PATH, interval=ROLLUP_PERSIST_INTERVAL):
+        """
+        Loads saved buckets, then saves this process's shard every `interval` seconds and at exit.
+        """
+        self.load(path)
+        self._persist = (path, interval)
+        self._start_persister(path, interval)
+        atexit.register(self._save_logged, path)
+        return self
+
+    def _save_logged(self, path):
+        try:
+            self.save(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Saving rollups to %s failed: %s", self.shard_path(path), e)
+
+    def _start_persister(self, path, interval):
+        def _run():
+            while True:
+                time.sleep(interval)
+                self._save_logged(path)
+
+        threading.Thread(target=_run, name="rollup-persister", daemon=True).start()
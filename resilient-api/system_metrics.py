@@ -0,0 +1,120 @@
+#Background system-metrics sampler
+#Samples CPU and memory on a background thread into a ring buffer so the request
+#path reads the latest value (or a windowed aggregate) instead of blocking on
+#psutil.cpu_percent(interval=...).
+import os
+import threading
+import time
+from collections import deque
+import psutil
+from prometheus_client import Gauge
+
+SAMPLE_INTERVAL = float(os.environ.get("SYSTEM_METRICS_INTERVAL", "0.5"))   #seconds between samples
+BUFFER_SECONDS = float(os.environ.get("SYSTEM_METRICS_BUFFER", "300"))      #history kept in the ring buffer
+EXPORT_WINDOW = float(os.environ.get("SYSTEM_METRICS_WINDOW", "10"))        #window for exported aggregates
+
+# Every worker samples the same host, so multiprocess mode keeps the most recent reading
+SYSTEM_CPU = Gauge("resilient_system_cpu_percent", "Sampled CPU utilisation", ["stat"], multiprocess_mode="livemostrecent")
+SYSTEM_MEM = Gauge("resilient_system_memory_percent", "Sampled memory utilisation", ["stat"], multiprocess_mode="livemostrecent")
+
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+class SystemMetricsSampler:
+    """
+    Keeps (timestamp, cpu, mem) samples in a fixed-size ring buffer.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, buffer_seconds=BUFFER_SECONDS, export_window=EXPORT_WINDOW):
+        self.interval = interval
+        self.export_window = export_window
+        self._samples = deque(maxlen=max(1, int(buffer_seconds / interval)))
+        self._lock = threading.Lock()
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fork_hook = False
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if not self._fork_hook:
+            # Threads don't survive fork (prefork servers with a preloaded app)
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook = True
+        self._stop.clear()
+        psutil.cpu_percent(interval=None)   #prime the counter, first reading is meaningless
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="system-metrics-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+
+    def _after_fork(self):
+        running = self._thread is not None and not self._stop.is_set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if running:
+            self.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+            self.export()
+
+    def sample(self):
+        sample = (time.monotonic(), psutil.cpu_percent(interval=None), psutil.virtual_memory().percent)
+        with self._lock:
+            self._samples.append(sample)
+        self._latest = sample
+        return sample
+
+    def latest(self):
+        """
+        Most recent reading, same shape as app.get_system_metrics.
+        """
+        sample = self._latest
+        if sample is None:
+            sample = self.sample()
+        return {"cpu_percent": sample[1], "memory_percent": sample[2]}
+
+    def aggregate(self, window_seconds=None):
+        """
+        Mean and p95 of CPU/memory over the last window_seconds.
+        """
+        window_seconds = window_seconds or self.export_window
+        cutoff = time.monotonic() - window_seconds
+        with self._lock:
+            recent = [s for s in self._samples if s[0] >= cutoff]
+        if not recent:
+            latest = self.latest()
+            return {
+                "cpu_mean": latest["cpu_percent"], "cpu_p95": latest["cpu_percent"],
+                "mem_mean": latest["memory_percent"], "mem_p95": latest["memory_percent"],
+                "samples": 0,
+            }
+        cpu = [s[1] for s in recent]
+        mem = [s[2] for s in recent]
+        return {
+            "cpu_mean": sum(cpu) / len(cpu), "cpu_p95": _p95(cpu),
+            "mem_mean": sum(mem) / len(mem), "mem_p95": _p95(mem),
+            "samples": len(recent),
+        }
+
+    def export(self):
+        stats = self.aggregate()
+        latest = self.latest()
+        SYSTEM_CPU.labels(stat="latest").set(latest["cpu_percent"])
+        SYSTEM_CPU.labels(stat="mean").set(stats["cpu_mean"])
+        SYSTEM_CPU.labels(stat="p95").set(stats["cpu_p95"])
+        SYSTEM_MEM.labels(stat="latest").set(latest["memory_percent"])
+        SYSTEM_MEM.labels(stat="mean").set(stats["mem_mean"])
+        SYSTEM_MEM.labels(stat="p95").set(stats["mem_p95"])
@@ -0,0 +1,67 @@
+#GradientLimiter weighted acquire/release
+import pytest
+
+import admission
+from admission import GradientLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_weights_count_against_the_limit(clock):
+    limiter = GradientLimiter(initial_limit=4, min_limit=1, max_limit=10)
+    batch = limiter.try_acquire(3)
+    assert batch is not None and limiter.in_flight == 3
+    assert limiter.try_acquire(2) is None
+    single = limiter.try_acquire()
+    assert single is not None and limiter.in_flight == 4
+    assert limiter.try_acquire() is None
+    limiter.release(batch, 3)
+    assert limiter.in_flight == 1
+    limiter.release(single)
+    assert limiter.in_flight == 0
+
+
+def test_a_request_heavier_than_the_limit_runs_alone(clock):
+    limiter = GradientLimiter(initial_limit=4, min_limit=1, max_limit=10)
+    started = limiter.try_acquire(10)
+    assert started is not None
+    assert limiter.try_acquire() is None
+    limiter.release(started, 10)
+    assert limiter.in_flight == 0
+
+
+def test_latency_sample_is_per_unit_of_weight(clock):
+    limiter = GradientLimiter(initial_limit=4, min_limit=1, max_limit=10)
+    started = limiter.try_acquire(4)
+    clock.now += 2.0
+    limiter.release(started, 4)
+    assert limiter.baseline == pytest.approx(0.5)
+
+
+def test_slow_requests_shrink_the_limit(clock):
+    limiter = GradientLimiter(initial_limit=20, min_limit=4, max_limit=100, tolerance=2.0, smoothing=1.0)
+    for _ in range(10):   #fast requests at full load set the baseline
+        started = [limiter.try_acquire() for _ in range(int(limiter.limit))]
+        clock.now += 0.01
+        for s in started:
+            limiter.release(s)
+    grown = limiter.limit
+    started = [limiter.try_acquire() for _ in range(int(limiter.limit))]
+    clock.now += 1.0
+    for s in started:
+        limiter.release(s)
+    assert limiter.limit < grown
+    assert limiter.limit >= 4
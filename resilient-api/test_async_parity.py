@@ -0,0 +1,131 @@
+#Parity between the Flask app (app.py) and its ASGI variant (async_app.py)
+#Both apps get the same request and must answer with the same status and body.
+#The stressor is forced through plan_chaos, chaos side effects are switched off
+#and base latency and retry backoff are near zero, so the outcome is deterministic
+#and fast. The apps are imported in a temp directory with a small synthetic event
+#log, so warm-up training and event logging stay out of the repo.
+#   python -m pytest test_async_parity.py
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "benchmarks"))
+
+PLAN = {"cpu": 20.0, "mem": 40.0, "prediction": 1, "confidence": 0.8, "injected_by_ai": True}
+
+
+@pytest.fixture(scope="module")
+def apps(tmp_path_factory):
+    from synthetic import write_events_csv
+
+    workdir = tmp_path_factory.mktemp("parity")
+    write_events_csv(str(workdir / "chaos_events1.csv"), 1000)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app as flask_app
+        import async_app
+        flask_app.start_worker_services()
+        for job in flask_app.WARMUP_JOBS:
+            flask_app.TRAINING_JOBS.wait(job)
+        yield flask_app, async_app
+    finally:
+        # Queued events are written to the relative log path: flush them before leaving
+        flask_app.stop_worker_services()
+        os.chdir(cwd)
+
+
+@pytest.fixture(autouse=True)
+def forced(apps, monkeypatch):
+    """
+    Returns a function that forces the stressor the next requests run under.
+    """
+    import chaos
+    from circuit_breaker import CircuitBreakers
+    from retry_policy import RetryBudget
+
+    flask_app, async_app = apps
+    monkeypatch.setattr(chaos, "CHAOS_PLAN", {})
+    monkeypatch.setattr(flask_app, "BASE_LATENCY", 0.001)
+    monkeypatch.setattr(flask_app.RETRY_POLICY, "backoff_base", 0.001)
+    monkeypatch.setattr(flask_app.RETRY_POLICY, "backoff_max", 0.002)
+
+    def force(stressor):
+        # Fresh breakers and budget, so earlier requests can't change the outcome
+        breakers = CircuitBreakers()
+        monkeypatch.setattr(flask_app.CIRCUIT_BREAKERS, "_breakers", breakers._breakers)
+        monkeypatch.setattr(flask_app.RETRY_POLICY, "budget", RetryBudget())
+        plan = lambda value: {"stressor": stressor, **PLAN}
+        monkeypatch.setattr(flask_app, "plan_chaos", plan)
+        monkeypatch.setattr(async_app, "plan_chaos", plan)
+    force("none")
+    return force
+
+
+def flask_post(flask_app, body):
+    response = flask_app.app.test_client().post("/resilient-api/process", data=body,
+                                                content_type="application/json")
+    return response.status_code, response.get_json()
+
+
+def asgi_post(async_app, body):
+    # Starlette's TestClient needs httpx; a single request is easy to drive by hand
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/resilient-api/process", "raw_path": b"/resilient-api/process",
+             "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+             "client": ("127.0.0.1", 12345), "server": ("testserver", 80)}
+    asyncio.run(async_app.app(scope, receive, send))
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    payload = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return start["status"], json.loads(payload)
+
+
+def both(apps, force, stressor, body):
+    flask_app, async_app = apps
+    force(stressor)
+    flask_result = flask_post(flask_app, body)
+    force(stressor)
+    return flask_result, asgi_post(async_app, body)
+
+
+@pytest.mark.parametrize("value", [10, 0, -5, 1.5, 7777777])
+def test_valid_input(apps, forced, value):
+    flask_result, asgi_result = both(apps, forced, "none", json.dumps({"value": value}).encode())
+    assert flask_result == asgi_result
+    assert flask_result == (200, {"result": value * 2, "retries_used": True, "confidence": PLAN["confidence"]})
+
+
+@pytest.mark.parametrize("body", [
+    {"value": "invalid"}, {"value": None}, {}, {"value": [1]}, [1, 2], "text",
+])
+def test_invalid_input(apps, forced, body):
+    flask_result, asgi_result = both(apps, forced, "none", json.dumps(body).encode())
+    assert flask_result == asgi_result
+    assert flask_result == (400, {"error": "Invalid input: 'value' must be a number"})
+
+
+def test_malformed_json(apps, forced):
+    flask_result, asgi_result = both(apps, forced, "none", b'{"value": ')
+    assert flask_result == asgi_result
+    assert flask_result == (400, {"error": "Invalid JSON body"})
+
+
+@pytest.mark.parametrize("stressor", ["failure", "timeout"])
+def test_fallback(apps, forced, stressor):
+    flask_result, asgi_result = both(apps, forced, stressor, json.dumps({"value": 4}).encode())
+    assert flask_result == asgi_result
+    assert flask_result == (200, {"warning": "Fallback used after retries failed.", "result": 6.0,
+                                  "retries_used": False, "fallback_reason": "attempts",
+                                  "confidence": PLAN["confidence"]})
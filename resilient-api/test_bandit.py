@@ -0,0 +1,76 @@
+#LinUCBSelector: Sherman-Morrison updates against a direct ridge solution
+import numpy as np
+import pytest
+
+from bandit import LinUCBSelector, ARMS, N_FEATURES, context, reward
+
+
+@pytest.fixture
+def observations():
+    rng = np.random.default_rng(0)
+    contexts = [context(value, cpu, mem, confidence) for value, cpu, mem, confidence in
+                zip(rng.normal(0, 500, 300), rng.uniform(0, 100, 300), rng.uniform(0, 100, 300),
+                    rng.uniform(0, 1, 300))]
+    return [(int(rng.integers(len(ARMS))), x, float(rng.uniform())) for x in contexts]
+
+
+def test_update_matches_the_direct_inverse(observations):
+    bandit = LinUCBSelector(alpha=1.0)
+    for arm, x, r in observations:
+        bandit.update(arm, x, r)
+    for arm in range(len(ARMS)):
+        A = np.eye(N_FEATURES)
+        b = np.zeros(N_FEATURES)
+        for seen_arm, x, r in observations:
+            if seen_arm == arm:
+                A += np.outer(x, x)
+                b += r * x
+        np.testing.assert_allclose(bandit.A_inv[arm], np.linalg.inv(A), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(bandit.theta[arm], np.linalg.solve(A, b), rtol=1e-8, atol=1e-10)
+    assert bandit.updates == len(observations)
+    assert bandit.counts.sum() == len(observations)
+
+
+def test_scores_are_the_upper_confidence_bounds(observations):
+    bandit = LinUCBSelector(alpha=0.7)
+    for arm, x, r in observations:
+        bandit.update(arm, x, r)
+    x = observations[0][1]
+    expected = [bandit.theta[a] @ x + 0.7 * np.sqrt(x @ bandit.A_inv[a] @ x) for a in range(len(ARMS))]
+    np.testing.assert_allclose(bandit.scores(x), expected, rtol=1e-12)
+
+
+def test_batch_and_single_row_predictions_agree(observations):
+    bandit = LinUCBSelector()
+    for arm, x, r in observations:
+        bandit.update(arm, x, r)
+    rows = [(10, 20.0, 30.0, 0.9), (-5, 80.0, 60.0, 0.2), (7777777, 5.0, 95.0, 0.5)]
+    assert bandit.predict(rows).tolist() == [bandit.predict_row(row) for row in rows]
+
+
+def test_save_and_load_round_trip(observations, tmp_path):
+    bandit = LinUCBSelector()
+    for arm, x, r in observations:
+        bandit.update(arm, x, r)
+    path = str(tmp_path / "bandit.npz")
+    bandit.save(path)
+    loaded = LinUCBSelector.load(path)
+    np.testing.assert_allclose(loaded.A_inv, bandit.A_inv)
+    np.testing.assert_allclose(loaded.theta, bandit.theta, rtol=1e-10, atol=1e-12)
+    assert loaded.updates == bandit.updates
+
+
+def test_reward_is_the_prediction_error():
+    assert reward(True, 0.9) == pytest.approx(0.1)     #confident and right
+    assert reward(False, 0.9) == pytest.approx(0.9)    #confident and wrong
+    assert reward(True, 0.2) == pytest.approx(0.8)
+
+
+def test_predictable_outcomes_stop_paying():
+    # An arm whose outcome the success model gets right earns less than one that surprises it
+    bandit = LinUCBSelector(alpha=0.0)
+    x = context(10, 50.0, 50.0, 0.9)
+    for _ in range(200):
+        bandit.update(ARMS.index("failure"), x, reward(True, 0.9))
+        bandit.update(ARMS.index("latency"), x, reward(False, 0.9))
+    assert bandit.predict_row((10, 50.0, 50.0, 0.9)) == ARMS.index("latency")
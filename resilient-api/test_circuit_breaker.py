@@ -0,0 +1,97 @@
+#CircuitBreaker closed -> open -> half-open -> closed/open transitions
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", window=10, min_requests=4, failure_rate=0.5, open_seconds=5,
+                          half_open_probes=2)
+
+
+def trip(breaker):
+    for success in (True, True, False, False):
+        assert breaker.allow()
+        breaker.record(success)
+
+
+def test_stays_closed_below_min_requests(breaker):
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_opens_at_the_failure_rate(breaker):
+    trip(breaker)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_failures_outside_the_window_are_forgotten(breaker, clock):
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 11
+    breaker.record(False)
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_limits_probes_and_closes_after_successes(breaker, clock):
+    trip(breaker)
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()   #both probe slots taken
+    breaker.record(True)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_a_failed_probe_reopens(breaker, clock):
+    trip(breaker)
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_closing_starts_a_fresh_window(breaker, clock):
+    trip(breaker)
+    clock.now += 5
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(True)
+    assert breaker.state == CLOSED
+    breaker.record(False)   #the failures from before the trip no longer count
+    assert breaker.state == CLOSED
+
+
+def test_late_outcomes_while_open_are_ignored(breaker):
+    trip(breaker)
+    breaker.record(True)
+    assert breaker.state == OPEN
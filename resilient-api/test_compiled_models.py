@@ -0,0 +1,61 @@
+#Compiled selector/success model outputs against the sklearn models they came from
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from compiled_models import CompiledForest, CompiledLogistic, save_selector, load_selector
+from pipeline import PredictionPipeline
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.normal(0, 500, 600), rng.uniform(0, 100, 600), rng.uniform(0, 100, 600),
+                         rng.uniform(0, 1, 600)])
+    y = (X[:, 1] > 50).astype(int) + 2 * (X[:, 3] > 0.5).astype(int)   #four classes
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest(data):
+    X, y = data
+    return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+def test_forest_probabilities_match_sklearn(data, forest):
+    X, _ = data
+    np.testing.assert_allclose(CompiledForest(forest).predict_proba_matrix(X), forest.predict_proba(X),
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_forest_predictions_match_sklearn(data, forest):
+    X, _ = data
+    compiled = CompiledForest(forest)
+    expected = forest.predict(X)
+    np.testing.assert_array_equal(compiled.predict(X), expected)
+    assert [compiled.predict_row(row) for row in X[:100]] == expected[:100].tolist()
+
+
+def test_saved_forest_predicts_the_same(data, forest, tmp_path):
+    X, _ = data
+    compiled = CompiledForest(forest)
+    path = str(tmp_path / "selector.npz")
+    digest = save_selector(compiled, path)
+    loaded = load_selector(path)
+    assert loaded.digest == digest
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+
+
+@pytest.mark.parametrize("scaler_cls", [StandardScaler, MinMaxScaler])
+def test_logistic_probabilities_match_sklearn(data, scaler_cls):
+    X, y = data
+    y = (y > 1).astype(int)
+    scaler = scaler_cls().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+    pipeline = PredictionPipeline.from_scaler(["value", "cpu", "mem", "confidence"], scaler, model)
+    compiled = CompiledLogistic.from_pipeline(pipeline)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(compiled.predict_proba_matrix(X), expected, rtol=1e-12, atol=1e-15)
+    assert compiled.predict_proba_row(X[0]) == pytest.approx(expected[0], rel=1e-12)
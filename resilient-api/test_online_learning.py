@@ -0,0 +1,57 @@
+#RunningStats batch merge and removal against NumPy on the same rows
+import numpy as np
+import pytest
+
+from online_learning import RunningStats
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    return rng.normal(loc=[0.0, 50.0, -3.0], scale=[1.0, 20.0, 0.1], size=(500, 3))
+
+
+def assert_matches(stats, X):
+    assert stats.n == len(X)
+    np.testing.assert_allclose(stats.mean, X.mean(axis=0), rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(stats.std, X.std(axis=0), rtol=1e-9)
+
+
+def test_merging_batches_matches_the_whole(rows):
+    stats = RunningStats(3)
+    for batch in np.array_split(rows, [1, 7, 100, 101, 350]):
+        stats.update(batch)
+    assert_matches(stats, rows)
+
+
+def test_remove_undoes_update(rows):
+    stats = RunningStats(3)
+    stats.update(rows[:300])
+    stats.update(rows[300:])
+    stats.remove(rows[:120])
+    assert_matches(stats, rows[120:])
+    stats.remove(rows[400:])
+    assert_matches(stats, rows[120:400])
+
+
+def test_removing_everything_resets(rows):
+    stats = RunningStats(3)
+    stats.update(rows)
+    stats.remove(rows)
+    assert stats.n == 0
+    np.testing.assert_array_equal(stats.mean, np.zeros(3))
+    np.testing.assert_array_equal(stats.std, np.ones(3))
+
+
+def test_constant_columns_are_left_unscaled():
+    stats = RunningStats(2)
+    stats.update(np.array([[1.0, 5.0], [3.0, 5.0]]))
+    np.testing.assert_array_equal(stats.std, [1.0, 1.0])
+
+
+def test_empty_batches_are_ignored(rows):
+    stats = RunningStats(3)
+    stats.update(rows)
+    stats.update(np.empty((0, 3)))
+    stats.remove(np.empty((0, 3)))
+    assert_matches(stats, rows)
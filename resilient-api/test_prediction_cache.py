@@ -0,0 +1,69 @@
+#PredictionCache expiry, LRU eviction and key quantization
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    return PredictionCache("test", ["value", "cpu"], steps={"value": 0.0, "cpu": 5.0}, **kwargs)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = make_cache(ttl=10)
+    cache.put("k", 1)
+    clock.now += 9.9
+    assert cache.get("k") == 1
+    clock.now += 0.2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = make_cache(max_entries=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1   #b is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_put_refreshes_the_expiry(clock):
+    cache = make_cache(ttl=10)
+    cache.put("k", 1)
+    clock.now += 8
+    cache.put("k", 2)
+    clock.now += 8
+    assert cache.get("k") == 2
+
+
+def test_keys_quantize_features_and_carry_the_version():
+    cache = make_cache()
+    assert cache.key(1, 10, 41.0) == cache.key(1, 10, 39.0)
+    assert cache.key(1, 10, 41.0) != cache.key(1, 10, 48.0)
+    assert cache.key(1, 10, 41.0) != cache.key(1, 10.5, 41.0)   #step 0 = exact
+    assert cache.key(1, 10, 41.0) != cache.key(2, 10, 41.0)
+
+
+def test_clear_empties_the_cache(clock):
+    cache = make_cache()
+    cache.put("k", 1)
+    cache.clear()
+    assert cache.get("k") is None
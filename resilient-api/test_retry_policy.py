@@ -0,0 +1,88 @@
+#RetryBudget token accounting and RetryRun give-up reasons
+import pytest
+from tenacity import RetryError
+
+import retry_policy
+from retry_policy import RetryBudget, RetryPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry_policy.time, "monotonic", clock)
+    return clock
+
+
+def always_fails():
+    raise RuntimeError("down")
+
+
+def test_budget_withdraws_until_empty(clock):
+    budget = RetryBudget(ratio=0.5, min_rate=0.0, burst=2)
+    assert budget.try_withdraw()
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    assert not budget.try_withdraw()   #half a token
+    budget.deposit()
+    assert budget.try_withdraw()
+    assert budget.tokens == pytest.approx(0.0)
+
+
+def test_budget_refills_over_time_up_to_burst(clock):
+    budget = RetryBudget(ratio=0.0, min_rate=2.0, burst=3)
+    for _ in range(3):
+        assert budget.try_withdraw()
+    clock.now += 0.25
+    assert budget.tokens == pytest.approx(0.5)
+    clock.now += 100
+    assert budget.tokens == pytest.approx(3.0)
+
+
+def test_budget_deposit_is_capped_at_burst(clock):
+    budget = RetryBudget(ratio=5.0, min_rate=0.0, burst=2)
+    budget.deposit()
+    assert budget.tokens == pytest.approx(2.0)
+
+
+def run_policy(policy, deadline=None):
+    run = policy.start(deadline)
+    with pytest.raises(RetryError):
+        policy.retrying(run)(always_fails)
+    return run
+
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3, deadline=10.0, backoff_base=0.001, backoff_max=0.001,
+                         budget=RetryBudget(min_rate=0.0, burst=10))
+    run = run_policy(policy)
+    assert (run.give_up_reason, run.attempts) == ("attempts", 3)
+    assert policy.budget.tokens == pytest.approx(8.0)   #two retries paid for
+
+
+def test_gives_up_when_the_backoff_would_pass_the_deadline():
+    policy = RetryPolicy(max_attempts=5, deadline=10.0, backoff_base=1.0, backoff_max=1.0,
+                         budget=RetryBudget(min_rate=0.0, burst=10))
+    run = run_policy(policy, deadline=0.0)
+    assert (run.give_up_reason, run.attempts) == ("deadline", 1)
+
+
+def test_gives_up_when_the_budget_is_empty():
+    policy = RetryPolicy(max_attempts=5, deadline=10.0, backoff_base=0.001, backoff_max=0.001,
+                         budget=RetryBudget(ratio=0.0, min_rate=0.0, burst=1))
+    run = run_policy(policy)
+    assert (run.give_up_reason, run.attempts) == ("budget", 2)
+
+
+def test_request_deadline_is_capped_by_the_policy():
+    policy = RetryPolicy(deadline=2.0, budget=RetryBudget())
+    assert policy.start(60.0).remaining() <= 2.0
+    assert policy.start(0.5).remaining() <= 0.5
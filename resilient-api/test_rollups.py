@@ -0,0 +1,110 @@
+#Rollups shards: per-process saves merged once into the main file
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from rollups import Rollups
+
+DEAD_PID = 2 ** 22 + 12345   #above the default pid_max, never a live process
+
+
+def record(rollups, n, stressor="timeout", success=True, fallback_used=False):
+    for _ in range(n):
+        rollups.record(stressor, True, success, fallback_used, 0.5, 0.01)
+
+
+def counts(rollups):
+    return {group["stressor"]: group["count"] for group in rollups.query(minutes=5, by=["stressor"])}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "rollups.json")
+
+
+def dead_shard(path, rollups):
+    shard = f"{path}.{socket.gethostname()}-{DEAD_PID}"
+    Rollups._write(shard, Rollups._serialize(rollups._minutes), rollups.retention_minutes)
+    return shard
+
+
+def test_save_writes_only_this_process_shard(path):
+    rollups = Rollups()
+    rollups.save(path)
+    assert not os.path.exists(Rollups.shard_path(path))   #nothing recorded, nothing written
+    record(rollups, 3)
+    rollups.save(path)
+    assert os.path.exists(Rollups.shard_path(path))
+    assert not os.path.exists(path)
+
+
+def test_load_merges_dead_shards_into_the_main_file(path):
+    worker = Rollups()
+    record(worker, 5)
+    record(worker, 2, stressor="failure", success=False, fallback_used=True)
+    shard = dead_shard(path, worker)
+
+    own = Rollups()
+    record(own, 3)
+    own.save(path)
+
+    restarted = Rollups()
+    assert restarted.load(path)
+    assert counts(restarted) == {"timeout": 8, "failure": 2}
+    assert not os.path.exists(shard)
+    assert not os.path.exists(Rollups.shard_path(path))
+    with open(path) as f:
+        assert json.load(f)["minutes"]
+
+
+def test_loading_again_does_not_count_twice(path):
+    worker = Rollups()
+    record(worker, 4)
+    dead_shard(path, worker)
+    Rollups().load(path)
+    again = Rollups()
+    again.load(path)
+    assert counts(again) == {"timeout": 4}
+
+
+def test_shards_of_live_or_remote_processes_are_left_alone(path):
+    worker = Rollups()
+    record(worker, 4)
+    remote = f"{path}.some-other-host-{DEAD_PID}"
+    live = f"{path}.{socket.gethostname()}-{os.getppid()}"
+    for shard in (remote, live):
+        Rollups._write(shard, Rollups._serialize(worker._minutes), worker.retention_minutes)
+    restarted = Rollups()
+    assert not restarted.load(path)
+    assert os.path.exists(remote) and os.path.exists(live)
+
+
+def test_loaded_history_and_new_records_add_up(path):
+    worker = Rollups()
+    record(worker, 4)
+    dead_shard(path, worker)
+    restarted = Rollups()
+    restarted.load(path)
+    record(restarted, 1)
+    assert counts(restarted) == {"timeout": 5}
+
+
+def test_buckets_past_retention_are_dropped_on_load(path):
+    worker = Rollups(retention_minutes=10)
+    worker.record("timeout", True, True, False, 0.5, 0.01, now=time.time() - 3600)
+    record(worker, 1, stressor="latency")
+    dead_shard(path, worker)
+    restarted = Rollups(retention_minutes=10)
+    restarted.load(path)
+    assert counts(restarted) == {"latency": 1}
+
+
+def test_no_temp_files_are_left_behind(path, tmp_path):
+    worker = Rollups()
+    record(worker, 2)
+    worker.save(path)
+    Rollups().load(path)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
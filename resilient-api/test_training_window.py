@@ -0,0 +1,54 @@
+#Reservoir sampling: size, uniformity and scaler statistics of the held rows
+import numpy as np
+
+from feature_extraction import FEATURE_COLS
+from training_window import Reservoir
+
+N_FEATURES = len(FEATURE_COLS)
+
+
+def numbered_rows(n):
+    # Column 0 carries the row's position in the stream
+    X = np.zeros((n, N_FEATURES))
+    X[:, 0] = np.arange(n)
+    X[:, 1] = np.arange(n) % 7
+    return X, np.arange(n) % 2, np.zeros(n)
+
+
+def feed(reservoir, n, batch=37):
+    X, y, ts = numbered_rows(n)
+    for start in range(0, n, batch):
+        reservoir.add(X[start:start + batch], y[start:start + batch], ts[start:start + batch])
+
+
+def test_holds_size_rows_out_of_everything_seen():
+    reservoir = Reservoir(size=100, seed=1)
+    feed(reservoir, 30)
+    assert (reservoir.size, reservoir.seen) == (30, 30)
+    feed(reservoir, 5000)
+    assert (reservoir.size, reservoir.seen) == (100, 5030)
+    X, y, _, _ = reservoir.data()
+    assert X.shape == (100, N_FEATURES) and len(y) == 100
+
+
+def test_every_position_is_equally_likely_to_be_kept():
+    n, size, trials = 1000, 50, 200
+    kept = np.zeros(10)
+    for seed in range(trials):
+        reservoir = Reservoir(size=size, seed=seed)
+        feed(reservoir, n)
+        X, _, _, _ = reservoir.data()
+        assert len(np.unique(X[:, 0])) == size   #no row held twice
+        kept += np.bincount((X[:, 0] // (n // 10)).astype(int), minlength=10)
+    expected = trials * size / 10
+    assert np.all(np.abs(kept - expected) < 0.15 * expected), kept
+
+
+def test_statistics_are_those_of_the_held_rows():
+    reservoir = Reservoir(size=64, seed=3)
+    feed(reservoir, 3000, batch=50)
+    X, _, mean, std = reservoir.data()
+    np.testing.assert_allclose(mean, X.mean(axis=0), rtol=1e-9, atol=1e-9)
+    expected_std = X.std(axis=0)
+    expected_std[expected_std == 0.0] = 1.0
+    np.testing.assert_allclose(std, expected_std, rtol=1e-7)
@@ -0,0 +1,169 @@
+#Background training jobs
+#Training runs on a single-worker executor instead of inside the Flask request.
+#Each job has an id and a status that can be polled, and can be cancelled; a
+#running job checks for cancellation between stages, before anything is swapped in.
+#A job that finds nothing worth training on raises TrainingSkipped and ends as
+#"skipped" with the reason, leaving the serving model in place.
+#With several workers, the one holding WARMUP_LOCK_PATH (claim_warmup) trains
+#what is missing at startup and the others load its artifacts.
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+MAX_JOBS_KEPT = 100
+WARMUP_LOCK_PATH = os.environ.get("WARMUP_LOCK_PATH", "warmup.lock")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class TrainingSkipped(Exception):
+    """
+    The data can't produce a usable model (e.g. no events, one class only).
+    """
+
+
+class TrainingJob:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    def set_stage(self, stage):
+        """
+        Marks progress and is the cancellation point between training stages.
+        """
+        if self._cancel.is_set():
+            raise JobCancelled(f"Cancelled before {stage}")
+        self.stage = stage
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed", "cancelled", "skipped")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class TrainingJobs:
+    """
+    Submits fn(job) to a background executor and tracks the job.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="training")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The executor's threads (and jobs running in them) stay in the parent
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="training")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn):
+        job = TrainingJob(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOBS_KEPT:
+                self._jobs.popitem(last=False)
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = "succeeded"
+        except JobCancelled as e:
+            job.status = "cancelled"
+            job.error = str(e)
+        except TrainingSkipped as e:
+            job.status = "skipped"
+            job.error = str(e)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if not job.done:
+            job._cancel.set()
+            if job.future is not None and job.future.cancel():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def wait(self, job, timeout=None):
+        if job.future is not None:
+            try:
+                job.future.result(timeout=timeout)
+            except Exception:
+                pass
+        return job
+
+
+_WARMUP_LOCK = []
+
+
+def claim_warmup(path=WARMUP_LOCK_PATH):
+    """
+    True if this process may run the warm-up training: it holds the lock on path
+    until it exits (a replacement worker can then claim it). Always True without fcntl.
+    """
+    if _WARMUP_LOCK or fcntl is None:
+        return True
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _WARMUP_LOCK.append(fd)
+    return True
@@ -0,0 +1,237 @@
+#Bounded-memory training data
+#Instead of re-reading the whole, ever-growing event log for every fit, training
+#can draw on a fixed-size sample of the event stream kept in memory:
+#   TRAINING_WINDOW_MODE=time       events of the last TRAINING_WINDOW_SECONDS
+#                                   (at most TRAINING_WINDOW_MAX_ROWS, oldest evicted first)
+#   TRAINING_WINDOW_MODE=reservoir  a uniform sample of TRAINING_RESERVOIR_SIZE events
+#                                   over the whole history (Algorithm R)
+#Rows live in preallocated NumPy buffers, so memory is fixed at startup however
+#long the service runs. Scaler statistics are maintained with Welford updates
+#(reversed when rows are evicted), so a fit needs no pass to compute mean/std.
+#The first load reads the existing log in chunks; after that the window is fed
+#by the event writer. Timestamps follow the event store's convention: naive ISO
+#times are taken as UTC.
+import os
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from feature_extraction import FEATURE_COLS, EVENT_COLUMNS, event_feature_matrix, frame_features, drop_torn_rows
+from event_writer import event_log_paths
+from event_store import get_event_store
+from online_learning import RunningStats
+
+TRAINING_WINDOW_MODE = os.environ.get("TRAINING_WINDOW_MODE", "off")     #"off", "time" or "reservoir"
+TRAINING_WINDOW_SECONDS = float(os.environ.get("TRAINING_WINDOW_SECONDS", "3600"))
+TRAINING_WINDOW_MAX_ROWS = int(os.environ.get("TRAINING_WINDOW_MAX_ROWS", "200000"))
+TRAINING_RESERVOIR_SIZE = int(os.environ.get("TRAINING_RESERVOIR_SIZE", "100000"))
+TRAINING_WINDOW_CHUNK = int(os.environ.get("TRAINING_WINDOW_CHUNK", "100000"))   #rows per read of the first load
+
+SELECTOR_COLS = ["value", "cpu", "mem", "confidence"]
+_SELECTOR_INDEX = [FEATURE_COLS.index(col) for col in SELECTOR_COLS]
+_STRESSOR_INDEX = FEATURE_COLS.index("stressor_type")
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(timestamp):
+    moment = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH).total_seconds()
+
+
+def _now():
+    # Same clock as the naive local timestamps the event writer logs
+    return _epoch_seconds(datetime.now())
+
+
+class TrainingWindow:
+    """
+    Fixed-capacity buffer of feature rows, targets and timestamps with running
+    scaler statistics. Subclasses decide which rows are kept.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.X = np.empty((capacity, len(FEATURE_COLS)))
+        self.y = np.empty(capacity, dtype=np.int8)
+        self.ts = np.empty(capacity)
+        self.size = 0
+        self.seen = 0
+        self.stats = RunningStats(len(FEATURE_COLS))
+        self._removed = 0
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def add(self, X, y, ts):
+        X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_COLS))
+        y = np.asarray(y, dtype=np.int8)
+        ts = np.asarray(ts, dtype=float)
+        with self._lock:
+            self._add(X, y, ts)
+            self.seen += len(X)
+
+    def add_rows(self, rows):
+        """
+        Event writer listener: adds a flushed batch of event rows.
+        """
+        X, y = event_feature_matrix(rows)
+        self.add(X, y, [_epoch_seconds(row["timestamp"]) for row in rows])
+
+    def load_history(self, csv_path, chunk_rows=TRAINING_WINDOW_CHUNK):
+        """
+        First load: the existing event log (CSV shards or the event store), chunk by chunk.
+        """
+        store = get_event_store()
+        if store is not None:
+            df = store.read(EVENT_COLUMNS + ["timestamp"], start=self._history_start())
+            for offset in range(0, len(df), chunk_rows):
+                self._add_frame(df.iloc[offset:offset + chunk_rows].copy())
+            return self
+        import pandas as pd
+        for path in event_log_paths(csv_path):
+            if os.path.getsize(path) == 0:
+                continue
+            for chunk in pd.read_csv(path, usecols=EVENT_COLUMNS + ["timestamp"], chunksize=chunk_rows,
+                                     on_bad_lines="skip"):
+                self._add_frame(chunk)
+        return self
+
+    def _add_frame(self, df):
+        import pandas as pd
+        df = drop_torn_rows(df)
+        timestamps = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True, errors="coerce")
+        ts = timestamps.to_numpy(dtype="datetime64[ns]").view("<i8") / 1e9   #NaT sorts as oldest
+        features, y = frame_features(df)
+        self.add(features.to_numpy(dtype=float), y.to_numpy(), ts)
+
+    def _history_start(self):
+        return None
+
+    def data(self):
+        """
+        Copies of the held rows: (X, y, mean, std) with the scaler statistics of exactly these rows.
+        """
+        with self._lock:
+            self._expire()
+            index = self._held()
+            return self.X[index], self.y[index].astype(int), self.stats.mean.copy(), self.stats.std.copy()
+
+    def success_data(self):
+        X, y, mean, std = self.data()
+        return (X - mean) / std, y, mean, std
+
+    def selector_data(self):
+        X, _, _, _ = self.data()
+        return X[:, _SELECTOR_INDEX], X[:, _STRESSOR_INDEX].astype(int)
+
+    def _held(self):
+        return np.arange(self.size)
+
+    def _expire(self):
+        pass
+
+    def _evict(self, index):
+        # Reversed Welford merge, refreshed from the held rows once as many rows
+        # as the buffer holds have been removed, so rounding error can't build up
+        self.stats.remove(self.X[index])
+        self._removed += len(index)
+        if self._removed >= self.capacity:
+            self._rebuild_stats(exclude=index)
+
+    def _rebuild_stats(self, exclude=()):
+        held = np.setdiff1d(self._held(), exclude)
+        self.stats = RunningStats(len(FEATURE_COLS))
+        self.stats.update(self.X[held])
+        self._removed = 0
+
+
+class TimeWindow(TrainingWindow):
+    """
+    Ring buffer of the most recent events, limited to `seconds` of history and `max_rows`.
+    """
+
+    def __init__(self, seconds=TRAINING_WINDOW_SECONDS, max_rows=TRAINING_WINDOW_MAX_ROWS):
+        super().__init__(max_rows)
+        self.seconds = seconds
+        self.head = 0   #oldest row
+
+    def _held(self):
+        return (self.head + np.arange(self.size)) % self.capacity
+
+    def _history_start(self):
+        return int((_now() - self.seconds) * 1e9)
+
+    def _add(self, X, y, ts):
+        keep = ts >= _now() - self.seconds
+        X, y, ts = X[keep][-self.capacity:], y[keep][-self.capacity:], ts[keep][-self.capacity:]
+        overflow = self.size + len(X) - self.capacity
+        if overflow > 0:
+            self._pop(overflow)
+        slots = (self.head + self.size + np.arange(len(X))) % self.capacity
+        self.X[slots], self.y[slots], self.ts[slots] = X, y, ts
+        self.size += len(X)
+        self.stats.update(X)
+        self._expire()
+
+    def _expire(self):
+        # Arrival order: pops from the oldest end while rows are out of the window
+        fresh = np.flatnonzero(self.ts[self._held()] >= _now() - self.seconds)
+        self._pop(fresh[0] if len(fresh) else self.size)
+
+    def _pop(self, n):
+        if n <= 0:
+            return
+        index = self._held()[:n]
+        self._evict(index)
+        self.head = (self.head + n) % self.capacity
+        self.size -= n
+
+
+class Reservoir(TrainingWindow):
+    """
+    Uniform sample of `size` rows out of everything added (Algorithm R).
+    """
+
+    def __init__(self, size=TRAINING_RESERVOIR_SIZE, seed=None):
+        super().__init__(size)
+        self._rng = np.random.default_rng(seed)
+
+    def _add(self, X, y, ts):
+        # Fill free slots first
+        fill = min(self.capacity - self.size, len(X))
+        slots = np.arange(self.size, self.size + fill)
+        self.X[slots], self.y[slots], self.ts[slots] = X[:fill], y[:fill], ts[:fill]
+        self.size += fill
+        self.stats.update(X[:fill])
+        X, y, ts = X[fill:], y[fill:], ts[fill:]
+        if not len(X):
+            return
+        # Row i of the rest is the (seen + fill + i)-th event: it replaces a random
+        # slot with probability capacity / (its position + 1)
+        positions = self.seen + fill + np.arange(len(X))
+        candidates = self._rng.integers(0, positions + 1)
+        accepted = np.flatnonzero(candidates < self.capacity)
+        slots = candidates[accepted]
+        # A slot hit twice in one batch keeps the later row, as sequential Algorithm R would
+        slots_reversed = slots[::-1]
+        slots, last = np.unique(slots_reversed, return_index=True)
+        rows = accepted[::-1][last]
+        self._evict(slots)
+        self.X[slots], self.y[slots], self.ts[slots] = X[rows], y[rows], ts[rows]
+        self.stats.update(X[rows])
+
+
+def make_training_window(mode=TRAINING_WINDOW_MODE):
+    """
+    The configured TrainingWindow, or None when training reads the whole event log.
+    """
+    if mode == "off":
+        return None
+    if mode == "time":
+        return TimeWindow()
+    if mode == "reservoir":
+        return Reservoir()
+    raise ValueError(f"TRAINING_WINDOW_MODE must be 'off', 'time' or 'reservoir', not {mode!r}")